@@ -14,6 +14,10 @@ def create_app(config_name):
                 template_folder='interfaces/templates',
                 static_folder='interfaces/static')
     
+    # JSON con orjson si está disponible (Decimal y fechas sin conversión manual)
+    from app.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # Cargar configuración
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
@@ -32,6 +36,22 @@ def create_app(config_name):
         # Crear todas las tablas si no existen
         db.create_all()
     
+    # Versionar automáticamente las escrituras de pedidos (feed de cambios)
+    from app.services.change_feed_service import init_change_tracking
+    init_change_tracking()
+    
+    # Mantener la proyección de lectura order_views en cada escritura de pedidos
+    from app.services.order_view_service import init_order_views
+    init_order_views()
+    
+    # Mantener los agregados de KPIs por hora y día en cada escritura de pedidos
+    from app.services.kpi_rollup_service import init_kpi_rollups
+    init_kpi_rollups()
+    
+    # Versionar el catálogo de cada negocio en cada escritura de productos
+    from app.services.catalog_service import init_catalog_tracking
+    init_catalog_tracking()
+    
     # Importar y registrar blueprints de manera modular
     from app.routes import blueprints
     for blueprint_info in blueprints:
@@ -48,6 +68,10 @@ def create_app(config_name):
     for api_bp in api_bp_list:
         csrf.exempt(api_bp)
     
+    # Comprimir respuestas JSON grandes (gzip negociado)
+    from app.compression import init_compression
+    init_compression(app)
+    
     # Registrar manejadores de errores personalizados
     register_error_handlers(app)
     
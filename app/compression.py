@@ -0,0 +1,39 @@
+"""
+Compresión gzip negociada de las respuestas JSON.
+"""
+import gzip
+from flask import Flask, request
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Comprime con gzip las respuestas JSON mayores a JSON_COMPRESS_MIN_SIZE bytes
+    cuando el cliente envía Accept-Encoding: gzip.
+    """
+
+    @app.after_request
+    def compress_json_response(response):
+        if not app.config.get('JSON_COMPRESS', True):
+            return response
+        if request.method == 'HEAD' or response.direct_passthrough:
+            return response
+        if response.mimetype != 'application/json' or not 200 <= response.status_code < 300:
+            return response
+
+        # Varía según Accept-Encoding aunque esta respuesta no se comprima
+        response.vary.add('Accept-Encoding')
+        if 'Content-Encoding' in response.headers or not request.accept_encodings['gzip']:
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config.get('JSON_COMPRESS_MIN_SIZE', 1024):
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=app.config.get('JSON_COMPRESS_LEVEL', 6)))
+        response.headers['Content-Encoding'] = 'gzip'
+
+        # Otra representación de los mismos datos: el ETag pasa a ser débil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -56,6 +56,41 @@ class Config:
     
     # Pagination
     ITEMS_PER_PAGE = 25
+    MAX_ITEMS_PER_PAGE = 100
+    SEARCH_MIN_QUERY_LENGTH = 3
+    
+    # GET condicionales: vigencia del ETag de respuestas que dependen de la hora
+    ETAG_TIME_BUCKET_SECONDS = 60
+    
+    # Compresión gzip de respuestas JSON (ver app/compression.py)
+    JSON_COMPRESS = True
+    JSON_COMPRESS_MIN_SIZE = 1024
+    JSON_COMPRESS_LEVEL = 6
+    
+    # Caché de KPIs por negocio (ver app/services/kpi_cache_service.py)
+    KPI_CACHE_ENABLED = True
+    KPI_CACHE_TTL_SECONDS = 60  # Los KPIs dependen de la hora: recalcular aunque no haya escrituras
+    KPI_CACHE_MAX_STALE_SECONDS = 5  # Servir sin verificar la versión del negocio
+    KPI_CACHE_MAX_ENTRIES = 1000
+    
+    # Caché del catálogo del agente IA por negocio (ver app/services/catalog_service.py)
+    CATALOG_CACHE_MAX_ENTRIES = 500
+    
+    # Respuestas del agente IA sin LLM para mensajes triviales (saludos, menú, sí/no)
+    AI_FAST_PATH_ENABLED = True
+    AI_FAST_PATH_MENU_MAX_ITEMS = 30
+    
+    # Productos del catálogo que se envían al LLM (los más relevantes para la conversación)
+    AI_PROMPT_CATALOG_TOP_K = 25
+    
+    # Zona horaria de las métricas por hora de negocios sin una zona válida
+    DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE', 'America/Bogota')
+    
+    # Archivo de pedidos cerrados/cancelados (ver app/scripts/archive_orders.py)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+    ARCHIVE_BATCH_SIZE = 500
+    # Días que se conservan en order_views los tombstones de pedidos archivados (feed de cambios)
+    ARCHIVE_TOMBSTONE_DAYS = int(os.environ.get('ARCHIVE_TOMBSTONE_DAYS', 7))
     
     # Upload folder
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
@@ -103,6 +138,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    KPI_CACHE_MAX_STALE_SECONDS = 0  # Las escrituras se ven en la siguiente lectura
 
 # Configuraciones disponibles
 config = {
@@ -10,6 +10,10 @@ from app.data.models.notification import Notification
 from app.data.models.payment import Payment
 from app.data.models.ai_conversation import AIConversation
 from app.data.models.worker import Worker
+from app.data.models.order_sequence import OrderSequence
+from app.data.models.data_version import DataVersion
+from app.data.models.order_archive import ArchivedOrder, ArchivedOrderItem, ArchivedMessage, ArchivedPayment
+from app.data.models.order_view import OrderView
 
 # ==================== SCHEMAS ====================
 from app.data.schemas.user_schema import UserSchema, user_schema, users_schema
@@ -34,6 +38,9 @@ from app.data.schemas.validation_schemas import (
     message_send_schema
 )
 
+# ==================== SERIALIZADORES ====================
+from app.data.serializers import dump_order, dump_orders, dump_order_item
+
 # ==================== EXPORTAR TODO ====================
 __all__ = [
     # Modelos
@@ -48,6 +55,13 @@ __all__ = [
     'Payment',
     'AIConversation',
     'Worker',
+    'OrderSequence',
+    'DataVersion',
+    'ArchivedOrder',
+    'ArchivedOrderItem',
+    'ArchivedMessage',
+    'ArchivedPayment',
+    'OrderView',
     
     # Schema Classes
     'UserSchema',
@@ -92,4 +106,9 @@ __all__ = [
     'order_create_schema',
     'order_update_schema',
     'message_send_schema',
+    
+    # Serializadores rápidos
+    'dump_order',
+    'dump_orders',
+    'dump_order_item',
 ]
@@ -12,6 +12,11 @@ from app.data.models.notification import Notification
 from app.data.models.payment import Payment
 from app.data.models.ai_conversation import AIConversation
 from app.data.models.worker import Worker
+from app.data.models.order_sequence import OrderSequence
+from app.data.models.data_version import DataVersion
+from app.data.models.order_archive import ArchivedOrder, ArchivedOrderItem, ArchivedMessage, ArchivedPayment
+from app.data.models.order_view import OrderView
+from app.data.models.kpi_rollup import KPIRollup, KPIRollupPending
 
 __all__ = [
     'User',
@@ -24,5 +29,14 @@ __all__ = [
     'Notification',
     'Payment',
     'AIConversation',
-    'Worker'
+    'Worker',
+    'OrderSequence',
+    'DataVersion',
+    'ArchivedOrder',
+    'ArchivedOrderItem',
+    'ArchivedMessage',
+    'ArchivedPayment',
+    'OrderView',
+    'KPIRollup',
+    'KPIRollupPending'
 ]
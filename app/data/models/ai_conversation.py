@@ -8,6 +8,10 @@ from app.extensions import db
 class AIConversation(db.Model):
     """Modelo para almacenar conversaciones procesadas por IA."""
     __tablename__ = 'ai_conversations'
+    __table_args__ = (
+        # Última conversación del cliente: WHERE customer_phone = ? AND business_id = ? ORDER BY updated_at DESC
+        db.Index('ix_ai_conversations_lookup', 'customer_phone', 'business_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     customer_phone = db.Column(db.String(20), nullable=False)
@@ -31,7 +35,7 @@ class AIConversation(db.Model):
             'extracted_intent': self.extracted_intent,
             'extracted_entities': self.extracted_entities,
             'confidence_score': self.confidence_score,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
     
     def __repr__(self):
@@ -15,6 +15,7 @@ class Business(db.Model):
     business_type = db.Column(db.String(50), nullable=False)  # restaurant, bakery, pharmacy, etc.
     address = db.Column(db.String(200))
     city = db.Column(db.String(50), default='Barranquilla')
+    timezone_name = db.Column(db.String(50), default='America/Bogota')  # Zona IANA para agrupar métricas por hora local
     whatsapp_number = db.Column(db.String(20), unique=True)
     opening_time = db.Column(db.Time)
     closing_time = db.Column(db.Time)
@@ -22,6 +23,7 @@ class Business(db.Model):
     pickup_enabled = db.Column(db.Boolean, default=True)
     is_active = db.Column(db.Boolean, default=True)
     subscription_plan = db.Column(db.String(20), default='basic')  # basic, pro, enterprise
+    catalog_version = db.Column(db.BigInteger, nullable=False, default=0)  # Se incrementa con cada cambio del catálogo
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
@@ -38,6 +40,7 @@ class Business(db.Model):
             'business_type': self.business_type,
             'address': self.address,
             'city': self.city,
+            'timezone': self.timezone_name,
             'whatsapp_number': self.whatsapp_number,
             'opening_time': self.opening_time.strftime('%H:%M') if self.opening_time else None,
             'closing_time': self.closing_time.strftime('%H:%M') if self.closing_time else None,
@@ -8,6 +8,13 @@ from app.extensions import db
 class Customer(db.Model):
     """Modelo de cliente que hace pedidos."""
     __tablename__ = 'customers'
+    __table_args__ = (
+        # Búsqueda de pedidos por subcadena de teléfono o nombre (solo PostgreSQL, pg_trgm)
+        db.Index('ix_customers_phone_trgm', 'phone', postgresql_using='gin',
+                 postgresql_ops={'phone': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_customers_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     phone = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -0,0 +1,21 @@
+"""
+Modelo de Versión de datos por negocio.
+"""
+from app.extensions import db
+
+
+class DataVersion(db.Model):
+    """Contador monótono que se incrementa con cada escritura de pedidos de un negocio."""
+    __tablename__ = 'data_versions'
+
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'business_id': self.business_id,
+            'version': self.version
+        }
+
+    def __repr__(self):
+        return f'<DataVersion {self.business_id} = {self.version}>'
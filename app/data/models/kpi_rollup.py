@@ -0,0 +1,104 @@
+"""
+Modelo de agregados de KPIs por franja de tiempo.
+"""
+from datetime import datetime, timezone
+from app.extensions import db
+
+
+# Estado del pedido -> columna con su conteo
+STATUS_COUNT_COLUMNS = {
+    'received': 'received_count',
+    'preparing': 'preparing_count',
+    'ready': 'ready_count',
+    'sent': 'sent_count',
+    'paid': 'paid_count',
+    'closed': 'closed_count',
+    'cancelled': 'cancelled_count'
+}
+
+
+class KPIRollup(db.Model):
+    """
+    Agregados de los pedidos de un negocio creados en una franja de una hora o
+    un día (UTC), vivos y archivados.
+
+    Cada escritura de pedidos marca sus franjas en kpi_rollup_pending y
+    KPIRollupService las recalcula antes de que KPIService las lea; KPIService
+    suma franjas en lugar de recorrer pedidos.
+    """
+    __tablename__ = 'kpi_rollups'
+
+    # Clave en este orden para leer rangos: WHERE business_id = ? AND granularity = ? AND bucket_start ...
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)  # hour, day
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # Inicio de la franja (UTC)
+
+    # Conteos por estado
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    received_count = db.Column(db.Integer, nullable=False, default=0)
+    preparing_count = db.Column(db.Integer, nullable=False, default=0)
+    ready_count = db.Column(db.Integer, nullable=False, default=0)
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_count = db.Column(db.Integer, nullable=False, default=0)
+    closed_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0)
+    automated_count = db.Column(db.Integer, nullable=False, default=0)  # response_time < 60 s
+
+    # Ventas (pedidos no cancelados)
+    sales_amount = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    # Tiempos: suma y cantidad de pedidos con el dato, para promediar entre franjas
+    response_time_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    response_time_count = db.Column(db.Integer, nullable=False, default=0)
+    preparation_time_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    preparation_time_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Satisfacción: pedidos entregados o listos según el tiempo desde su creación
+    satisfaction_30_count = db.Column(db.Integer, nullable=False, default=0)    # <= 30 min
+    satisfaction_45_count = db.Column(db.Integer, nullable=False, default=0)    # 30-45 min
+    satisfaction_60_count = db.Column(db.Integer, nullable=False, default=0)    # 45-60 min
+    satisfaction_90_count = db.Column(db.Integer, nullable=False, default=0)    # 60-90 min
+    satisfaction_over_count = db.Column(db.Integer, nullable=False, default=0)  # > 90 min
+
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            'business_id': self.business_id,
+            'granularity': self.granularity,
+            'bucket_start': self.bucket_start,
+            'orders_count': self.orders_count,
+            'status_counts': {status: getattr(self, column) for status, column in STATUS_COUNT_COLUMNS.items()},
+            'automated_count': self.automated_count,
+            'sales_amount': self.sales_amount,
+            'response_time_sum': self.response_time_sum,
+            'response_time_count': self.response_time_count,
+            'preparation_time_sum': self.preparation_time_sum,
+            'preparation_time_count': self.preparation_time_count,
+            'satisfaction_buckets': {
+                '30': self.satisfaction_30_count,
+                '45': self.satisfaction_45_count,
+                '60': self.satisfaction_60_count,
+                '90': self.satisfaction_90_count,
+                'over': self.satisfaction_over_count
+            }
+        }
+
+    def __repr__(self):
+        return f'<KPIRollup {self.business_id} {self.granularity} {self.bucket_start}>'
+
+
+class KPIRollupPending(db.Model):
+    """
+    Franja de hora de un negocio con pedidos escritos que aún no se recalculó
+    en kpi_rollups.
+
+    Las escrituras solo agregan filas (sin bloquear la franja); una franja
+    puede aparecer varias veces hasta que se recalcula.
+    """
+    __tablename__ = 'kpi_rollup_pending'
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False, index=True)
+    bucket_start = db.Column(db.DateTime, nullable=False)  # Inicio de la franja de hora (UTC)
@@ -10,7 +10,7 @@ class Message(db.Model):
     __tablename__ = 'messages'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), index=True)
     whatsapp_message_id = db.Column(db.String(100), unique=True)
     sender_phone = db.Column(db.String(20), nullable=False)
     receiver_phone = db.Column(db.String(20), nullable=False)
@@ -35,7 +35,7 @@ class Message(db.Model):
             'direction': self.direction,
             'is_automated': self.is_automated,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
     
     def __repr__(self):
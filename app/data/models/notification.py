@@ -31,7 +31,7 @@ class Notification(db.Model):
             'notification_type': self.notification_type,
             'is_read': self.is_read,
             'related_order_id': self.related_order_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
     
     def __repr__(self):
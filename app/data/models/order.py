@@ -2,12 +2,28 @@
 Modelo de Pedido.
 """
 from datetime import datetime, timezone
+from sqlalchemy import DDL, event
 from app.extensions import db
 
 
 class Order(db.Model):
     """Modelo de pedido."""
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Listados paginados por cursor: WHERE business_id = ? ORDER BY created_at, id
+        db.Index('ix_orders_business_created', 'business_id', 'created_at', 'id'),
+        # Tablero, vistas de trabajadores y KPIs: WHERE business_id = ? AND status IN (...) [AND created_at >= ?]
+        db.Index('ix_orders_business_status_created', 'business_id', 'status', 'created_at'),
+        # Feed de cambios: WHERE business_id = ? AND change_seq > ?
+        db.Index('ix_orders_business_change_seq', 'business_id', 'change_seq'),
+        # Historial de un cliente y búsqueda por teléfono/nombre: WHERE customer_id IN (...)
+        db.Index('ix_orders_customer_created', 'customer_id', 'created_at'),
+        # Búsqueda: order_number LIKE 'prefijo%' y delivery_address ILIKE '%texto%' (solo PostgreSQL)
+        db.Index('ix_orders_order_number_pattern', 'order_number',
+                 postgresql_ops={'order_number': 'varchar_pattern_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_orders_delivery_address_trgm', 'delivery_address', postgresql_using='gin',
+                 postgresql_ops={'delivery_address': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -40,11 +56,19 @@ class Order(db.Model):
     response_time_seconds = db.Column(db.Integer)  # Tiempo de primera respuesta
     preparation_time_seconds = db.Column(db.Integer)  # Tiempo de preparación
     
+    # Versión del negocio en la última escritura (feed de cambios)
+    change_seq = db.Column(db.BigInteger)
+    
+    # Concurrencia optimista: cada UPDATE verifica y aumenta la versión de la fila
+    version_id = db.Column(db.Integer, nullable=False, default=1)
+    
     # Relaciones
-    items = db.relationship('OrderItem', backref='order', lazy='dynamic', cascade='all, delete-orphan')
+    items = db.relationship('OrderItem', backref='order', lazy='select', cascade='all, delete-orphan')
     messages = db.relationship('Message', backref='order', lazy='dynamic', cascade='all, delete-orphan')
     payment = db.relationship('Payment', backref='order', uselist=False, cascade='all, delete-orphan')
     
+    __mapper_args__ = {'version_id_col': version_id}
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -54,21 +78,56 @@ class Order(db.Model):
             'customer': self.customer.to_dict() if self.customer else None,
             'status': self.status,
             'order_type': self.order_type,
-            'total_amount': float(self.total_amount),
+            'total_amount': self.total_amount,
             'delivery_address': self.delivery_address,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'accepted_at': self.accepted_at.isoformat() if self.accepted_at else None,
-            'preparing_at': self.preparing_at.isoformat() if self.preparing_at else None,
-            'ready_at': self.ready_at.isoformat() if self.ready_at else None,
-            'sent_at': self.sent_at.isoformat() if self.sent_at else None,
-            'paid_at': self.paid_at.isoformat() if self.paid_at else None,
-            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'accepted_at': self.accepted_at,
+            'preparing_at': self.preparing_at,
+            'ready_at': self.ready_at,
+            'sent_at': self.sent_at,
+            'paid_at': self.paid_at,
+            'delivered_at': self.delivered_at,
             'response_time_seconds': self.response_time_seconds,
             'preparation_time_seconds': self.preparation_time_seconds,
+            'version_id': self.version_id,
             'items': [item.to_dict() for item in self.items]
         }
     
+    def to_worker_dict(self):
+        """Proyección ligera para las vistas de cocina y reparto."""
+        customer = self.customer
+        return {
+            'id': self.id,
+            'order_number': self.order_number,
+            'status': self.status,
+            'order_type': self.order_type,
+            'total_amount': self.total_amount or 0,
+            'created_at': self.created_at,
+            'customer_name': (customer.name if customer else None) or 'Cliente',
+            'customer_phone': customer.phone if customer else None,
+            'delivery_address': self.delivery_address,
+            'delivery_notes': self.notes or '',
+            'version_id': self.version_id,
+            'items': [
+                {
+                    'product_name': item.product_name,
+                    'quantity': item.quantity,
+                    'unit_price': item.unit_price,
+                    'subtotal': item.subtotal
+                }
+                for item in self.items
+            ]
+        }
+    
     def __repr__(self):
         return f'<Order {self.order_number}>'
+
+
+# Los índices trigram necesitan la extensión pg_trgm antes de crear las tablas
+event.listen(
+    db.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
@@ -0,0 +1,124 @@
+"""
+Modelos del archivo histórico de pedidos.
+Copias de orders, order_items, messages y payments para pedidos cerrados o
+cancelados que ya no participan en el flujo operativo (ver ArchiveService).
+"""
+from datetime import datetime, timezone
+from app.extensions import db
+from app.data.models.order import Order
+
+
+class ArchivedOrder(db.Model):
+    """Pedido archivado (mismas columnas que Order)."""
+    __tablename__ = 'orders_archive'
+    __table_args__ = (
+        db.Index('ix_orders_archive_business_created', 'business_id', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_number = db.Column(db.String(20), nullable=False, index=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    order_type = db.Column(db.String(20))
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    delivery_address = db.Column(db.String(200))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    accepted_at = db.Column(db.DateTime)
+    preparing_at = db.Column(db.DateTime)
+    ready_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+    paid_at = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    response_time_seconds = db.Column(db.Integer)
+    preparation_time_seconds = db.Column(db.Integer)
+    change_seq = db.Column(db.BigInteger)
+    version_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Relaciones
+    business = db.relationship('Business')
+    customer = db.relationship('Customer')
+    items = db.relationship('ArchivedOrderItem', lazy='select')
+    payment = db.relationship('ArchivedPayment', uselist=False)
+
+    def to_dict(self):
+        data = Order.to_dict(self)
+        data['archived_at'] = self.archived_at
+        return data
+
+    def __repr__(self):
+        return f'<ArchivedOrder {self.order_number}>'
+
+
+class ArchivedOrderItem(db.Model):
+    """Ítem de un pedido archivado."""
+    __tablename__ = 'order_items_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'))
+    product_name = db.Column(db.String(100), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Numeric(10, 2), nullable=False)
+    subtotal = db.Column(db.Numeric(10, 2), nullable=False)
+    notes = db.Column(db.Text)
+
+    product = db.relationship('Product')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'quantity': self.quantity,
+            'unit_price': self.unit_price,
+            'subtotal': self.subtotal,
+            'notes': self.notes
+        }
+
+    def __repr__(self):
+        return f'<ArchivedOrderItem {self.product_name} x{self.quantity}>'
+
+
+class ArchivedMessage(db.Model):
+    """Mensaje de WhatsApp asociado a un pedido archivado."""
+    __tablename__ = 'messages_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), index=True)
+    whatsapp_message_id = db.Column(db.String(100))
+    sender_phone = db.Column(db.String(20), nullable=False)
+    receiver_phone = db.Column(db.String(20), nullable=False)
+    message_type = db.Column(db.String(20))
+    content = db.Column(db.Text)
+    media_url = db.Column(db.String(255))
+    direction = db.Column(db.String(10), nullable=False)
+    is_automated = db.Column(db.Boolean)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ArchivedMessage {self.id} - {self.direction}>'
+
+
+class ArchivedPayment(db.Model):
+    """Pago de un pedido archivado."""
+    __tablename__ = 'payments_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False, unique=True)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    payment_method = db.Column(db.String(20), nullable=False)
+    payment_status = db.Column(db.String(20))
+    transaction_id = db.Column(db.String(100))
+    stripe_payment_intent_id = db.Column(db.String(100))
+    payment_date = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ArchivedPayment {self.id} - {self.payment_status}>'
@@ -9,7 +9,7 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'))
     product_name = db.Column(db.String(100), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
@@ -27,8 +27,8 @@ class OrderItem(db.Model):
             'product_id': self.product_id,
             'product_name': self.product_name,
             'quantity': self.quantity,
-            'unit_price': float(self.unit_price),
-            'subtotal': float(self.subtotal),
+            'unit_price': self.unit_price,
+            'subtotal': self.subtotal,
             'notes': self.notes
         }
     
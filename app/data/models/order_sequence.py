@@ -0,0 +1,23 @@
+"""
+Modelo de Secuencia diaria de pedidos.
+"""
+from app.extensions import db
+
+
+class OrderSequence(db.Model):
+    """Contador diario de números de pedido por negocio."""
+    __tablename__ = 'order_sequences'
+
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'business_id': self.business_id,
+            'day': self.day,
+            'last_value': self.last_value
+        }
+
+    def __repr__(self):
+        return f'<OrderSequence {self.business_id} {self.day} = {self.last_value}>'
@@ -0,0 +1,104 @@
+"""
+Modelo de la proyección de lectura de pedidos.
+"""
+from app.extensions import db
+
+
+class OrderView(db.Model):
+    """
+    Una fila por pedido con lo que muestran el tablero y las vistas de trabajadores:
+    datos del cliente, resumen de ítems, totales y tiempos, sin JOINs al leer.
+
+    La mantiene OrderViewService en la misma transacción que escribe el pedido.
+    """
+    __tablename__ = 'order_views'
+    __table_args__ = (
+        # Tablero y vistas de trabajadores: WHERE business_id = ? AND status IN (...)
+        db.Index('ix_order_views_business_status_created', 'business_id', 'status', 'created_at'),
+        # Feed de cambios: WHERE business_id = ? AND change_seq > ?
+        db.Index('ix_order_views_business_change_seq', 'business_id', 'change_seq'),
+    )
+
+    order_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False)
+    order_number = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    order_type = db.Column(db.String(20))
+
+    # Cliente (copiado al escribir el pedido o al editar el cliente)
+    customer_id = db.Column(db.Integer)
+    customer_name = db.Column(db.String(100))
+    customer_phone = db.Column(db.String(20))
+
+    # Detalles y resumen de ítems: [{product_name, quantity, unit_price, subtotal}]
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    delivery_address = db.Column(db.String(200))
+    notes = db.Column(db.Text)
+    items = db.Column(db.JSON, nullable=False, default=list)
+
+    # Tiempos y métricas
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    accepted_at = db.Column(db.DateTime)
+    preparing_at = db.Column(db.DateTime)
+    ready_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+    paid_at = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    response_time_seconds = db.Column(db.Integer)
+    preparation_time_seconds = db.Column(db.Integer)
+
+    # Versiones del pedido (feed de cambios y concurrencia optimista)
+    change_seq = db.Column(db.BigInteger)
+    version_id = db.Column(db.Integer)
+
+    def to_dict(self):
+        """Tarjeta del tablero Kanban (mismas claves que OrderSchema para el dashboard)."""
+        return {
+            'id': self.order_id,
+            'order_number': self.order_number,
+            'business_id': self.business_id,
+            'customer_id': self.customer_id,
+            'customer': {
+                'id': self.customer_id,
+                'name': self.customer_name,
+                'phone': self.customer_phone
+            },
+            'status': self.status,
+            'order_type': self.order_type,
+            'total_amount': self.total_amount or 0,
+            'delivery_address': self.delivery_address,
+            'notes': self.notes,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'accepted_at': self.accepted_at,
+            'preparing_at': self.preparing_at,
+            'ready_at': self.ready_at,
+            'sent_at': self.sent_at,
+            'paid_at': self.paid_at,
+            'delivered_at': self.delivered_at,
+            'response_time_seconds': self.response_time_seconds,
+            'preparation_time_seconds': self.preparation_time_seconds,
+            'version_id': self.version_id,
+            'items': self.items or []
+        }
+
+    def to_worker_dict(self):
+        """Proyección para las vistas de cocina y reparto (igual a Order.to_worker_dict)."""
+        return {
+            'id': self.order_id,
+            'order_number': self.order_number,
+            'status': self.status,
+            'order_type': self.order_type,
+            'total_amount': self.total_amount or 0,
+            'created_at': self.created_at,
+            'customer_name': self.customer_name or 'Cliente',
+            'customer_phone': self.customer_phone,
+            'delivery_address': self.delivery_address,
+            'delivery_notes': self.notes or '',
+            'version_id': self.version_id,
+            'items': self.items or []
+        }
+
+    def __repr__(self):
+        return f'<OrderView {self.order_number} - {self.status}>'
@@ -24,12 +24,12 @@ class Payment(db.Model):
         return {
             'id': self.id,
             'order_id': self.order_id,
-            'amount': float(self.amount),
+            'amount': self.amount,
             'payment_method': self.payment_method,
             'payment_status': self.payment_status,
             'transaction_id': self.transaction_id,
-            'payment_date': self.payment_date.isoformat() if self.payment_date else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'payment_date': self.payment_date,
+            'created_at': self.created_at
         }
     
     def __repr__(self):
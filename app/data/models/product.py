@@ -10,13 +10,13 @@ class Product(db.Model):
     __tablename__ = 'products'
     
     id = db.Column(db.Integer, primary_key=True)
-    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
     category = db.Column(db.String(50))
     is_available = db.Column(db.Boolean, default=True)
-    stock_quantity = db.Column(db.Integer, default=0)
+    stock_quantity = db.Column(db.Integer, nullable=True)  # NULL = sin control de inventario
     image_url = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -27,7 +27,7 @@ class Product(db.Model):
             'business_id': self.business_id,
             'name': self.name,
             'description': self.description,
-            'price': float(self.price),
+            'price': self.price,
             'category': self.category,
             'is_available': self.is_available,
             'stock_quantity': self.stock_quantity,
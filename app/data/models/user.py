@@ -42,8 +42,8 @@ class User(UserMixin, db.Model):
             'phone': self.phone,
             'is_active': self.is_active,
             'is_admin': self.is_admin,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
+            'created_at': self.created_at,
+            'last_login': self.last_login
         }
     
     def get_id(self):
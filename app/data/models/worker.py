@@ -47,8 +47,8 @@ class Worker(UserMixin, db.Model):
             'phone': self.phone,
             'worker_type': self.worker_type,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
+            'created_at': self.created_at,
+            'last_login': self.last_login
         }
     
     def get_id(self):
@@ -1,5 +1,6 @@
 """
 Schemas para los modelos Order y OrderItem.
+Las respuestas de la API usan app.data.serializers (mismo JSON, más rápido).
 """
 from marshmallow import fields
 from app.extensions import ma
@@ -102,6 +102,7 @@ class OrderUpdateSchema(Schema):
         'received', 'preparing', 'ready', 'sent', 'paid', 'closed', 'cancelled'
     ]))
     notes = fields.Str()
+    version_id = fields.Int()  # Versión vista por el cliente (concurrencia optimista)
 
 
 class MessageSendSchema(Schema):
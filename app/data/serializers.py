@@ -0,0 +1,86 @@
+"""
+Serializadores rápidos de pedidos.
+
+Producen el mismo JSON que OrderSchema / OrderItemSchema, pero con una función
+de volcado por modelo generada una sola vez al importar el módulo a partir de
+sus columnas: sin introspección de campos ni validación por cada objeto.
+Marshmallow queda solo para validar datos de entrada.
+"""
+import decimal
+from sqlalchemy import Numeric, DateTime, Date, Time
+from app.data.models import Order, OrderItem, Customer, Product, Business
+
+
+def _to_decimal(value):
+    """Convierte a Decimal igual que fields.Decimal de marshmallow."""
+    if value is None or isinstance(value, decimal.Decimal):
+        return value
+    return decimal.Decimal(str(value))
+
+
+def compile_dumper(model, nested=None, exclude=()):
+    """
+    Genera una función `dump(obj) -> dict` para las columnas de un modelo.
+
+    Las fechas se emiten en ISO 8601 y los Numeric como Decimal, igual que el
+    SQLAlchemyAutoSchema equivalente (con include_fk=True).
+
+    Args:
+        model: Clase del modelo SQLAlchemy
+        nested: {atributo: (dumper, many)} para relaciones anidadas
+        exclude: Columnas o relaciones a omitir
+
+    Returns:
+        function: dump(obj) -> dict
+    """
+    nested = nested or {}
+    # Los atributos ya cargados viven en obj.__dict__; leerlos ahí evita el
+    # descriptor instrumentado. Si faltan (expirados o diferidos) se usa getattr.
+    lines = ['def dump(obj):', '    d = obj.__dict__']
+    entries = []
+
+    for position, column in enumerate(model.__table__.columns):
+        key = column.key
+        if key in exclude:
+            continue
+        var = f'v{position}'
+        lines.append(f'    {var} = d[{key!r}] if {key!r} in d else obj.{key}')
+        if isinstance(column.type, (DateTime, Date, Time)):
+            entries.append(f'{key!r}: {var}.isoformat() if {var} is not None else None')
+        elif isinstance(column.type, Numeric):
+            entries.append(f'{key!r}: _to_decimal({var})')
+        else:
+            entries.append(f'{key!r}: {var}')
+
+    namespace = {'_to_decimal': _to_decimal}
+    for position, (key, (dumper, many)) in enumerate(nested.items()):
+        if key in exclude:
+            continue
+        name = f'_dump_{key}'
+        namespace[name] = dumper
+        var = f'r{position}'
+        lines.append(f'    {var} = d[{key!r}] if {key!r} in d else obj.{key}')
+        if many:
+            entries.append(f'{key!r}: [{name}(child) for child in {var}]')
+        else:
+            entries.append(f'{key!r}: {name}({var}) if {var} is not None else None')
+
+    lines.append('    return {' + ', '.join(entries) + '}')
+    exec(compile('\n'.join(lines), f'<dump {model.__name__}>', 'exec'), namespace)
+    return namespace['dump']
+
+
+dump_customer = compile_dumper(Customer)
+dump_product = compile_dumper(Product)
+dump_business = compile_dumper(Business)
+dump_order_item = compile_dumper(OrderItem, nested={'product': (dump_product, False)})
+dump_order = compile_dumper(Order, nested={
+    'customer': (dump_customer, False),
+    'items': (dump_order_item, True),
+    'business': (dump_business, False)
+})
+
+
+def dump_orders(orders):
+    """Serializa una lista de pedidos (equivale a orders_schema.dump)."""
+    return [dump_order(order) for order in orders]
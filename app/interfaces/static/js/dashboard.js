@@ -109,37 +109,108 @@ async function loadDashboardData() {
 // API CALLS - Fetch Functions
 // ============================================================
 
+// Estado local del tablero, sincronizado con /api/orders/changes
+const boardOrders = new Map();
+let boardCursor = null;
+
 async function fetchOrders(status = null) {
+    if (!status) {
+        return syncBoardOrders();
+    }
+    
     try {
-        console.log('🔄 Fetching orders...', status ? `status=${status}` : 'all');
-        const url = status ? `/api/orders?status=${status}` : '/api/orders';
-        const response = await fetch(url, {
-            method: 'GET',
-            credentials: 'include',
-            headers: {
-                'Content-Type': 'application/json'
+        console.log('🔄 Fetching orders...', `status=${status}`);
+        const orders = [];
+        let data = null;
+        let cursor = null;
+        // Recorrer todas las páginas del estado siguiendo next_cursor
+        do {
+            const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+            const url = `/api/orders?status=${status}${cursorParam}`;
+            const response = await fetch(url, {
+                method: 'GET',
+                credentials: 'include',
+                headers: {
+                    'Content-Type': 'application/json'
+                }
+            });
+            
+            console.log('📦 Orders response status:', response.status);
+            
+            // Si no está autenticado, redirigir al login
+            if (response.status === 401) {
+                console.error('❌ Not authenticated, redirecting to login...');
+                window.location.href = '/login';
+                return { success: false, message: 'No autenticado' };
             }
-        });
-        
-        console.log('📦 Orders response status:', response.status);
-        
-        // Si no está autenticado, redirigir al login
-        if (response.status === 401) {
-            console.error('❌ Not authenticated, redirecting to login...');
-            window.location.href = '/login';
-            return { success: false, message: 'No autenticado' };
-        }
+            
+            data = await response.json();
+            console.log('📦 Orders data:', data);
+            
+            if (!response.ok) {
+                throw new Error(data.message || 'Error al cargar pedidos');
+            }
+            
+            orders.push(...data.orders);
+            cursor = data.next_cursor;
+        } while (cursor);
         
-        const data = await response.json();
-        console.log('📦 Orders data:', data);
+        return {
+            ...data,
+            orders: orders,
+            total: orders.length,
+            by_status: { ...data.by_status, [status]: orders.length },
+            next_cursor: null
+        };
+    } catch (error) {
+        console.error('❌ Error fetching orders:', error);
+        return { success: false, message: error.message };
+    }
+}
+
+async function syncBoardOrders() {
+    try {
+        let hasMore = false;
+        do {
+            const sinceParam = boardCursor !== null ? `&since=${boardCursor}` : '';
+            console.log('🔄 Syncing board...', boardCursor !== null ? `since=${boardCursor}` : 'full');
+            const response = await fetch(`/api/orders/changes?view=board${sinceParam}`, {
+                method: 'GET',
+                credentials: 'include',
+                headers: {
+                    'Content-Type': 'application/json'
+                }
+            });
+            
+            // Si no está autenticado, redirigir al login
+            if (response.status === 401) {
+                console.error('❌ Not authenticated, redirecting to login...');
+                window.location.href = '/login';
+                return { success: false, message: 'No autenticado' };
+            }
+            
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.message || 'Error al cargar pedidos');
+            }
+            
+            if (data.full) boardOrders.clear();
+            data.orders.forEach(order => boardOrders.set(order.id, order));
+            data.removed.forEach(orderId => boardOrders.delete(orderId));
+            boardCursor = data.cursor;
+            hasMore = data.has_more;
+        } while (hasMore);
         
-        if (!response.ok) {
-            throw new Error(data.message || 'Error al cargar pedidos');
-        }
+        const orders = Array.from(boardOrders.values())
+            .sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+        const byStatus = {};
+        orders.forEach(order => {
+            byStatus[order.status] = (byStatus[order.status] || 0) + 1;
+        });
         
-        return data;
+        return { success: true, orders, by_status: byStatus };
     } catch (error) {
-        console.error('❌ Error fetching orders:', error);
+        console.error('❌ Error syncing board:', error);
         return { success: false, message: error.message };
     }
 }
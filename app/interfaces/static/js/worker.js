@@ -50,15 +50,22 @@ async function loadWorkerOrders() {
         let statusToLoad = workerType === 'planta' ? ['received', 'preparing'] : ['ready', 'sent'];
         const allOrders = [];
         for (const status of statusToLoad) {
-            const response = await fetch(`/api/orders?status=${status}`, {
-                method: 'GET',
-                headers: { 'Content-Type': 'application/json' },
-                credentials: 'include'
-            });
-            const data = await response.json();
-            if (response.ok && data.orders) {
+            // Recorrer todas las páginas del estado siguiendo next_cursor
+            let cursor = null;
+            do {
+                const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+                const response = await fetch(`/api/orders?status=${status}${cursorParam}`, {
+                    method: 'GET',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'include'
+                });
+                const data = await response.json();
+                if (!response.ok || !data.orders) {
+                    break;
+                }
                 allOrders.push(...data.orders);
-            }
+                cursor = data.next_cursor;
+            } while (cursor);
         }
         renderWorkerKanban(allOrders);
         updateLastRefreshTime();
@@ -4,24 +4,38 @@
  */
 
 let orders = [];
+const ordersById = new Map();
+let changesCursor = null;
 
 // Cargar pedidos al iniciar
 document.addEventListener('DOMContentLoaded', function() {
     loadOrders();
-    // Actualizar cada 30 segundos
+    // Actualizar cada 30 segundos (solo se descargan los pedidos que cambiaron)
     setInterval(loadOrders, 30000);
 });
 
 /**
- * Carga los pedidos desde el API
+ * Sincroniza los pedidos con el feed de cambios del API.
+ * La primera carga trae la vista completa; después solo llegan los cambios.
  */
 async function loadOrders() {
     try {
-        const response = await fetch('/api/orders/worker/delivery');
-        if (!response.ok) throw new Error('Error al cargar pedidos');
+        let hasMore = false;
+        do {
+            const sinceParam = changesCursor !== null ? `&since=${changesCursor}` : '';
+            const response = await fetch(`/api/orders/changes?view=delivery${sinceParam}`);
+            if (!response.ok) throw new Error('Error al cargar pedidos');
+            
+            const data = await response.json();
+            if (data.full) ordersById.clear();
+            (data.orders || []).forEach(order => ordersById.set(order.id, order));
+            (data.removed || []).forEach(orderId => ordersById.delete(orderId));
+            changesCursor = data.cursor;
+            hasMore = data.has_more;
+        } while (hasMore);
         
-        const data = await response.json();
-        orders = data.orders || [];
+        orders = Array.from(ordersById.values())
+            .sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
         renderOrders();
     } catch (error) {
         console.error('Error:', error);
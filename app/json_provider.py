@@ -0,0 +1,89 @@
+"""
+Proveedor JSON de la aplicación.
+Usa orjson si está instalado y json de la biblioteca estándar si no; en ambos
+casos Decimal se emite como número y las fechas en ISO 8601.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, time
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def _default(o):
+    """Tipos que ningún codificador maneja por sí solo."""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def _stdlib_default(o):
+    """Lo que orjson hace de forma nativa, para el respaldo con json."""
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    return _default(o)
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Reemplaza al DefaultJSONProvider de Flask (jsonify, request.get_json).
+
+    Mantiene sus opciones: llaves ordenadas (sort_keys) y salida indentada en
+    modo debug salvo que compact sea True.
+    """
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    @property
+    def backend(self):
+        """Nombre del codificador en uso ('orjson' o 'json')."""
+        return 'orjson' if orjson is not None else 'json'
+
+    def _indent(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dumps_bytes(self, obj):
+        """Codifica `obj` a JSON en UTF-8."""
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if self._indent():
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_default, option=option)
+        return self.dumps(obj).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('default', _stdlib_default)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('ensure_ascii', False)
+        if self._indent():
+            kwargs.setdefault('indent', 2)
+        else:
+            kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
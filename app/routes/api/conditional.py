@@ -0,0 +1,54 @@
+"""
+GET condicionales (ETag / If-None-Match) para los endpoints de la API.
+"""
+from functools import wraps
+from flask import request, current_app, make_response
+from flask_login import current_user
+from app.services.etag_service import ETagService
+
+
+def conditional_get(scope, time_dependent=False):
+    """
+    Responde 304 Not Modified si los datos del negocio no cambiaron desde el ETag del cliente.
+
+    Debe ir debajo de @login_required. El ETag se calcula antes de ejecutar la vista:
+    si una escritura ocurre en medio, la respuesta queda etiquetada con la versión
+    anterior y el siguiente poll simplemente la vuelve a descargar.
+
+    Args:
+        scope: Nombre del endpoint para el ETag y las estadísticas
+        time_dependent: La respuesta depende de la hora actual; el ETag expira
+            cada ETAG_TIME_BUCKET_SECONDS segundos
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            business = getattr(current_user, 'business', None)
+            if business is None:
+                return view(*args, **kwargs)
+
+            ttl = current_app.config.get('ETAG_TIME_BUCKET_SECONDS', 60) if time_dependent else None
+            variant = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+            etag = ETagService.build_etag(
+                business_id=business.id,
+                scope=scope,
+                user_id=current_user.get_id(),
+                variant=variant,
+                ttl=ttl
+            )
+
+            # Comparación débil (RFC 9110): la versión comprimida lleva W/"..."
+            if request.if_none_match.contains_weak(etag):
+                ETagService.record(scope, not_modified=True)
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            ETagService.record(scope, not_modified=False)
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
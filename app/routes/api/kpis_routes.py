@@ -4,12 +4,17 @@ Blueprint de API para KPIs y métricas.
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.services.kpi_service import KPIService
+from app.services.kpi_cache_service import KPICacheService
+from app.services.etag_service import ETagService
+from app.services.ai_service import AIAgentService
+from app.routes.api.conditional import conditional_get
 
 kpis_api_bp = Blueprint('kpis_api', __name__, url_prefix='/api/kpis')
 
 
 @kpis_api_bp.route('/dashboard', methods=['GET'])
 @login_required
+@conditional_get('kpis_dashboard', time_dependent=True)
 def get_dashboard_metrics():
     """Obtiene métricas del dashboard."""
     try:
@@ -19,7 +24,11 @@ def get_dashboard_metrics():
                 'message': 'Usuario no tiene un negocio asociado'
             }), 400
         
-        metrics = KPIService.get_dashboard_metrics(current_user.business.id)
+        business_id = current_user.business.id
+        metrics = KPICacheService.get_or_compute(
+            business_id, 'dashboard', None,
+            lambda: KPIService.get_dashboard_metrics(business_id)
+        )
         
         return jsonify({
             'success': True,
@@ -46,9 +55,10 @@ def get_kpi_comparisons():
         
         period_days = request.args.get('period_days', 30, type=int)
         
-        comparisons = KPIService.get_kpi_comparisons(
-            current_user.business.id,
-            period_days=period_days
+        business_id = current_user.business.id
+        comparisons = KPICacheService.get_or_compute(
+            business_id, 'comparisons', period_days,
+            lambda: KPIService.get_kpi_comparisons(business_id, period_days=period_days)
         )
         
         return jsonify({
@@ -77,9 +87,10 @@ def get_operational_metrics():
         
         period_days = request.args.get('period_days', 30, type=int)
         
-        metrics = KPIService.get_operational_metrics(
-            current_user.business.id,
-            period_days=period_days
+        business_id = current_user.business.id
+        metrics = KPICacheService.get_or_compute(
+            business_id, 'operational', period_days,
+            lambda: KPIService.get_operational_metrics(business_id, period_days=period_days)
         )
         
         return jsonify({
@@ -108,9 +119,10 @@ def get_financial_impact():
         
         period_days = request.args.get('period_days', 30, type=int)
         
-        impact = KPIService.get_financial_impact(
-            current_user.business.id,
-            period_days=period_days
+        business_id = current_user.business.id
+        impact = KPICacheService.get_or_compute(
+            business_id, 'financial', period_days,
+            lambda: KPIService.get_financial_impact(business_id, period_days=period_days)
         )
         
         return jsonify({
@@ -139,15 +151,17 @@ def get_orders_by_hour():
         
         days = request.args.get('days', 7, type=int)
         
-        distribution = KPIService.get_orders_by_hour(
-            current_user.business.id,
-            days=days
+        business_id = current_user.business.id
+        distribution = KPICacheService.get_or_compute(
+            business_id, 'orders_by_hour', days,
+            lambda: KPIService.get_orders_by_hour(business_id, days=days)
         )
         
         return jsonify({
             'success': True,
             'distribution': distribution,
-            'days_analyzed': days
+            'days_analyzed': days,
+            'timezone': KPIService.get_business_timezone(business_id)
         }), 200
         
     except Exception as e:
@@ -157,6 +171,39 @@ def get_orders_by_hour():
         }), 500
 
 
+@kpis_api_bp.route('/orders-heatmap', methods=['GET'])
+@login_required
+def get_orders_heatmap():
+    """Obtiene pedidos por día de la semana (0 = lunes) y hora local."""
+    try:
+        if not current_user.business:
+            return jsonify({
+                'success': False,
+                'message': 'Usuario no tiene un negocio asociado'
+            }), 400
+        
+        days = request.args.get('days', 28, type=int)
+        
+        business_id = current_user.business.id
+        heatmap = KPICacheService.get_or_compute(
+            business_id, 'orders_heatmap', days,
+            lambda: KPIService.get_orders_heatmap(business_id, days=days)
+        )
+        
+        return jsonify({
+            'success': True,
+            'heatmap': heatmap,
+            'days_analyzed': days,
+            'timezone': KPIService.get_business_timezone(business_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error obteniendo mapa de calor: {str(e)}'
+        }), 500
+
+
 @kpis_api_bp.route('/summary', methods=['GET'])
 @login_required
 def get_complete_summary():
@@ -171,13 +218,14 @@ def get_complete_summary():
         period_days = request.args.get('period_days', 30, type=int)
         business_id = current_user.business.id
         
-        summary = {
-            'dashboard': KPIService.get_dashboard_metrics(business_id),
-            'comparisons': KPIService.get_kpi_comparisons(business_id, period_days),
-            'operational': KPIService.get_operational_metrics(business_id, period_days),
-            'financial': KPIService.get_financial_impact(business_id, period_days),
-            'hourly_distribution': KPIService.get_orders_by_hour(business_id, 7)
-        }
+        summary = KPICacheService.get_or_compute(
+            business_id, 'summary', period_days,
+            lambda: {
+                'dashboard': KPIService.get_dashboard_metrics(business_id),
+                **KPIService.get_kpi_summary(business_id, period_days),
+                'hourly_distribution': KPIService.get_orders_by_hour(business_id, 7)
+            }
+        )
         
         return jsonify({
             'success': True,
@@ -190,3 +238,54 @@ def get_complete_summary():
             'success': False,
             'message': f'Error obteniendo resumen: {str(e)}'
         }), 500
+
+
+@kpis_api_bp.route('/cache-stats', methods=['GET'])
+@login_required
+def get_cache_stats():
+    """Obtiene aciertos y fallos de la caché de KPIs por endpoint (desde el inicio del proceso)."""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': KPICacheService.get_stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error obteniendo estadísticas: {str(e)}'
+        }), 500
+
+
+@kpis_api_bp.route('/ai-stats', methods=['GET'])
+@login_required
+def get_ai_stats():
+    """Obtiene los mensajes del agente IA respondidos sin llamar al LLM (desde el inicio del proceso)."""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': AIAgentService.get_stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error obteniendo estadísticas: {str(e)}'
+        }), 500
+
+
+@kpis_api_bp.route('/etag-stats', methods=['GET'])
+@login_required
+def get_etag_stats():
+    """Obtiene la proporción de respuestas 304 por endpoint (desde el inicio del proceso)."""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': ETagService.get_stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error obteniendo estadísticas: {str(e)}'
+        }), 500
@@ -1,17 +1,36 @@
 """
 Blueprint de API para gestión de pedidos.
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
-from app.services.order_service import OrderService
-from app.data.schemas import order_schema, orders_schema, order_create_schema, order_update_schema
+from app.extensions import db
+from app.services.order_service import OrderService, KITCHEN_STATUSES, DELIVERY_STATUSES
+from app.services.order_state_machine import (
+    OrderStateMachine, TransitionError, WORKER_TRANSITIONS, OWNER_TRANSITIONS
+)
+from app.services.change_feed_service import ChangeFeedService
+from app.routes.api.conditional import conditional_get
+from app.data.schemas import order_create_schema, order_update_schema
+from app.data.serializers import dump_order, dump_orders
 from marshmallow import ValidationError
 
 orders_api_bp = Blueprint('orders_api', __name__, url_prefix='/api/orders')
 
 
+def _expected_version(data):
+    """Versión del pedido que vio el cliente (campo opcional `version_id` del body)."""
+    value = (data or {}).get('version_id')
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise TransitionError('version_id inválido')
+
+
 @orders_api_bp.route('/', methods=['GET'])
 @login_required
+@conditional_get('orders')
 def get_orders():
     """Obtiene los pedidos del negocio del usuario actual."""
     try:
@@ -25,14 +44,20 @@ def get_orders():
         # Parámetros de consulta
         status = request.args.get('status')
         limit = request.args.get('limit', type=int)
-        offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
         
-        orders = OrderService.get_orders_by_business(
-            business_id=current_user.business.id,
-            status=status,
-            limit=limit,
-            offset=offset
-        )
+        try:
+            orders, next_cursor = OrderService.get_orders_by_business(
+                business_id=current_user.business.id,
+                status=status,
+                limit=limit,
+                cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
         # Contar pedidos por estado
         by_status = {
@@ -50,9 +75,10 @@ def get_orders():
         
         return jsonify({
             'success': True,
-            'orders': orders_schema.dump(orders),
+            'orders': dump_orders(orders),
             'total': len(orders),
-            'by_status': by_status
+            'by_status': by_status,
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -62,14 +88,100 @@ def get_orders():
         }), 500
 
 
+@orders_api_bp.route('/board', methods=['GET'])
+@login_required
+@conditional_get('board')
+def get_board():
+    """Obtiene el tablero Kanban completo (pedidos activos y conteos por columna)."""
+    try:
+        if not current_user.business:
+            return jsonify({
+                'success': False,
+                'message': 'Usuario no tiene un negocio asociado'
+            }), 400
+        
+        orders, by_status = OrderService.get_board_snapshot(current_user.business.id)
+        
+        return jsonify({
+            'success': True,
+            'orders': [order.to_dict() for order in orders],
+            'total': len(orders),
+            'by_status': by_status
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error obteniendo tablero: {str(e)}'
+        }), 500
+
+
+@orders_api_bp.route('/changes', methods=['GET'])
+@login_required
+def get_order_changes():
+    """
+    Feed incremental de pedidos.
+    Query: ?view=board|kitchen|delivery&since=<cursor>
+    Sin `since` retorna la vista completa y el cursor inicial.
+    """
+    try:
+        if not current_user.business:
+            return jsonify({
+                'success': False,
+                'message': 'Usuario no tiene un negocio asociado'
+            }), 400
+        
+        view = request.args.get('view', 'board')
+        if view not in ChangeFeedService.VIEWS:
+            return jsonify({
+                'success': False,
+                'message': f'Vista no válida: {view}'
+            }), 400
+        
+        since = request.args.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'message': 'Cursor de cambios inválido'
+                }), 400
+        
+        changes = ChangeFeedService.get_changes(
+            business_id=current_user.business.id,
+            view=view,
+            since=since,
+            limit=current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+        )
+        
+        if view == 'board':
+            orders_data = [order.to_dict() for order in changes['orders']]
+        else:
+            orders_data = [order.to_worker_dict() for order in changes['orders']]
+        
+        return jsonify({
+            'success': True,
+            'orders': orders_data,
+            'removed': changes['removed'],
+            'cursor': str(changes['cursor']),
+            'has_more': changes['has_more'],
+            'full': since is None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error obteniendo cambios: {str(e)}'
+        }), 500
+
+
 @orders_api_bp.route('/<int:order_id>', methods=['GET'])
 @login_required
 def get_order(order_id):
-    """Obtiene un pedido específico."""
+    """Obtiene un pedido específico (vivo o archivado)."""
     try:
-        from app.data.models import Order
-        
-        order = Order.query.get(order_id)
+        order = OrderService.get_order(order_id)
         
         if not order:
             return jsonify({
@@ -86,7 +198,7 @@ def get_order(order_id):
         
         return jsonify({
             'success': True,
-            'order': order_schema.dump(order)
+            'order': dump_order(order)
         }), 200
         
     except Exception as e:
@@ -133,7 +245,7 @@ def create_order():
             return jsonify({
                 'success': True,
                 'message': message,
-                'order': order_schema.dump(order)
+                'order': dump_order(order)
             }), 201
         else:
             return jsonify({
@@ -159,22 +271,6 @@ def create_order():
 def update_order(order_id):
     """Actualiza un pedido."""
     try:
-        from app.data.models import Order
-        
-        order = Order.query.get(order_id)
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Pedido no encontrado'
-            }), 404
-        
-        if order.business_id != current_user.business.id:
-            return jsonify({
-                'success': False,
-                'message': 'No autorizado'
-            }), 403
-        
         data = request.get_json()
         validated_data = order_update_schema.load(data)
         
@@ -184,7 +280,9 @@ def update_order(order_id):
             success, message, updated_order = OrderService.update_order_status(
                 order_id=order_id,
                 new_status=new_status,
-                user_id=current_user.id
+                user_id=current_user.id,
+                business_id=current_user.business.id,
+                expected_version=validated_data.get('version_id')
             )
             
             if success:
@@ -203,7 +301,7 @@ def update_order(order_id):
                 return jsonify({
                     'success': True,
                     'message': message,
-                    'order': order_schema.dump(updated_order)
+                    'order': dump_order(updated_order)
                 }), 200
             else:
                 return jsonify({
@@ -216,6 +314,11 @@ def update_order(order_id):
             'message': 'No hay campos para actualizar'
         }), 400
         
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
     except ValidationError as e:
         return jsonify({
             'success': False,
@@ -301,7 +404,7 @@ def get_orders_by_status():
 @orders_api_bp.route('/by-number/<string:order_number>', methods=['GET'])
 @login_required
 def get_order_by_number(order_number):
-    """Obtiene un pedido por su número."""
+    """Obtiene un pedido por su número (vivo o archivado)."""
     try:
         order = OrderService.get_order_by_number(order_number)
         
@@ -319,7 +422,7 @@ def get_order_by_number(order_number):
         
         return jsonify({
             'success': True,
-            'order': order_schema.dump(order)
+            'order': dump_order(order)
         }), 200
         
     except Exception as e:
@@ -328,6 +431,46 @@ def get_order_by_number(order_number):
             'message': f'Error obteniendo pedido: {str(e)}'
         }), 500
 
+@orders_api_bp.route('/search', methods=['GET'])
+@login_required
+def search_orders():
+    """
+    Busca pedidos por prefijo del número, teléfono (incluye `tg:`), nombre del cliente o dirección.
+    Query: ?q=<texto>&limit=25&cursor=<cursor>
+    """
+    try:
+        if not current_user.business:
+            return jsonify({
+                'success': False,
+                'message': 'Usuario no tiene un negocio asociado'
+            }), 400
+        
+        try:
+            orders, next_cursor = OrderService.search_orders(
+                business_id=current_user.business.id,
+                query=request.args.get('q', ''),
+                limit=request.args.get('limit', type=int),
+                cursor=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'orders': dump_orders(orders),
+            'total': len(orders),
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error buscando pedidos: {str(e)}'
+        }), 500
+
 
 # ==================== ENDPOINTS PARA TRABAJADORES ====================
 
@@ -340,9 +483,7 @@ def get_order_by_number(order_number):
 def accept_to_preparing(order_id):
     """Acepta un pedido recibido y lo pasa a preparación (trabajador en planta)."""
     try:
-        from app.data.models import Order, Worker
-        from datetime import datetime, timezone
-        from app.extensions import db
+        from app.data.models import Worker
         
         # Verificar que sea trabajador en planta
         if not isinstance(current_user, Worker) or current_user.worker_type != 'planta':
@@ -351,43 +492,26 @@ def accept_to_preparing(order_id):
                 'message': 'Solo trabajadores en planta pueden aceptar pedidos'
             }), 403
         
-        order = Order.query.get(order_id)
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Pedido no encontrado'
-            }), 404
-        
-        if order.business_id != current_user.business_id:
-            return jsonify({
-                'success': False,
-                'message': 'No autorizado'
-            }), 403
-        
-        if order.status != 'received':
-            return jsonify({
-                'success': False,
-                'message': f'El pedido debe estar en "recibido" (actualmente: {order.status})'
-            }), 400
-        
-        # Cambiar de received → preparing
-        order.status = 'preparing'
-        order.accepted_at = lambda: datetime.now(timezone.utc)()
-        
-        # Calcular tiempo de respuesta
-        if order.created_at:
-            time_diff = order.accepted_at - order.created_at
-            order.response_time_seconds = int(time_diff.total_seconds())
-        
-        db.session.commit()
+        # Cambiar de received → preparing (registra accepted_at y tiempo de respuesta)
+        order, _ = OrderStateMachine.transition(
+            order_id,
+            'preparing',
+            business_id=current_user.business_id,
+            allowed_transitions={'received': ('preparing',)},
+            expected_version=_expected_version(request.get_json(silent=True))
+        )
         
         return jsonify({
             'success': True,
             'message': 'Pedido aceptado y pasado a preparación',
-            'order': order_schema.dump(order)
+            'order': dump_order(order)
         }), 200
         
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -401,10 +525,8 @@ def accept_to_preparing(order_id):
 def mark_order_ready(order_id):
     """Marca un pedido como listo (trabajador en planta)."""
     try:
-        from app.data.models import Order, Worker
+        from app.data.models import Worker
         from app.services.whatsapp_service import WhatsAppService
-        from datetime import datetime, timezone
-        from app.extensions import db
         
         # Verificar que sea trabajador en planta
         if not isinstance(current_user, Worker) or current_user.worker_type != 'planta':
@@ -413,36 +535,14 @@ def mark_order_ready(order_id):
                 'message': 'Solo trabajadores en planta pueden marcar pedidos como listos'
             }), 403
         
-        order = Order.query.get(order_id)
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Pedido no encontrado'
-            }), 404
-        
-        if order.business_id != current_user.business_id:
-            return jsonify({
-                'success': False,
-                'message': 'No autorizado'
-            }), 403
-        
-        if order.status != 'preparing':
-            return jsonify({
-                'success': False,
-                'message': f'El pedido debe estar en preparación (actualmente: {order.status})'
-            }), 400
-        
-        # Cambiar de preparing → ready
-        order.status = 'ready'
-        order.ready_at = lambda: datetime.now(timezone.utc)()
-        
-        # Calcular tiempo de preparación
-        if order.accepted_at:
-            time_diff = order.ready_at - order.accepted_at
-            order.preparation_time_seconds = int(time_diff.total_seconds())
-        
-        db.session.commit()
+        # Cambiar de preparing → ready (registra ready_at y tiempo de preparación)
+        order, _ = OrderStateMachine.transition(
+            order_id,
+            'ready',
+            business_id=current_user.business_id,
+            allowed_transitions={'preparing': ('ready',)},
+            expected_version=_expected_version(request.get_json(silent=True))
+        )
         
         # Enviar notificación WhatsApp al cliente
         notification_sent = False
@@ -461,10 +561,15 @@ def mark_order_ready(order_id):
         return jsonify({
             'success': True,
             'message': 'Pedido marcado como listo',
-            'order': order_schema.dump(order),
+            'order': dump_order(order),
             'notification_sent': notification_sent
         }), 200
         
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -478,8 +583,7 @@ def mark_order_ready(order_id):
 def cancel_to_previous(order_id):
     """Cancela y devuelve al estado anterior (trabajadores)."""
     try:
-        from app.data.models import Order, Worker
-        from app.extensions import db
+        from app.data.models import Worker
         
         # Verificar que sea trabajador
         if not isinstance(current_user, Worker):
@@ -488,55 +592,24 @@ def cancel_to_previous(order_id):
                 'message': 'Solo trabajadores pueden cancelar pedidos'
             }), 403
         
-        order = Order.query.get(order_id)
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Pedido no encontrado'
-            }), 404
-        
-        if order.business_id != current_user.business_id:
-            return jsonify({
-                'success': False,
-                'message': 'No autorizado'
-            }), 403
-        
-        # Mapa de cancelaciones (estado_actual → estado_anterior)
-        cancel_map = {
-            'preparing': 'received',
-            'ready': 'preparing',
-            'sent': 'ready',
-            'paid': 'sent'
-        }
-        
-        if order.status not in cancel_map:
-            return jsonify({
-                'success': False,
-                'message': f'No se puede cancelar un pedido en estado: {order.status}'
-            }), 400
-        
-        previous_status = cancel_map[order.status]
-        order.status = previous_status
-        
-        # Limpiar timestamps según el nuevo estado
-        if previous_status == 'received':
-            order.accepted_at = None
-            order.response_time_seconds = None
-        elif previous_status == 'preparing':
-            order.ready_at = None
-            order.preparation_time_seconds = None
-        elif previous_status == 'ready':
-            order.delivered_at = None
-        
-        db.session.commit()
+        # Devolver a la columna anterior y limpiar los tiempos del estado deshecho
+        order, _ = OrderStateMachine.revert(
+            order_id,
+            business_id=current_user.business_id,
+            expected_version=_expected_version(request.get_json(silent=True))
+        )
         
         return jsonify({
             'success': True,
-            'message': f'Pedido devuelto a {previous_status}',
-            'order': order_schema.dump(order)
+            'message': f'Pedido devuelto a {order.status}',
+            'order': dump_order(order)
         }), 200
         
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -554,9 +627,7 @@ def cancel_to_previous(order_id):
 def accept_to_sent(order_id):
     """Acepta un pedido listo para envío (trabajador repartidor)."""
     try:
-        from app.data.models import Order, Worker
-        from datetime import datetime, timezone
-        from app.extensions import db
+        from app.data.models import Worker
         
         # Verificar que sea trabajador repartidor
         if not isinstance(current_user, Worker) or current_user.worker_type != 'repartidor':
@@ -565,38 +636,26 @@ def accept_to_sent(order_id):
                 'message': 'Solo repartidores pueden aceptar pedidos para envío'
             }), 403
         
-        order = Order.query.get(order_id)
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Pedido no encontrado'
-            }), 404
-        
-        if order.business_id != current_user.business_id:
-            return jsonify({
-                'success': False,
-                'message': 'No autorizado'
-            }), 403
-        
-        if order.status != 'ready':
-            return jsonify({
-                'success': False,
-                'message': f'El pedido debe estar listo (actualmente: {order.status})'
-            }), 400
-        
         # Cambiar de ready → sent
-        order.status = 'sent'
-        order.delivered_at = lambda: datetime.now(timezone.utc)()
-        
-        db.session.commit()
+        order, _ = OrderStateMachine.transition(
+            order_id,
+            'sent',
+            business_id=current_user.business_id,
+            allowed_transitions={'ready': ('sent',)},
+            expected_version=_expected_version(request.get_json(silent=True))
+        )
         
         return jsonify({
             'success': True,
             'message': 'Pedido aceptado para envío',
-            'order': order_schema.dump(order)
+            'order': dump_order(order)
         }), 200
         
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -610,9 +669,7 @@ def accept_to_sent(order_id):
 def mark_order_paid(order_id):
     """Marca un pedido como pagado y lo cierra automáticamente (trabajador repartidor)."""
     try:
-        from app.data.models import Order, Worker
-        from datetime import datetime, timezone
-        from app.extensions import db
+        from app.data.models import Worker
         
         # Verificar que sea trabajador repartidor
         if not isinstance(current_user, Worker) or current_user.worker_type != 'repartidor':
@@ -621,37 +678,26 @@ def mark_order_paid(order_id):
                 'message': 'Solo repartidores pueden marcar pedidos como pagados'
             }), 403
         
-        order = Order.query.get(order_id)
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Pedido no encontrado'
-            }), 404
-        
-        if order.business_id != current_user.business_id:
-            return jsonify({
-                'success': False,
-                'message': 'No autorizado'
-            }), 403
-        
-        if order.status != 'sent':
-            return jsonify({
-                'success': False,
-                'message': f'El pedido debe estar enviado (actualmente: {order.status})'
-            }), 400
-        
-        # Cambiar de sent → paid → closed automáticamente
-        order.status = 'closed'  # Va directo a closed
-        
-        db.session.commit()
+        # Cambiar de sent → closed directamente (registra paid_at y delivered_at)
+        order, _ = OrderStateMachine.transition(
+            order_id,
+            'closed',
+            business_id=current_user.business_id,
+            allowed_transitions={'sent': ('closed',)},
+            expected_version=_expected_version(request.get_json(silent=True))
+        )
         
         return jsonify({
             'success': True,
             'message': 'Pedido marcado como pagado y cerrado',
-            'order': order_schema.dump(order)
+            'order': dump_order(order)
         }), 200
         
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -675,6 +721,7 @@ def cancel_order_worker(order_id):
 
 @orders_api_bp.route('/worker/kitchen', methods=['GET'])
 @login_required
+@conditional_get('kitchen')
 def get_kitchen_orders():
     """
     Obtiene pedidos para trabajadores de cocina.
@@ -695,48 +742,12 @@ def get_kitchen_orders():
                 'message': 'Acceso solo para trabajadores de cocina'
             }), 403
         
-        # Obtener pedidos en estados relevantes para cocina
-        business_id = current_user.business_id
-        
-        received_orders = OrderService.get_orders_by_business(
-            business_id=business_id,
-            status='received'
-        )
-        
-        preparing_orders = OrderService.get_orders_by_business(
-            business_id=business_id,
-            status='preparing'
-        )
-        
-        ready_orders = OrderService.get_orders_by_business(
-            business_id=business_id,
-            status='ready'
+        # Obtener pedidos en estados relevantes para cocina (una sola consulta)
+        orders = OrderService.get_orders_for_statuses(
+            business_id=current_user.business_id,
+            statuses=KITCHEN_STATUSES
         )
-        
-        # Combinar todos los pedidos
-        all_orders = received_orders + preparing_orders + ready_orders
-        
-        # Serializar con información completa
-        orders_data = []
-        for order in all_orders:
-            order_dict = order_schema.dump(order)
-            # Agregar información del cliente
-            if order.customer:
-                # Customers store name as `name`; fall back to `full_name` if ever present
-                customer_name = getattr(order.customer, 'name', None) or getattr(order.customer, 'full_name', None) or 'Cliente'
-                order_dict['customer_name'] = customer_name
-                order_dict['customer_phone'] = order.customer.phone
-            # Agregar items
-            order_dict['items'] = [
-                {
-                    'product_name': item.product.name if item.product else 'Producto',
-                    'quantity': item.quantity,
-                    'unit_price': float(item.unit_price),
-                    'subtotal': float(item.subtotal)
-                }
-                for item in order.items
-            ]
-            orders_data.append(order_dict)
+        orders_data = [order.to_worker_dict() for order in orders]
         
         return jsonify({
             'success': True,
@@ -753,6 +764,7 @@ def get_kitchen_orders():
 
 @orders_api_bp.route('/worker/delivery', methods=['GET'])
 @login_required
+@conditional_get('delivery')
 def get_delivery_orders():
     """
     Obtiene pedidos para repartidores.
@@ -773,50 +785,12 @@ def get_delivery_orders():
                 'message': 'Acceso solo para repartidores'
             }), 403
         
-        # Obtener pedidos en estados relevantes para repartidor
-        business_id = current_user.business_id
-        
-        ready_orders = OrderService.get_orders_by_business(
-            business_id=business_id,
-            status='ready'
-        )
-        
-        sent_orders = OrderService.get_orders_by_business(
-            business_id=business_id,
-            status='sent'
+        # Obtener pedidos en estados relevantes para repartidor (una sola consulta)
+        orders = OrderService.get_orders_for_statuses(
+            business_id=current_user.business_id,
+            statuses=DELIVERY_STATUSES
         )
-        
-        paid_orders = OrderService.get_orders_by_business(
-            business_id=business_id,
-            status='paid'
-        )
-        
-        # Combinar todos los pedidos
-        all_orders = ready_orders + sent_orders + paid_orders
-        
-        # Serializar con información completa
-        orders_data = []
-        for order in all_orders:
-            order_dict = order_schema.dump(order)
-            order_dict['total_amount'] = float(order.total_amount or 0)
-            # Agregar información del cliente
-            if order.customer:
-                customer_name = getattr(order.customer, 'name', None) or getattr(order.customer, 'full_name', None) or 'Cliente'
-                order_dict['customer_name'] = customer_name
-                order_dict['customer_phone'] = order.customer.phone
-            # Agregar dirección de entrega
-            order_dict['delivery_address'] = order.delivery_address or 'No especificada'
-            order_dict['delivery_notes'] = order.notes or ''
-            # Agregar items (opcional para repartidor, pero útil)
-            order_dict['items'] = [
-                {
-                    'product_name': item.product.name if item.product else 'Producto',
-                    'quantity': item.quantity,
-                    'subtotal': float(item.subtotal)
-                }
-                for item in order.items
-            ]
-            orders_data.append(order_dict)
+        orders_data = [order.to_worker_dict() for order in orders]
         
         return jsonify({
             'success': True,
@@ -836,7 +810,7 @@ def get_delivery_orders():
 def update_order_status_worker(order_id):
     """
     Actualiza el estado de un pedido (para trabajadores).
-    Body: { "status": "preparing|ready|sent|paid" }
+    Body: { "status": "preparing|ready|sent|paid", "version_id": 3 (opcional) }
     """
     try:
         # Verificar que sea un trabajador
@@ -855,76 +829,125 @@ def update_order_status_worker(order_id):
                 'message': 'Estado requerido'
             }), 400
         
-        # Obtener el pedido
-        from app.data.models import Order
-        order = Order.query.get(order_id)
-        
-        if not order:
+        # Validar transiciones según el tipo de trabajador
+        allowed_transitions = WORKER_TRANSITIONS.get(current_user.worker_type)
+        if allowed_transitions is None:
             return jsonify({
                 'success': False,
-                'message': 'Pedido no encontrado'
-            }), 404
+                'message': 'Tipo de trabajador no válido'
+            }), 403
         
-        # Verificar que el pedido sea del negocio del trabajador
-        if order.business_id != current_user.business_id:
+        success, message, updated_order = OrderService.update_order_status(
+            order_id=order_id,
+            new_status=new_status,
+            user_id=getattr(current_user, 'id', None),
+            business_id=current_user.business_id,
+            allowed_transitions=allowed_transitions,
+            expected_version=_expected_version(data)
+        )
+
+        if not success:
             return jsonify({
                 'success': False,
-                'message': 'No tienes permiso para este pedido'
-            }), 403
+                'message': message
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'message': message,
+            'order': dump_order(updated_order)
+        }), 200
         
-        # Validar transiciones según el tipo de trabajador
-        if current_user.worker_type == 'planta':
-            # Cocina puede: received → preparing, preparing → ready
-            allowed_transitions = {
-                'received': ['preparing'],
-                'preparing': ['ready']
-            }
-        elif current_user.worker_type == 'repartidor':
-            # Repartidor puede: ready → sent, sent → paid
-            allowed_transitions = {
-                'ready': ['sent'],
-                'sent': ['paid']
-            }
-        else:
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error actualizando pedido: {str(e)}'
+        }), 500
+
+
+@orders_api_bp.route('/bulk-transition', methods=['POST'])
+@login_required
+def bulk_transition_orders():
+    """
+    Cambia el estado de varios pedidos en una sola petición.
+    Body: { "transitions": [{"order_id": 1, "status": "sent"}, ...] }
+    Trabajadores: mismas reglas que PUT /<id>/status. Dueño: avanza cualquier columna y cierra pagados.
+    """
+    try:
+        if not current_user.business:
             return jsonify({
                 'success': False,
-                'message': 'Tipo de trabajador no válido'
-            }), 403
+                'message': 'Usuario no tiene un negocio asociado'
+            }), 400
         
-        # Verificar transición válida
-        current_status = order.status
-        if current_status not in allowed_transitions:
+        if hasattr(current_user, 'worker_type'):
+            allowed_transitions = WORKER_TRANSITIONS.get(current_user.worker_type)
+            if allowed_transitions is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'Tipo de trabajador no válido'
+                }), 403
+        else:
+            allowed_transitions = OWNER_TRANSITIONS
+        
+        data = request.get_json(silent=True) or {}
+        raw_transitions = data.get('transitions')
+        if not isinstance(raw_transitions, list) or not raw_transitions:
             return jsonify({
                 'success': False,
-                'message': f'No puedes cambiar pedidos en estado {current_status}'
+                'message': 'Se requiere una lista de transiciones'
             }), 400
         
-        if new_status not in allowed_transitions[current_status]:
+        max_items = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+        if len(raw_transitions) > max_items:
             return jsonify({
                 'success': False,
-                'message': f'Transición no permitida: {current_status} → {new_status}'
+                'message': f'Máximo {max_items} pedidos por solicitud'
             }), 400
         
-        success, message, updated_order = OrderService.update_order_status(
-            order_id=order.id,
-            new_status=new_status,
-            user_id=getattr(current_user, 'id', None)
+        transitions = []
+        for item in raw_transitions:
+            try:
+                transitions.append({
+                    'order_id': int(item['order_id']),
+                    'status': str(item['status'])
+                })
+            except (KeyError, TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'message': 'Cada transición requiere order_id y status'
+                }), 400
+        
+        success, message, results = OrderService.bulk_transition(
+            business_id=current_user.business.id,
+            transitions=transitions,
+            allowed_transitions=allowed_transitions
         )
-
+        
         if not success:
             return jsonify({
                 'success': False,
                 'message': message
             }), 400
-
+        
         return jsonify({
             'success': True,
             'message': message,
-            'order': order_schema.dump(updated_order)
+            'results': results
         }), 200
         
+    except TransitionError as e:
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), e.status_code
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Error actualizando pedido: {str(e)}'
+            'message': f'Error actualizando pedidos: {str(e)}'
         }), 500
@@ -4,10 +4,11 @@ Endpoints para gestión de trabajadores y sus acciones.
 """
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
-from datetime import datetime, timezone
 from app.extensions import db
 from app.data.models import Worker, Order, Notification
 from app.services.worker_service import WorkerService
+from app.services.order_state_machine import OrderStateMachine, TransitionError
+from app.routes.api.orders_routes import _expected_version
 
 worker_bp = Blueprint('worker_api', __name__, url_prefix='/api/workers')
 
@@ -343,7 +344,7 @@ def mark_order_ready(order_id):
     🎯 ENDPOINT PRINCIPAL: Trabajador marca un pedido como listo.
     
     POST /api/workers/mark-order-ready/123
-    Body: {"worker_id": 456}
+    Body: {"worker_id": 456, "version_id": 3}  (version_id opcional)
     
     Este es el endpoint que el trabajador usa con UN SOLO BOTÓN
     para cambiar el estado de "preparing" a "ready".
@@ -355,40 +356,29 @@ def mark_order_ready(order_id):
         if not worker_id:
             return jsonify({'error': 'worker_id es requerido'}), 400
         
-        # Obtener trabajador y pedido
+        # Obtener trabajador
         worker = WorkerService.get_worker_by_id(worker_id)
-        order = Order.query.get(order_id)
         
         if not worker:
             return jsonify({'error': 'Trabajador no encontrado'}), 404
         
-        if not order:
-            return jsonify({'error': 'Pedido no encontrado'}), 404
-        
         # Verificar que el trabajador tiene permiso
-        if not worker.can_mark_ready:
+        if worker.worker_type != 'planta':
             return jsonify({'error': 'No tienes permiso para marcar pedidos como listos'}), 403
         
-        # Verificar que el trabajador pertenece al negocio del pedido
-        if order.business_id != worker.business_id:
-            return jsonify({'error': 'Este pedido no pertenece a tu negocio'}), 403
-        
-        # Verificar que el pedido está en estado 'preparing'
-        if order.status != 'preparing':
-            return jsonify({
-                'error': f'El pedido debe estar en estado "preparando". Estado actual: {order.status}'
-            }), 400
-        
-        # Cambiar estado a 'ready'
-        order.status = 'ready'
-        order.ready_at = lambda: datetime.now(timezone.utc)()
-        
-        # Calcular tiempo de preparación
-        if order.accepted_at:
-            delta = order.ready_at - order.accepted_at
-            order.preparation_time_seconds = int(delta.total_seconds())
-        
-        db.session.commit()
+        # Cambiar estado de 'preparing' a 'ready' (registra ready_at y tiempo de preparación)
+        try:
+            order, _ = OrderStateMachine.transition(
+                order_id,
+                'ready',
+                business_id=worker.business_id,
+                allowed_transitions={'preparing': ('ready',)},
+                expected_version=_expected_version(data)
+            )
+        except TransitionError as e:
+            if e.status_code == 403:
+                return jsonify({'error': 'Este pedido no pertenece a tu negocio'}), 403
+            return jsonify({'error': e.message}), e.status_code
         
         # 📱 Enviar notificación por WhatsApp (opcional)
         try:
@@ -0,0 +1,43 @@
+"""
+Script para archivar pedidos cerrados y cancelados antiguos.
+Ejecutar con: python -m app.scripts.archive_orders [--days 90] [--batch-size 500]
+
+Pensado para correr periódicamente (cron) fuera de las horas pico.
+"""
+import os
+import sys
+import argparse
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import create_app
+from app.services.archive_service import ArchiveService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archiva pedidos cerrados y cancelados antiguos')
+    parser.add_argument('--days', type=int, default=None,
+                        help='Antigüedad mínima en días (por defecto ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Pedidos por lote (por defecto ARCHIVE_BATCH_SIZE)')
+    parser.add_argument('--max-batches', type=int, default=None,
+                        help='Máximo de lotes en esta ejecución')
+    args = parser.parse_args()
+
+    config = os.getenv('FLASK_CONFIG', 'development')
+    app = create_app(config)
+
+    with app.app_context():
+        success, message, _ = ArchiveService.archive_orders(
+            older_than_days=args.days,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches
+        )
+        print(message)
+        if not success:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
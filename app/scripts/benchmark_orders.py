@@ -0,0 +1,881 @@
+"""
+Benchmarks de rendimiento del flujo de pedidos.
+Ejecutar con: python -m app.scripts.benchmark_orders <benchmark> [opciones]
+
+Usa la base de datos de DATABASE_URL (idealmente PostgreSQL). Si no está definida,
+trabaja sobre un archivo SQLite temporal.
+"""
+import os
+import sys
+import argparse
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+
+def _create_benchmark_app():
+    """Crea la app apuntando a DATABASE_URL o a un SQLite temporal."""
+    from app import create_app
+    from app.config import config, DevelopmentConfig
+
+    database_url = os.environ.get('DATABASE_URL')
+    engine_options = dict(DevelopmentConfig.SQLALCHEMY_ENGINE_OPTIONS)
+    if not database_url:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='prontoa-bench-'), 'bench.db')
+        database_url = f'sqlite:///{db_path}'
+        # Esperar el bloqueo de escritura en vez de fallar con "database is locked"
+        engine_options['connect_args'] = {'timeout': 60}
+
+    class BenchmarkConfig(DevelopmentConfig):
+        DEBUG = False
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options
+
+    config['benchmark'] = BenchmarkConfig
+    return create_app('benchmark')
+
+
+def _seed_business(suffix=''):
+    """Crea un negocio mínimo con un producto para los benchmarks."""
+    from app.extensions import db
+    from app.data.models import User, Business, Product
+
+    tag = f"{int(time.time() * 1000)}{suffix}"
+    user = User(email=f'bench{tag}@prontoa.test', full_name='Benchmark', phone=f'+57{tag}')
+    user.set_password('benchmark')
+    db.session.add(user)
+    db.session.flush()
+
+    business = Business(user_id=user.id, name=f'Benchmark {tag}', business_type='restaurant')
+    db.session.add(business)
+    db.session.flush()
+
+    product = Product(
+        business_id=business.id,
+        name='Producto benchmark',
+        price=1000,
+        stock_quantity=10 ** 9,
+        is_available=True
+    )
+    db.session.add(product)
+    db.session.commit()
+    return business.id, product.id
+
+
+@contextmanager
+def _count_queries():
+    """Cuenta las sentencias SQL ejecutadas dentro del bloque."""
+    from sqlalchemy import event
+    from app.extensions import db
+
+    counter = {'queries': 0}
+
+    def before_cursor_execute(*args, **kwargs):
+        counter['queries'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _seed_orders(business_id, product_id, count, statuses, items_per_order=3,
+                 spacing=timedelta(seconds=1)):
+    """Inserta pedidos de prueba en bloque (sin pasar por OrderService)."""
+    from sqlalchemy import insert
+    from app.extensions import db
+    from app.data.models import Customer, Order, OrderItem
+    from app.services.order_view_service import OrderViewService
+    from app.services.kpi_rollup_service import KPIRollupService
+
+    now = datetime.now(timezone.utc)
+    customers = [Customer(phone=f'seed-{business_id}-{i}', name=f'Cliente {i}') for i in range(50)]
+    db.session.add_all(customers)
+    db.session.flush()
+
+    db.session.execute(insert(Order), [
+        {
+            'order_number': f'S{business_id}-{i}',
+            'business_id': business_id,
+            'customer_id': customers[i % len(customers)].id,
+            'status': statuses[i % len(statuses)],
+            'order_type': 'delivery',
+            'total_amount': 1000 * items_per_order,
+            'created_at': now - spacing * i,
+            'updated_at': now - spacing * i
+        }
+        for i in range(count)
+    ])
+
+    if items_per_order:
+        order_ids = [row.id for row in db.session.query(Order.id).filter_by(business_id=business_id)]
+        db.session.execute(insert(OrderItem), [
+            {
+                'order_id': order_id,
+                'product_id': product_id,
+                'product_name': 'Producto benchmark',
+                'quantity': 1,
+                'unit_price': 1000,
+                'subtotal': 1000
+            }
+            for order_id in order_ids
+            for _ in range(items_per_order)
+        ])
+    db.session.commit()
+
+    # Los INSERT masivos no pasan por el flush: construir la proyección y los agregados
+    OrderViewService.rebuild(business_id=business_id)
+    KPIRollupService.rebuild(business_id=business_id)
+
+
+def bench_board(app, sizes):
+    """Mide consultas y tiempo del tablero Kanban para distintos tamaños."""
+    from app.extensions import db
+    from app.services.order_service import OrderService, BOARD_ACTIVE_STATUSES
+
+    print(f"{'pedidos':>8} {'consultas':>10} {'tiempo ms':>10}")
+    for size in sizes:
+        with app.app_context():
+            business_id, product_id = _seed_business(f'-{size}')
+            _seed_orders(business_id, product_id, size, BOARD_ACTIVE_STATUSES)
+            db.session.expire_all()
+
+            started = time.perf_counter()
+            with _count_queries() as counter:
+                orders, by_status = OrderService.get_board_snapshot(business_id)
+                [order.to_dict() for order in orders]
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{size:>8} {counter['queries']:>10} {elapsed:>10.1f}")
+            db.session.remove()
+
+
+def bench_serializers(app, count, repeat):
+    """Compara orders_schema.dump con los serializadores precompilados para `count` pedidos."""
+    from sqlalchemy.orm import joinedload, selectinload
+    from app.extensions import db
+    from app.data.models import Order, OrderItem
+    from app.data.schemas import orders_schema
+    from app.data.serializers import dump_orders
+    from app.services.order_service import BOARD_STATUSES
+
+    with app.app_context():
+        business_id, product_id = _seed_business('-serializers')
+        _seed_orders(business_id, product_id, count, BOARD_STATUSES)
+        orders = Order.query.options(
+            joinedload(Order.customer),
+            joinedload(Order.business),
+            selectinload(Order.items).joinedload(OrderItem.product)
+        ).filter_by(business_id=business_id).all()
+
+        if orders_schema.dump(orders) != dump_orders(orders):
+            print("ERROR: los serializadores producen un JSON distinto al de OrderSchema")
+            sys.exit(1)
+
+        def measure(dump):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                dump(orders)
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            return best
+
+        schema_ms = measure(orders_schema.dump)
+        fast_ms = measure(dump_orders)
+        print(f"Pedidos: {len(orders)} - ítems: {sum(len(order.items) for order in orders)} "
+              f"- mejor de {repeat}")
+        print(f"{'serializador':<24} {'tiempo ms':>10}")
+        print(f"{'orders_schema.dump':<24} {schema_ms:>10.1f}")
+        print(f"{'dump_orders':<24} {fast_ms:>10.1f}")
+        print(f"Aceleración: {schema_ms / fast_ms:.1f}x")
+        db.session.remove()
+
+
+def bench_json(app, count, repeat):
+    """Tiempo de codificación JSON y bytes enviados (con y sin gzip) de los payloads grandes."""
+    import gzip
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy.orm import joinedload, selectinload
+    from app.extensions import db
+    from app.data.models import Order, OrderItem
+    from app.data.serializers import dump_orders
+    from app.json_provider import FastJSONProvider
+    from app.services.kpi_service import KPIService
+    from app.services.order_service import OrderService, BOARD_STATUSES
+
+    with app.app_context():
+        business_id, product_id = _seed_business('-json')
+        _seed_orders(business_id, product_id, count, BOARD_STATUSES)
+        orders = Order.query.options(
+            joinedload(Order.customer),
+            joinedload(Order.business),
+            selectinload(Order.items).joinedload(OrderItem.product)
+        ).filter_by(business_id=business_id).all()
+        board, by_status = OrderService.get_board_snapshot(business_id)
+
+        payloads = [
+            ('Listado de pedidos', {'success': True, 'orders': dump_orders(orders)}),
+            ('Tablero Kanban', {'success': True, 'orders': [order.to_dict() for order in board],
+                                'by_status': by_status}),
+            ('Resumen de KPIs', {'success': True, 'kpis': KPIService.get_kpi_comparisons(business_id),
+                                 'hourly': KPIService.get_orders_by_hour(business_id)}),
+        ]
+        stdlib = DefaultJSONProvider(app)
+        stdlib.compact = True
+        fast = FastJSONProvider(app)
+        fast.compact = True
+        level = app.config.get('JSON_COMPRESS_LEVEL', 6)
+
+        def measure(encode):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                encode()
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            return best
+
+        print(f"Codificador rápido: {fast.backend} - gzip nivel {level} - mejor de {repeat}")
+        print(f"{'payload':<20} {'json ms':>8} {'rápido ms':>10} {'bytes':>10} {'gzip':>9} {'gzip ms':>8}")
+        for name, payload in payloads:
+            stdlib_ms = measure(lambda: stdlib.dumps(payload).encode('utf-8'))
+            fast_ms = measure(lambda: fast.dumps_bytes(payload))
+            raw = fast.dumps_bytes(payload)
+            gzip_ms = measure(lambda: gzip.compress(raw, compresslevel=level))
+            compressed = gzip.compress(raw, compresslevel=level)
+            print(f"{name:<20} {stdlib_ms:>8.1f} {fast_ms:>10.1f} {len(raw):>10} "
+                  f"{len(compressed):>9} {gzip_ms:>8.1f}")
+        db.session.remove()
+
+
+def _seed_catalog(business_id, count):
+    """Inserta `count` productos disponibles, con nombres variados, en el catálogo del negocio."""
+    from app.extensions import db
+    from app.data.models import Product
+
+    dishes = (
+        ('Hamburguesa', 'Hamburguesas'), ('Pizza', 'Pizzas'), ('Empanada', 'Fritos'), ('Arepa', 'Arepas'),
+        ('Jugo', 'Bebidas'), ('Limonada', 'Bebidas'), ('Perro caliente', 'Comidas rápidas'),
+        ('Salchipapa', 'Comidas rápidas'), ('Ensalada', 'Saludable'), ('Postre', 'Postres')
+    )
+    variants = ('clásica', 'doble', 'de pollo', 'de carne', 'mixta', 'hawaiana', 'de mora', 'de mango',
+                'vegetariana', 'especial')
+    sizes = ('personal', 'mediana', 'familiar', 'junior', 'grande', 'mini', 'combo', 'para compartir')
+
+    products = []
+    for index in range(count):
+        dish, category = dishes[index % len(dishes)]
+        variant = variants[index // len(dishes) % len(variants)]
+        size = sizes[index // (len(dishes) * len(variants)) % len(sizes)]
+        products.append(Product(
+            business_id=business_id,
+            name=f'{dish} {variant} {size}',
+            description=f'{dish} {variant} en tamaño {size}, preparada al momento',
+            price=1000 + index * 100,
+            category=category,
+            stock_quantity=10 ** 6,
+            is_available=True
+        ))
+    db.session.add_all(products)
+    db.session.commit()
+
+
+def bench_catalog(app, sizes, messages):
+    """Costo por mensaje de armar el prompt del agente IA: consulta del catálogo frente a la caché."""
+    from app.extensions import db
+    from app.data.models import Product
+    from app.services.ai_service import SYSTEM_PROMPT
+    from app.services.catalog_service import CatalogService
+
+    def uncached(business_id):
+        # Lo que hacía process_message en cada mensaje antes de la caché
+        products = Product.query.filter_by(business_id=business_id, is_available=True).all()
+        products_info = "\n".join(f"- [{p.id}] {p.name}: ${p.price:,.0f} ({p.category})" for p in products)
+        return SYSTEM_PROMPT.format(catalog=products_info)
+
+    print(f"{messages} mensajes por tamaño de catálogo "
+          f"(con caché la única consulta es la versión del catálogo, una fila de businesses)")
+    print(f"{'productos':>9} {'sin caché ms':>13} {'consultas':>10} {'caché ms':>9} {'consultas':>10}")
+    for size in sizes:
+        with app.app_context():
+            business_id, _ = _seed_business(f'-catalog{size}')
+            _seed_catalog(business_id, size - 1)
+            CatalogService.invalidate()
+            CatalogService.reset_stats()
+
+            if uncached(business_id) != CatalogService.get_snapshot(business_id).render(SYSTEM_PROMPT):
+                print("ERROR: la caché produce un prompt distinto al de la consulta directa")
+                sys.exit(1)
+
+            results = []
+            for build in (uncached, lambda business_id: CatalogService.get_snapshot(business_id).render(SYSTEM_PROMPT)):
+                db.session.expire_all()
+                started = time.perf_counter()
+                with _count_queries() as counter:
+                    for _ in range(messages):
+                        build(business_id)
+                elapsed = (time.perf_counter() - started) * 1000
+                results.append((elapsed / messages, counter['queries'] / messages))
+
+            (plain_ms, plain_queries), (cached_ms, cached_queries) = results
+            print(f"{size:>9} {plain_ms:>13.3f} {plain_queries:>10.1f} {cached_ms:>9.3f} {cached_queries:>10.1f}")
+            stats = CatalogService.get_stats()
+            print(f"{'':>9} aciertos {stats['hit_ratio']:.1%} - construcción {stats['avg_build_ms']:.2f} ms "
+                  f"- ahorrado {stats['saved_ms']:.0f} ms")
+            db.session.remove()
+
+
+def bench_prompt(app, sizes, top_k, use_llm):
+    """Tokens del prompt del agente IA (y latencia del LLM) con el catálogo completo frente al top-k."""
+    import openai
+    from app.extensions import db
+    from app.services.ai_service import SYSTEM_PROMPT
+    from app.services.catalog_service import CatalogService, tokenize, stem
+
+    queries = (
+        'quiero una hamburguesa doble',
+        'tienen jugo de mora?',
+        '2 arepas de pollo para domicilio',
+        'una pizza hawaina familiar'
+    )
+
+    def tokens(text):
+        # Aproximación sin tokenizador: ~4 caracteres por token
+        return -(-len(text) // 4)
+
+    def llm_ms(prompt, query):
+        started = time.perf_counter()
+        openai.ChatCompletion.create(
+            model=app.config.get('PERPLEXITY_MODEL', 'sonar'),
+            messages=[{'role': 'system', 'content': prompt}, {'role': 'user', 'content': query}],
+            temperature=0.3,
+            max_tokens=200
+        )
+        return (time.perf_counter() - started) * 1000
+
+    if use_llm:
+        openai.api_key = app.config.get('PERPLEXITY_API_KEY')
+        openai.api_base = "https://api.perplexity.ai"
+        if not openai.api_key:
+            print("PERPLEXITY_API_KEY no configurada: se omite la latencia del LLM")
+            use_llm = False
+
+    print(f"top-k = {top_k} - tokens ≈ caracteres / 4 - promedio de {len(queries)} consultas")
+    header = f"{'productos':>9} {'tokens completo':>16} {'tokens top-k':>13} {'búsqueda ms':>12} {'acierto':>8}"
+    if use_llm:
+        header += f" {'LLM completo ms':>16} {'LLM top-k ms':>13}"
+    print(header)
+    for size in sizes:
+        with app.app_context():
+            business_id, _ = _seed_business(f'-prompt{size}')
+            _seed_catalog(business_id, size - 1)
+            catalog = CatalogService.get_snapshot(business_id)
+            full_prompt = SYSTEM_PROMPT.format(catalog=catalog.prompt_block)
+            catalog.index  # Construir el índice fuera de la medición
+
+            topk_tokens, search_ms, hits, full_llm, topk_llm = [], [], 0, [], []
+            for query in queries:
+                started = time.perf_counter()
+                block = catalog.prompt_block_for(query, top_k)
+                search_ms.append((time.perf_counter() - started) * 1000)
+                prompt = SYSTEM_PROMPT.format(catalog=block)
+                topk_tokens.append(tokens(prompt))
+                # Acierto: el primer producto listado tiene todas las palabras del catálogo que se pidieron
+                wanted = {stem(token) for token in tokenize(query)} & set(catalog.index.postings)
+                first = block.split('\n')[0]
+                hits += wanted <= {stem(token) for token in tokenize(first)}
+                if use_llm:
+                    full_llm.append(llm_ms(full_prompt, query))
+                    topk_llm.append(llm_ms(prompt, query))
+
+            # Con catálogos de hasta top-k productos se envía el catálogo completo
+            accuracy = f"{hits}/{len(queries)}" if size > top_k else '-'
+            line = (f"{size:>9} {tokens(full_prompt):>16} {sum(topk_tokens) / len(queries):>13.0f} "
+                    f"{sum(search_ms) / len(queries):>12.3f} {accuracy:>8}")
+            if use_llm:
+                line += f" {sum(full_llm) / len(queries):>16.0f} {sum(topk_llm) / len(queries):>13.0f}"
+            print(line)
+            db.session.remove()
+
+
+def bench_pagination(app, total_orders, pages):
+    """Compara el costo de una página temprana y una profunda (cursor vs OFFSET)."""
+    from app.extensions import db
+    from app.data.models import Order
+    from app.services.order_service import OrderService
+
+    with app.app_context():
+        business_id, product_id = _seed_business('-pages')
+        _seed_orders(business_id, product_id, total_orders, ('closed',), items_per_order=0)
+        page_size = app.config['ITEMS_PER_PAGE']
+
+        def timed(fn):
+            started = time.perf_counter()
+            fn()
+            return (time.perf_counter() - started) * 1000
+
+        def offset_page(page):
+            Order.query.filter_by(business_id=business_id).order_by(
+                Order.created_at.desc(), Order.id.desc()
+            ).limit(page_size).offset((page - 1) * page_size).all()
+
+        # Calentar conexión y caché de sentencias
+        offset_page(1)
+        OrderService.get_orders_by_business(business_id)
+
+        cursor = None
+        cursor_times = {}
+        for page in range(1, pages + 1):
+            db.session.expire_all()
+
+            def fetch_page():
+                nonlocal cursor
+                _, cursor = OrderService.get_orders_by_business(business_id, cursor=cursor)
+
+            cursor_times[page] = timed(fetch_page)
+            if cursor is None:
+                break
+
+        last_page = max(cursor_times)
+        print(f"Pedidos: {total_orders} - tamaño de página: {page_size}")
+        print(f"{'página':>8} {'cursor ms':>10} {'offset ms':>10}")
+        for page in (1, last_page):
+            offset_ms = timed(lambda: offset_page(page))
+            print(f"{page:>8} {cursor_times[page]:>10.2f} {offset_ms:>10.2f}")
+        db.session.remove()
+
+
+def bench_order_numbers(app, threads, orders_per_thread):
+    """Crea pedidos en paralelo y verifica que ningún número de pedido se repita."""
+    from app.extensions import db
+    from app.data.models import Order
+    from app.services.order_service import OrderService
+
+    with app.app_context():
+        business_id, product_id = _seed_business()
+
+    errors = []
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(index):
+        with app.app_context():
+            for _ in range(orders_per_thread):
+                started = time.perf_counter()
+                success, message, _ = OrderService.create_order(
+                    business_id=business_id,
+                    customer_phone=f'bench-{index}',
+                    items_data=[{'product_id': product_id, 'quantity': 1}]
+                )
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    if not success:
+                        errors.append(message)
+            db.session.remove()
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    total_time = time.perf_counter() - started
+
+    with app.app_context():
+        numbers = [row.order_number for row in
+                   db.session.query(Order.order_number).filter_by(business_id=business_id)]
+
+    latencies.sort()
+    created = len(numbers)
+    print(f"Pedidos solicitados: {threads * orders_per_thread} ({threads} hilos)")
+    print(f"Pedidos creados:     {created}")
+    print(f"Números duplicados:  {created - len(set(numbers))}")
+    print(f"Errores:             {len(errors)}")
+    if errors:
+        print(f"   Primer error: {errors[0]}")
+    if latencies:
+        print(f"Throughput:          {created / total_time:,.0f} pedidos/s")
+        print(f"Latencia p50:        {latencies[len(latencies) // 2] * 1000:.1f} ms")
+        print(f"Latencia p99:        {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+
+def bench_transitions(app, threads, total_orders):
+    """Varios hilos compiten por mover los mismos pedidos; cada pedido debe cambiar una sola vez."""
+    from collections import Counter
+    from app.extensions import db
+    from app.data.models import Order
+    from app.services.order_state_machine import OrderStateMachine, TransitionError
+
+    with app.app_context():
+        business_id, product_id = _seed_business('-transitions')
+        _seed_orders(business_id, product_id, total_orders, ('received',), items_per_order=0)
+        order_ids = [row.id for row in db.session.query(Order.id).filter_by(business_id=business_id)]
+
+    outcomes = Counter()
+    winners = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        with app.app_context():
+            barrier.wait()
+            # Cada hilo recorre los pedidos en distinto orden para maximizar los choques
+            for order_id in order_ids[index:] + order_ids[:index]:
+                try:
+                    OrderStateMachine.transition(order_id, 'preparing', business_id=business_id)
+                    outcome = 'ok'
+                except TransitionError as e:
+                    outcome = e.status_code
+                    db.session.rollback()
+                with lock:
+                    outcomes[outcome] += 1
+                    if outcome == 'ok':
+                        winners[order_id] += 1
+            db.session.remove()
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    total_time = time.perf_counter() - started
+
+    with app.app_context():
+        rows = db.session.query(Order.status, Order.version_id).filter_by(business_id=business_id).all()
+
+    lost_updates = sum(1 for count in winners.values() if count > 1)
+    print(f"Pedidos: {total_orders} - hilos: {threads} - intentos: {sum(outcomes.values())}")
+    print(f"Transiciones aplicadas:   {outcomes['ok']}")
+    print(f"Conflictos (409):         {outcomes[409]}")
+    print(f"Rechazadas (400):         {outcomes[400]}")
+    print(f"Pedidos sin cambio:       {total_orders - len(winners)}")
+    print(f"Actualizaciones perdidas: {lost_updates}")
+    print(f"Versiones finales:        {dict(Counter(version for _, version in rows))}")
+    print(f"Estados finales:          {dict(Counter(status for status, _ in rows))}")
+    print(f"Tiempo total:             {total_time * 1000:.0f} ms")
+
+
+def bench_writes(app, threads, orders_per_thread, history):
+    """Costo de la ruta de escritura: crear pedidos y aceptarlos con historial en la misma hora."""
+    from app.extensions import db
+    from app.services.order_service import OrderService
+    from app.services.order_state_machine import OrderStateMachine, TransitionError
+    from app.services.kpi_service import KPIService
+
+    with app.app_context():
+        business_id, product_id = _seed_business('-writes')
+        # Historial en la hora actual: es la franja que recalculan los agregados
+        if history:
+            _seed_orders(
+                business_id, product_id, history, ('closed',), items_per_order=1, spacing=timedelta(0)
+            )
+
+    latencies = {'create': [], 'transition': []}
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        with app.app_context():
+            barrier.wait()
+            for _ in range(orders_per_thread):
+                started = time.perf_counter()
+                success, message, order = OrderService.create_order(
+                    business_id=business_id,
+                    customer_phone=f'bench-writes-{index}',
+                    items_data=[{'product_id': product_id, 'quantity': 1}]
+                )
+                created = time.perf_counter()
+                if success:
+                    try:
+                        OrderStateMachine.transition(order.id, 'preparing', business_id=business_id)
+                    except TransitionError as e:
+                        db.session.rollback()
+                        message, success = e.message, False
+                finished = time.perf_counter()
+                with lock:
+                    latencies['create'].append(created - started)
+                    latencies['transition'].append(finished - created)
+                    if not success:
+                        errors.append(message)
+            db.session.remove()
+
+    with app.app_context(), _count_queries() as counter:
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        total_time = time.perf_counter() - started
+
+    writes = threads * orders_per_thread * 2
+    print(f"Historial en la hora: {history} - hilos: {threads} - escrituras: {writes}")
+    print(f"Errores:             {len(errors)}")
+    if errors:
+        print(f"   Primer error: {errors[0]}")
+    print(f"Throughput:          {writes / total_time:,.0f} escrituras/s")
+    print(f"Sentencias SQL:      {counter['queries'] / writes:.1f} por escritura")
+    for name, values in latencies.items():
+        values.sort()
+        print(f"{name:<12} p50 {values[len(values) // 2] * 1000:6.1f} ms   p99 {values[int(len(values) * 0.99)] * 1000:6.1f} ms")
+
+    # Primera lectura de KPIs después de las escrituras
+    with app.app_context():
+        started = time.perf_counter()
+        day_start = datetime.now(timezone.utc) - timedelta(days=1)
+        metrics = KPIService._period_metrics(business_id, {'day': (day_start, None)})['day']
+        elapsed = time.perf_counter() - started
+    print(f"Primera lectura KPI: {elapsed * 1000:.1f} ms")
+    print(f"Pedidos en KPIs:     {metrics['total']} (esperados {history + writes // 2})")
+
+
+@contextmanager
+def _capture_statements():
+    """Guarda las sentencias SQL (y sus parámetros) ejecutadas dentro del bloque."""
+    from sqlalchemy import event
+    from app.extensions import db
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _full_scans(conn, statement, parameters):
+    """Ejecuta EXPLAIN y retorna (tablas calientes recorridas completas, plan)."""
+    import re
+
+    if conn.dialect.name == 'postgresql':
+        plan = [row[0] for row in conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)]
+        pattern = re.compile(r'Seq Scan on (\w+)')
+    else:
+        plan = [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+        pattern = re.compile(r'^SCAN (\w+)')
+
+    scanned = set()
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match:
+            # Quitar el sufijo de alias (orders_1 → orders)
+            scanned.add(re.sub(r'_\d+$', '', match.group(1)))
+    return scanned & HOT_TABLES, plan
+
+
+# Tablas que crecen con el uso y nunca deben recorrerse completas en una ruta caliente
+HOT_TABLES = {'orders', 'order_items', 'order_views', 'kpi_rollups', 'messages', 'ai_conversations'}
+
+
+def bench_explain(app, businesses, orders_per_business):
+    """Corre EXPLAIN sobre las consultas calientes y falla si alguna recorre una tabla completa."""
+    from sqlalchemy import insert
+    from app.extensions import db
+    from app.data.models import AIConversation, Message, Order
+    from app.services.order_service import OrderService, BOARD_ACTIVE_STATUSES, KITCHEN_STATUSES
+    from app.services.change_feed_service import ChangeFeedService
+    from app.services.kpi_service import KPIService
+
+    # Mayoría de pedidos cerrados, repartidos en varios meses (como una base en producción)
+    statuses = ('closed',) * 19 + BOARD_ACTIVE_STATUSES
+    now = datetime.now(timezone.utc)
+
+    with app.app_context():
+        business_ids = []
+        for index in range(businesses):
+            business_id, product_id = _seed_business(f'-explain{index}')
+            _seed_orders(business_id, product_id, orders_per_business, statuses,
+                         items_per_order=2, spacing=timedelta(minutes=10))
+            db.session.execute(insert(AIConversation), [
+                {
+                    'customer_phone': f'seed-{business_id}-{i % 50}',
+                    'business_id': business_id,
+                    'extracted_intent': 'order',
+                    'created_at': now - timedelta(minutes=i),
+                    'updated_at': now - timedelta(minutes=i)
+                }
+                for i in range(orders_per_business // 2)
+            ])
+            order_ids = [row.id for row in db.session.query(Order.id).filter_by(business_id=business_id)]
+            db.session.execute(insert(Message), [
+                {
+                    'order_id': order_id,
+                    'sender_phone': 'seed',
+                    'receiver_phone': 'seed',
+                    'content': 'Mensaje de prueba',
+                    'direction': 'inbound'
+                }
+                for order_id in order_ids
+            ])
+            db.session.commit()
+            business_ids.append(business_id)
+
+        # Estadísticas para el planificador
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+        business_id = business_ids[len(business_ids) // 2]
+        sample_order_id = db.session.query(Order.id).filter_by(business_id=business_id).limit(1).scalar()
+        version = ChangeFeedService.current_version(business_id)
+
+        def first_page_cursor():
+            return OrderService.get_orders_by_business(business_id)[1]
+
+        hot_paths = [
+            ('Tablero Kanban', lambda: OrderService.get_board_snapshot(business_id)),
+            ('Vista de cocina', lambda: OrderService.get_orders_for_statuses(business_id, KITCHEN_STATUSES)),
+            ('Listado página 1', lambda: OrderService.get_orders_by_business(business_id)),
+            ('Listado página 2', lambda: OrderService.get_orders_by_business(business_id, cursor=first_page_cursor())),
+            ('Listado por estado', lambda: OrderService.get_orders_by_business(business_id, status='ready')),
+            ('Feed de cambios', lambda: ChangeFeedService.get_changes(business_id, 'kitchen', since=version)),
+            ('Búsqueda de pedidos', lambda: OrderService.search_orders(business_id, 'Cliente 7')),
+            ('KPIs del dashboard', lambda: KPIService.get_dashboard_metrics(business_id)),
+            ('Comparación de KPIs', lambda: KPIService.get_kpi_comparisons(business_id, 365)),
+            ('Pedidos por hora', lambda: KPIService.get_orders_heatmap(business_id)),
+            ('Conversación IA', lambda: AIConversation.query.filter_by(
+                customer_phone=f'seed-{business_id}-7', business_id=business_id
+            ).order_by(AIConversation.updated_at.desc()).first()),
+            ('Mensajes del pedido', lambda: Message.query.filter_by(order_id=sample_order_id).all()),
+        ]
+
+        total_orders = businesses * orders_per_business
+        print(f"Negocios: {businesses} - pedidos: {total_orders} - ítems: {total_orders * 2}")
+        print(f"{'consulta':<22} {'sentencias':>10}  resultado")
+        failures = []
+        for label, run in hot_paths:
+            db.session.expire_all()
+            with _capture_statements() as statements:
+                run()
+
+            scanned = set()
+            with db.engine.connect() as conn:
+                for statement, parameters in statements:
+                    tables, plan = _full_scans(conn, statement, parameters)
+                    if tables:
+                        scanned |= tables
+                        failures.append((label, statement, plan))
+
+            result = 'OK' if not scanned else f"SCAN COMPLETO: {', '.join(sorted(scanned))}"
+            print(f"{label:<22} {len(statements):>10}  {result}")
+        db.session.remove()
+
+    for label, statement, plan in failures:
+        print("-" * 60)
+        print(f"{label}:\n{statement}")
+        for line in plan:
+            print(f"   {line}")
+
+    if failures:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks del flujo de pedidos')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    numbers_parser = subparsers.add_parser(
+        'order-numbers', help='Creación concurrente de pedidos y unicidad de números'
+    )
+    numbers_parser.add_argument('--threads', type=int, default=16)
+    numbers_parser.add_argument('--orders', type=int, default=250, help='Pedidos por hilo')
+
+    board_parser = subparsers.add_parser(
+        'board', help='Consultas del tablero Kanban según cantidad de pedidos'
+    )
+    board_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+
+    pages_parser = subparsers.add_parser(
+        'pagination', help='Costo de la página 1 frente a una página profunda'
+    )
+    pages_parser.add_argument('--orders', type=int, default=30000)
+    pages_parser.add_argument('--pages', type=int, default=1000)
+
+    transitions_parser = subparsers.add_parser(
+        'transitions', help='Transiciones concurrentes sobre los mismos pedidos (concurrencia optimista)'
+    )
+    transitions_parser.add_argument('--threads', type=int, default=8)
+    transitions_parser.add_argument('--orders', type=int, default=200)
+
+    writes_parser = subparsers.add_parser(
+        'writes', help='Creación y transición concurrente de pedidos con historial (costo de escritura)'
+    )
+    writes_parser.add_argument('--threads', type=int, default=8)
+    writes_parser.add_argument('--orders', type=int, default=50, help='Pedidos por hilo')
+    writes_parser.add_argument('--history', type=int, default=5000, help='Pedidos previos en la hora actual')
+
+    explain_parser = subparsers.add_parser(
+        'explain', help='EXPLAIN de las consultas calientes; falla si alguna recorre una tabla completa'
+    )
+    explain_parser.add_argument('--businesses', type=int, default=10)
+    explain_parser.add_argument('--orders', type=int, default=20000, help='Pedidos por negocio')
+
+    serializers_parser = subparsers.add_parser(
+        'serializers', help='orders_schema.dump frente a los serializadores precompilados'
+    )
+    serializers_parser.add_argument('--orders', type=int, default=1000)
+    serializers_parser.add_argument('--repeat', type=int, default=5)
+
+    json_parser = subparsers.add_parser(
+        'json', help='Codificación JSON (estándar frente a rápida) y bytes con gzip'
+    )
+    json_parser.add_argument('--orders', type=int, default=1000)
+    json_parser.add_argument('--repeat', type=int, default=5)
+
+    catalog_parser = subparsers.add_parser(
+        'catalog', help='Prompt del agente IA por mensaje: consulta del catálogo frente a la caché'
+    )
+    catalog_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 800])
+    catalog_parser.add_argument('--messages', type=int, default=200)
+
+    prompt_parser = subparsers.add_parser(
+        'prompt', help='Tokens del prompt del agente IA y latencia del LLM según tamaño del catálogo'
+    )
+    prompt_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 800])
+    prompt_parser.add_argument('--top-k', type=int, default=None, help='Por defecto AI_PROMPT_CATALOG_TOP_K')
+    prompt_parser.add_argument('--llm', action='store_true', help='Medir la latencia real del LLM (requiere API key)')
+
+    args = parser.parse_args()
+    app = _create_benchmark_app()
+
+    print(f"Benchmark '{args.benchmark}' - {datetime.now(timezone.utc).isoformat()}")
+    print(f"Base de datos: {app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]}")
+    print("-" * 60)
+
+    if args.benchmark == 'order-numbers':
+        bench_order_numbers(app, args.threads, args.orders)
+    elif args.benchmark == 'board':
+        bench_board(app, args.sizes)
+    elif args.benchmark == 'pagination':
+        bench_pagination(app, args.orders, args.pages)
+    elif args.benchmark == 'transitions':
+        bench_transitions(app, args.threads, args.orders)
+    elif args.benchmark == 'writes':
+        bench_writes(app, args.threads, args.orders, args.history)
+    elif args.benchmark == 'explain':
+        bench_explain(app, args.businesses, args.orders)
+    elif args.benchmark == 'serializers':
+        bench_serializers(app, args.orders, args.repeat)
+    elif args.benchmark == 'json':
+        bench_json(app, args.orders, args.repeat)
+    elif args.benchmark == 'catalog':
+        bench_catalog(app, args.sizes, args.messages)
+    elif args.benchmark == 'prompt':
+        bench_prompt(app, args.sizes, args.top_k or app.config['AI_PROMPT_CATALOG_TOP_K'], args.llm)
+
+
+if __name__ == '__main__':
+    main()
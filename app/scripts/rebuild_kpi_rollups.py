@@ -0,0 +1,36 @@
+"""
+Script para reconstruir los agregados de KPIs (tabla kpi_rollups).
+Ejecutar con: python -m app.scripts.rebuild_kpi_rollups [--business-id 1]
+
+Necesario una vez después de `flask db upgrade` en una base existente; luego
+los agregados se mantienen solos con cada escritura de pedidos. También sirve
+para repararlos si se modificaron pedidos por fuera de la aplicación.
+"""
+import os
+import sys
+import argparse
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import create_app
+from app.services.kpi_rollup_service import KPIRollupService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruye la tabla kpi_rollups')
+    parser.add_argument('--business-id', type=int, default=None,
+                        help='Reconstruir solo un negocio (por defecto todos)')
+    parser.add_argument('--batch-days', type=int, default=7, help='Días por lote')
+    args = parser.parse_args()
+
+    config = os.getenv('FLASK_CONFIG', 'development')
+    app = create_app(config)
+
+    with app.app_context():
+        written = KPIRollupService.rebuild(business_id=args.business_id, batch_days=args.batch_days)
+        print(f'{written} franjas de hora escritas en kpi_rollups')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Script para reconstruir la proyección de lectura order_views.
+Ejecutar con: python -m app.scripts.rebuild_order_views [--business-id 1]
+
+Necesario una vez después de `flask db upgrade` en una base existente; luego
+la proyección se mantiene sola con cada escritura de pedidos.
+"""
+import os
+import sys
+import argparse
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import create_app
+from app.services.order_view_service import OrderViewService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruye la tabla order_views')
+    parser.add_argument('--business-id', type=int, default=None,
+                        help='Reconstruir solo un negocio (por defecto todos)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Pedidos por lote')
+    args = parser.parse_args()
+
+    config = os.getenv('FLASK_CONFIG', 'development')
+    app = create_app(config)
+
+    with app.app_context():
+        written = OrderViewService.rebuild(business_id=args.business_id, batch_size=args.batch_size)
+        print(f'{written} pedidos proyectados en order_views')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,18 +3,36 @@ Paquete de servicios de lógica de negocio.
 """
 from app.services.auth_service import AuthService
 from app.services.order_service import OrderService
+from app.services.order_sequence_service import OrderSequenceService
+from app.services.order_state_machine import OrderStateMachine
 from app.services.kpi_service import KPIService
 from app.services.whatsapp_service import WhatsAppService
 from app.services.telegram_service import TelegramService
 from app.services.ai_service import AIAgentService
 from app.services.worker_service import WorkerService
+from app.services.change_feed_service import ChangeFeedService
+from app.services.etag_service import ETagService
+from app.services.order_view_service import OrderViewService
+from app.services.archive_service import ArchiveService
+from app.services.kpi_rollup_service import KPIRollupService
+from app.services.kpi_cache_service import KPICacheService
+from app.services.catalog_service import CatalogService
 
 __all__ = [
     'AuthService',
     'OrderService',
+    'OrderSequenceService',
+    'OrderStateMachine',
     'KPIService',
     'WhatsAppService',
     'TelegramService',
     'AIAgentService',
-    'WorkerService'
+    'WorkerService',
+    'ChangeFeedService',
+    'ETagService',
+    'OrderViewService',
+    'ArchiveService',
+    'KPIRollupService',
+    'KPICacheService',
+    'CatalogService'
 ]
@@ -6,10 +6,180 @@ import json
 import re
 import unicodedata
 import copy
+import threading
 from flask import current_app
 from app.extensions import db
-from app.data.models import AIConversation, Product, Order
+from app.data.models import AIConversation, Order
 from app.services.order_service import OrderService
+from app.services.catalog_service import CatalogService, AMBIGUOUS, tokenize, stem
+
+
+# Prompt CORTO y RESTRICTIVO para ahorrar tokens; {catalog} recibe el catálogo del negocio
+SYSTEM_PROMPT = """Asistente de pedidos. Solo procesa pedidos del catálogo.
+
+    CATÁLOGO:
+    {catalog}
+
+    REGLAS ESTRICTAS:
+    1. SOLO habla de productos del catálogo
+    2. Respuestas CORTAS (máx 2 líneas)
+    3. NO respondas temas fuera del negocio
+    4. Si preguntan otra cosa: "Solo tomo pedidos"
+
+    REQUISITOS PARA PEDIDO COMPLETO:
+    - Mínimo un producto válido del catálogo con cantidad y su id [n] del catálogo
+    - Nombre del cliente
+    - delivery_type definido (delivery o pickup)
+    - Si delivery_type=delivery, dirección obligatoria
+    - Si pickup, dirección opcional
+    - ready_to_create_order SOLO puede ser true cuando TODOS los campos estén completos
+    En caso contrario, indica missing_info y needs_more_info=true.
+
+    Responde JSON:
+    {{
+        "intent": "hacer_pedido|consulta|saludo|otro",
+        "confidence": 0.95,
+        "entities": {{
+            "products": [{{"id": 12, "name": "producto", "quantity": 1, "unit_price": 5000}}],
+            "delivery_type": "delivery|pickup",
+            "address": "direccion",
+            "customer_name": "nombre"
+        }},
+        "response": "Respuesta CORTA",
+        "needs_more_info": true/false,
+        "missing_info": ["direccion"],
+        "ready_to_create_order": true/false
+    }}""".strip()
+
+# Palabras de confirmación (texto normalizado, sin tildes)
+CONFIRMATION_KEYWORDS = {
+    'yes': ('si', 'sii', 'claro', 'confirmo', 'adelante', 'vale', 'ok', 'de acuerdo'),
+    'no': ('no', 'nel', 'cancela', 'cancelar', 'mejor no')
+}
+
+# Palabras que indican el tipo de entrega (texto en minúsculas)
+PICKUP_KEYWORDS = ('recoger', 'recojo', 'retiro', 'paso por', 'voy por', 'pickup', 'para llevar')
+DELIVERY_KEYWORDS = ('envio', 'envío', 'entrega', 'mandalo', 'mándalo', 'traer', 'a domicilio', 'delivery')
+
+
+def _keyword_pattern(keywords, whole_words=True):
+    """Compila una expresión que encuentra cualquiera de las palabras clave."""
+    alternatives = '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf'\b(?:{alternatives})\b' if whole_words else alternatives)
+
+
+_CONFIRMATION_PATTERNS = {
+    decision: _keyword_pattern(keywords) for decision, keywords in CONFIRMATION_KEYWORDS.items()
+}
+_PICKUP_PATTERN = _keyword_pattern(PICKUP_KEYWORDS, whole_words=False)
+_DELIVERY_PATTERN = _keyword_pattern(DELIVERY_KEYWORDS, whole_words=False)
+
+# Frases de los mensajes triviales que se responden sin LLM (texto normalizado).
+# Un mensaje es trivial solo si está formado únicamente por estas frases.
+FAST_PATH_PHRASES = {
+    'saludo': (
+        r'hola+', r'ola', r'alo', r'hey', r'hi', r'hello', r'saludos', r'que tal',
+        r'buen[oa]s?(?: (?:dia|dias|tarde|tardes|noche|noches))?', r'como (?:estas|esta|estan)'
+    ),
+    'agradecimiento': (r'(?:muchas |mil )?gracias', r'muy amable', r'te agradezco', r'thanks?'),
+    'despedida': (r'chao+', r'chau', r'adios', r'bye', r'nos vemos', r'hasta (?:luego|pronto|manana)'),
+    'menu': (
+        r'(?:(?:me )?(?:envias|mandas|pasas|muestras|compartes) |(?:quiero|puedo) ver )?'
+        r'(?:el |la |tu |su )?(?:menu|carta|catalogo)',
+        r'(?:que|q) (?:tienen|venden|hay|ofrecen)(?: (?:hoy|para comer))?',
+        r'(?:lista de )?precios'
+    ),
+    'si': tuple(re.escape(keyword) for keyword in CONFIRMATION_KEYWORDS['yes']),
+    'no': tuple(re.escape(keyword) for keyword in CONFIRMATION_KEYWORDS['no']),
+    'relleno': (r'por ?favor', r'porfa', r'please', r'y', r'me', r'nada mas')
+}
+
+# Tipo de mensaje trivial -> (intent, plantilla de generate_response)
+FAST_PATH_REPLIES = {
+    'saludo': ('saludo', 'saludo'),
+    'agradecimiento': ('agradecimiento', 'agradecimiento'),
+    'despedida': ('despedida', 'despedida'),
+    'si': ('otro', 'afirmacion'),
+    'no': ('otro', 'negacion')
+}
+
+# Si el mensaje combina frases, gana la primera de esta lista ("hola, el menú" pide el menú)
+_FAST_PATH_PRIORITY = ('menu', 'agradecimiento', 'despedida', 'si', 'no', 'saludo')
+_FAST_PATH_MAX_LENGTH = 80
+
+_FAST_PATH_PATTERN = re.compile('|'.join(
+    rf"(?P<{kind}>\b(?:{'|'.join(phrases)})\b)" for kind, phrases in FAST_PATH_PHRASES.items()
+))
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+# Datos de pedido que se extraen sin LLM (ver AIAgentService.extract_order_from_text)
+_NAME_PATTERN = re.compile(
+    r'\b(?:me\s+llamo|mi\s+nombre\s+es|a\s+nombre\s+de)\s+(?P<value>[^\W\d_]+(?:\s+[^\W\d_]+){0,3})',
+    re.IGNORECASE
+)
+_ADDRESS_PATTERN = re.compile(
+    r'(?:\bdirecci[oó]n(?:\s+es)?\s*:?\s*'
+    r'|\b(?=(?:calle|cll|cl|carrera|cra|kr|cr|avenida|av|diagonal|dg|transversal|tv|manzana|mz)\b\.?\s*\d))'
+    r'(?P<value>[^,;\n]+(?:,\s*(?:apto|apartamento|casa|torre|piso|interior|bloque|edificio|barrio)\b[^,;\n]*)*)',
+    re.IGNORECASE
+)
+_VALUE_END = re.compile(r'\s+(?:y|para|por|con|quiero|quisiera|pido|porfa)\b', re.IGNORECASE)
+_TRAILING_QUANTITY = re.compile(r'x ?(\d{1,2})\b')
+_NUMBER_WORDS = {
+    'un': 1, 'una': 1, 'uno': 1, 'dos': 2, 'tres': 3, 'cuatro': 4, 'cinco': 5, 'seis': 6,
+    'siete': 7, 'ocho': 8, 'nueve': 9, 'diez': 10, 'once': 11, 'doce': 12, 'docena': 12
+}
+# Palabras que no aportan datos del pedido (texto normalizado); cualquier otra
+# palabra no reconocida hace que el mensaje se escale al LLM
+_ORDER_FILLER_WORDS = frozenset({
+    'quiero', 'quisiera', 'queria', 'necesito', 'me', 'das', 'da', 'dame', 'deme', 'regalas', 'regala',
+    'vendes', 'mandas', 'manda', 'envias', 'envia', 'pedir', 'pido', 'pedido', 'hacer', 'ordenar',
+    'por', 'favor', 'porfa', 'porfavor', 'please', 'para', 'y', 'con', 'tambien', 'mas', 'de', 'del',
+    'el', 'la', 'los', 'las', 'al', 'a', 'en', 'mi', 'x', 'hola', 'buenas', 'buenos', 'dias', 'tardes',
+    'noches', 'gracias', 'ok', 'si', 'listo', 'seria', 'es', 'domicilio', 'envio', 'entrega', 'delivery',
+    'pickup', 'recoger', 'recojo', 'retiro', 'llevar', 'paso', 'voy', 'traer', 'traigan', 'mandalo',
+    'enviar', 'envien', 'casa', 'local'
+})
+
+
+def _parse_quantity(token):
+    """Cantidad escrita como número ("2", "2x") o palabra ("dos"); None si no es una cantidad."""
+    if token in _NUMBER_WORDS:
+        return _NUMBER_WORDS[token]
+    match = re.fullmatch(r'(\d{1,2})x?', token)
+    if match and int(match.group(1)) > 0:
+        return int(match.group(1))
+    return None
+
+
+def _classify_trivial_message(text):
+    """
+    Clasifica un mensaje trivial.
+
+    Returns:
+        str o None: Tipo de FAST_PATH_PHRASES, o None si el mensaje tiene algo
+        más que frases conocidas (se escala al LLM)
+    """
+    normalized = _NON_WORD.sub(' ', AIAgentService._normalize_text(text)).strip()
+    if not normalized or len(normalized) > _FAST_PATH_MAX_LENGTH:
+        return None
+
+    kinds = set()
+    position = 0
+    for match in _FAST_PATH_PATTERN.finditer(normalized):
+        if normalized[position:match.start()].strip():
+            return None
+        kinds.add(match.lastgroup)
+        position = match.end()
+    if normalized[position:].strip():
+        return None
+
+    kinds.discard('relleno')
+    if {'si', 'no'} <= kinds:
+        # "sí... no" es ambiguo
+        return None
+    return next((kind for kind in _FAST_PATH_PRIORITY if kind in kinds), None)
 
 
 class AIAgentService:
@@ -42,6 +212,7 @@ class AIAgentService:
 
             pending_confirmation = self._get_pending_confirmation(conversation)
             if pending_confirmation:
+                self._record_outcome('confirmation')
                 return self._handle_pending_confirmation(
                     conversation=conversation,
                     pending_data=pending_confirmation,
@@ -50,6 +221,12 @@ class AIAgentService:
                     customer_phone=customer_phone,
                     channel=channel
                 )
+
+            # Mensajes triviales: responder sin llamar al LLM
+            if current_app.config.get('AI_FAST_PATH_ENABLED', True):
+                fast_result = self._handle_trivial_message(conversation, message_text, business_id, customer_phone)
+                if fast_result:
+                    return fast_result
             
             context = conversation.conversation_context if conversation else []
             
@@ -61,88 +238,16 @@ class AIAgentService:
 
             pending_confirmation_payload = None
             
-            # Obtener catálogo de productos
-            products = Product.query.filter_by(
-                business_id=business_id,
-                is_available=True
-            ).all()
-            
-            products_info = "\n".join([
-                f"- {p.name}: ${p.price:,.0f} ({p.category})"
-                for p in products
-            ])
-            
-            # Crear prompt CORTO y RESTRICTIVO para ahorrar tokens
-            system_prompt = f"""Asistente de pedidos. Solo procesa pedidos del catálogo.
-
-    CATÁLOGO:
-    {products_info}
-
-    REGLAS ESTRICTAS:
-    1. SOLO habla de productos del catálogo
-    2. Respuestas CORTAS (máx 2 líneas)
-    3. NO respondas temas fuera del negocio
-    4. Si preguntan otra cosa: "Solo tomo pedidos"
-
-    REQUISITOS PARA PEDIDO COMPLETO:
-    - Mínimo un producto válido del catálogo con cantidad
-    - Nombre del cliente
-    - delivery_type definido (delivery o pickup)
-    - Si delivery_type=delivery, dirección obligatoria
-    - Si pickup, dirección opcional
-    - ready_to_create_order SOLO puede ser true cuando TODOS los campos estén completos
-    En caso contrario, indica missing_info y needs_more_info=true.
+            # Datos del pedido reconocidos localmente con el catálogo del negocio
+            catalog = CatalogService.get_snapshot(business_id)
+            extracted = self.extract_order_from_text(message_text, catalog)
 
-    Responde JSON:
-    {{
-        "intent": "hacer_pedido|consulta|saludo|otro",
-        "confidence": 0.95,
-        "entities": {{
-            "products": [{{"name": "producto", "quantity": 1, "unit_price": 5000}}],
-            "delivery_type": "delivery|pickup",
-            "address": "direccion",
-            "customer_name": "nombre"
-        }},
-        "response": "Respuesta CORTA",
-        "needs_more_info": true/false,
-        "missing_info": ["direccion"],
-        "ready_to_create_order": true/false
-    }}""".strip()
-            
-            # Llamar a Perplexity AI (compatible con OpenAI)
-            messages = [
-                {'role': 'system', 'content': system_prompt},
-                *context[-5:]  # Últimos 5 mensajes de contexto
-            ]
-            
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,  # Más determinista, menos creativo
-                max_tokens=200    # LIMITE CORTO: Solo 200 tokens
-            )
-            
-            # Parsear respuesta
-            ai_response = response.choices[0].message.content
-            
-            # Intentar extraer JSON de la respuesta
-            try:
-                # Buscar JSON en la respuesta
-                json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                else:
-                    result = json.loads(ai_response)
-            except json.JSONDecodeError:
-                # Si no se puede parsear, crear respuesta básica
-                result = {
-                    'intent': 'otro',
-                    'confidence': 0.5,
-                    'entities': {},
-                    'response': ai_response,
-                    'needs_more_info': False,
-                    'ready_to_create_order': False
-                }
+            result = self._complete_order_locally(conversation, extracted, message_text)
+            if result:
+                self._record_outcome('local_extraction')
+            else:
+                result = self._call_llm(catalog, context, extracted, conversation)
+                self._resolve_products(result, catalog)
             
             # Validar campos obligatorios antes de guardar
             self._enforce_required_fields(result, message_text)
@@ -165,6 +270,11 @@ class AIAgentService:
                     'confidence': result.get('confidence', 0.0)
                 }
 
+            if result.get('unknown_products'):
+                result['response'] = (
+                    f"No encontré en el menú: {', '.join(result['unknown_products'])}.\n{result['response']}"
+                )
+
             # Guardar o actualizar conversación
             if conversation:
                 conversation.conversation_context = context + [{
@@ -206,6 +316,203 @@ class AIAgentService:
                 'ready_to_create_order': False
             }
     
+    def _call_llm(self, catalog, context, extracted, conversation=None):
+        """
+        Pide al LLM la interpretación del mensaje.
+
+        Los datos ya extraídos localmente se envían como pista y completan
+        los campos que el LLM deje vacíos. En catálogos grandes el prompt
+        siempre incluye los productos del pedido en curso (`conversation`)
+        y los reconocidos en este mensaje.
+
+        Returns:
+            dict: Resultado con intent, entities y response
+        """
+        # Llamar a Perplexity AI (compatible con OpenAI)
+        self._record_outcome('llm')
+        limit = current_app.config.get('AI_PROMPT_CATALOG_TOP_K', 25)
+        if len(catalog.products) <= limit:
+            # Prompt del negocio (en caché hasta que cambien sus productos)
+            system_prompt = catalog.render(SYSTEM_PROMPT)
+        else:
+            # Catálogo grande: solo los productos relevantes para la conversación reciente
+            query = ' '.join(entry['content'] for entry in context[-5:] if entry.get('role') == 'user')
+            previous = (conversation.extracted_entities or {}).get('products') if conversation else None
+            include_ids = [
+                item.get('product_id')
+                for item in [*(previous or []), *extracted['products']]
+                if isinstance(item, dict)
+            ]
+            block = catalog.prompt_block_for(query, limit, include_ids)
+            system_prompt = SYSTEM_PROMPT.format(catalog=block)
+
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            *context[-5:]  # Últimos 5 mensajes de contexto
+        ]
+        detected = self._detected_entities_hint(extracted)
+        if detected:
+            messages.insert(1, {'role': 'system', 'content': detected})
+        
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.3,  # Más determinista, menos creativo
+            max_tokens=200    # LIMITE CORTO: Solo 200 tokens
+        )
+        
+        # Parsear respuesta
+        ai_response = response.choices[0].message.content
+        
+        # Intentar extraer JSON de la respuesta
+        try:
+            # Buscar JSON en la respuesta
+            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+            if json_match:
+                result = json.loads(json_match.group())
+            else:
+                result = json.loads(ai_response)
+        except json.JSONDecodeError:
+            # Si no se puede parsear, crear respuesta básica
+            result = {
+                'intent': 'otro',
+                'confidence': 0.5,
+                'entities': {},
+                'response': ai_response,
+                'needs_more_info': False,
+                'ready_to_create_order': False
+            }
+
+        self._prefill_entities(result, extracted)
+        return result
+
+    def _complete_order_locally(self, conversation, extracted, message_text):
+        """
+        Completa sin LLM un turno de pedido que se entendió por completo.
+
+        Aplica cuando cada palabra del mensaje se reconoció (productos,
+        cantidades, nombre, dirección, tipo de entrega o palabras de relleno)
+        y, sumando lo acumulado en la conversación, hay al menos un producto.
+
+        Returns:
+            dict o None: Resultado como el del LLM, o None para escalar al LLM
+        """
+        found = extracted['products'] or any(
+            extracted[field] for field in ('delivery_type', 'address', 'customer_name')
+        )
+        if extracted['unmatched'] or not found:
+            return None
+
+        entities = {}
+        if conversation and conversation.extracted_intent == 'hacer_pedido':
+            entities = copy.deepcopy(conversation.extracted_entities or {})
+            entities.pop('pending_confirmation', None)
+            entities.pop('awaiting_confirmation', None)
+        entities = self._merge_entities(entities, extracted)
+        if not entities.get('products'):
+            return None
+
+        result = {
+            'intent': 'hacer_pedido',
+            'confidence': 0.95,
+            'entities': entities,
+            'needs_more_info': False,
+            'ready_to_create_order': True
+        }
+        self._enforce_required_fields(result, message_text)
+        if result['needs_more_info']:
+            items = ', '.join(f"{item['name']} x{item['quantity']}" for item in entities['products'])
+            result['response'] = f"Anotado: {items}. {result['missing_info_message']}"
+        else:
+            result['response'] = 'Pedido completo.'
+        return result
+
+    @staticmethod
+    def _merge_entities(previous, extracted):
+        """Suma a las entidades acumuladas lo extraído del mensaje (una cantidad nueva reemplaza la anterior)."""
+        merged = copy.deepcopy(previous)
+        products = {
+            AIAgentService._normalize_text(item.get('name')): item
+            for item in merged.get('products') or [] if item.get('name')
+        }
+        for item in extracted['products']:
+            products[AIAgentService._normalize_text(item['name'])] = dict(item)
+        merged['products'] = list(products.values())
+        for field in ('delivery_type', 'address', 'customer_name'):
+            if extracted[field]:
+                merged[field] = extracted[field]
+        return merged
+
+    @staticmethod
+    def _as_quantity(value):
+        """Convierte una cantidad del LLM ("2", 2, 2.0) a entero positivo; 1 si no es válida."""
+        try:
+            quantity = int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            return 1
+        return quantity if quantity > 0 else 1
+
+    @staticmethod
+    def _resolve_products(result, catalog):
+        """
+        Relaciona los productos que devolvió el LLM con el catálogo: fija el ID,
+        el nombre y el precio del catálogo y aparta los que no existen en él.
+        """
+        entities = result.get('entities') or {}
+        products = [item for item in entities.get('products') or [] if isinstance(item, dict)]
+        if not products:
+            return
+
+        resolved = {}
+        unknown = []
+        for item, product in catalog.resolve(products):
+            if product is None:
+                unknown.append(item.get('name') or str(item.get('id')))
+                continue
+            quantity = AIAgentService._as_quantity(item.get('quantity', 1))
+            if product['id'] in resolved:
+                # El mismo producto nombrado dos veces: una sola línea
+                resolved[product['id']]['quantity'] += quantity
+                continue
+            item = {key: value for key, value in item.items() if key != 'id'}
+            item.update(
+                product_id=product['id'], name=product['name'],
+                quantity=quantity, unit_price=float(product['price'])
+            )
+            resolved[product['id']] = item
+
+        entities['products'] = list(resolved.values())
+        if unknown:
+            result['unknown_products'] = unknown
+
+    @staticmethod
+    def _prefill_entities(result, extracted):
+        """Completa los campos de pedido que el LLM dejó vacíos con los extraídos localmente."""
+        if result.get('intent') != 'hacer_pedido':
+            return
+        entities = result.setdefault('entities', {})
+        if not entities.get('products') and extracted['products']:
+            entities['products'] = copy.deepcopy(extracted['products'])
+        for field in ('delivery_type', 'address', 'customer_name'):
+            if not entities.get(field) and extracted[field]:
+                entities[field] = extracted[field]
+
+    @staticmethod
+    def _detected_entities_hint(extracted):
+        """Mensaje de sistema con los datos ya extraídos, para que el LLM solo complete lo que falta."""
+        detected = {
+            field: extracted[field]
+            for field in ('delivery_type', 'address', 'customer_name') if extracted[field]
+        }
+        if extracted['products']:
+            detected['products'] = [
+                {'id': item['product_id'], 'name': item['name'], 'quantity': item['quantity']}
+                for item in extracted['products']
+            ]
+        if not detected:
+            return None
+        return f"Datos ya detectados en el último mensaje: {json.dumps(detected, ensure_ascii=False)}"
+
     def _auto_create_order(self, business_id, customer_phone, ai_result, channel='whatsapp'):
         """
         Crea automáticamente un pedido basado en la respuesta de IA.
@@ -222,20 +529,23 @@ class AIAgentService:
             if not products_data:
                 return False, None
             
-            # Buscar productos en la base de datos y crear items
+            # Resolver los productos con el catálogo en caché: por ID o nombre normalizado, sin consultas por ítem
+            catalog = CatalogService.get_snapshot(business_id)
             items = []
-            for prod_data in products_data:
-                product = Product.query.filter_by(
-                    business_id=business_id,
-                    name=prod_data['name']
-                ).first()
-                
-                if product:
-                    items.append({
-                        'product_id': product.id,
-                        'quantity': prod_data.get('quantity', 1)
-                    })
+            unresolved = []
+            for prod_data, product in catalog.resolve(products_data):
+                if product is None:
+                    unresolved.append(prod_data.get('name') or prod_data.get('product_id'))
+                    continue
+                items.append({
+                    'product_id': product['id'],
+                    'quantity': prod_data.get('quantity', 1)
+                })
             
+            if unresolved:
+                # No registrar un pedido distinto del que el cliente confirmó
+                current_app.logger.warning(f"Productos no encontrados en el catálogo: {unresolved}")
+                return False, None
             if not items:
                 return False, None
             
@@ -279,6 +589,7 @@ class AIAgentService:
                 quantity = max(1, (prod or {}).get('quantity', 1))
                 if name:
                     valid_products.append({
+                        'product_id': (prod or {}).get('product_id'),
                         'name': name,
                         'quantity': quantity,
                         'unit_price': (prod or {}).get('unit_price')
@@ -391,6 +702,70 @@ class AIAgentService:
         db.session.commit()
         return response_payload
 
+    def _handle_trivial_message(self, conversation, message_text, business_id, customer_phone):
+        """
+        Responde localmente saludos, agradecimientos, despedidas, pedidos del
+        menú y "sí"/"no" sueltos.
+
+        Returns:
+            dict o None: Resultado como el del LLM, o None para escalar al LLM
+        """
+        kind = _classify_trivial_message(message_text)
+        if kind is None:
+            return None
+        if kind != 'menu' and conversation and conversation.extracted_intent == 'hacer_pedido':
+            # En medio de un pedido, "sí", "gracias" u "hola" dependen del contexto
+            return None
+
+        if kind == 'menu':
+            intent = 'consulta'
+            response_text = self._menu_response(CatalogService.get_snapshot(business_id))
+        else:
+            intent, template = FAST_PATH_REPLIES[kind]
+            response_text = self.generate_response(template)
+
+        context_entries = [
+            {'role': 'user', 'content': message_text},
+            {'role': 'assistant', 'content': response_text}
+        ]
+        if conversation:
+            self._append_conversation_entries(conversation, context_entries)
+        else:
+            db.session.add(AIConversation(
+                customer_phone=customer_phone,
+                business_id=business_id,
+                conversation_context=context_entries,
+                extracted_intent=intent,
+                extracted_entities={},
+                confidence_score=1.0
+            ))
+        db.session.commit()
+
+        self._record_outcome(f'fast_path:{kind}')
+        return {
+            'intent': intent,
+            'confidence': 1.0,
+            'entities': {},
+            'response': response_text,
+            'needs_more_info': False,
+            'ready_to_create_order': False,
+            'fast_path': True
+        }
+
+    def _menu_response(self, catalog):
+        """Lista el catálogo disponible, hasta AI_FAST_PATH_MENU_MAX_ITEMS productos."""
+        if not catalog.products:
+            return 'Por ahora no tenemos productos disponibles.'
+        limit = current_app.config.get('AI_FAST_PATH_MENU_MAX_ITEMS', 30)
+        lines = [
+            f"- {product['name']}: ${product['price']:,.0f} ({product['category']})"
+            for product in catalog.products
+        ]
+        text = 'Este es nuestro menú:\n' + '\n'.join(lines[:limit])
+        if len(lines) > limit:
+            text += f"\n...y {len(lines) - limit} productos más. Pregúntame por el que buscas."
+        return text
+
     def _set_pending_confirmation(self, conversation, data):
         if not conversation:
             return
@@ -430,13 +805,13 @@ class AIAgentService:
         normalized = self._normalize_text(message_text)
         if not normalized:
             return None
-        yes_keywords = {'si', 'sí', 'sii', 'claro', 'confirmo', 'adelante', 'vale', 'ok', 'de acuerdo'}
-        no_keywords = {'no', 'nel', 'cancela', 'cancelar', 'mejor no'}
-        if any(keyword in normalized for keyword in yes_keywords):
-            return 'yes'
-        if any(keyword in normalized for keyword in no_keywords):
-            return 'no'
-        return None
+        # Palabras completas: "quisiera" no es un "si" ni "nombre" un "no"
+        matches = {
+            decision for decision, pattern in _CONFIRMATION_PATTERNS.items() if pattern.search(normalized)
+        }
+        if len(matches) != 1:
+            return None
+        return matches.pop()
 
     def _build_order_summary(self, entities):
         if not entities:
@@ -478,11 +853,9 @@ class AIAgentService:
         if not text:
             return None
         lowered = text.lower()
-        pickup_keywords = ['recoger', 'recojo', 'retiro', 'paso por', 'voy por', 'pickup', 'para llevar']
-        delivery_keywords = ['envio', 'envío', 'entrega', 'mandalo', 'mándalo', 'traer', 'a domicilio', 'delivery']
-        if any(word in lowered for word in pickup_keywords):
+        if _PICKUP_PATTERN.search(lowered):
             return 'pickup'
-        if any(word in lowered for word in delivery_keywords):
+        if _DELIVERY_PATTERN.search(lowered):
             return 'delivery'
         return None
 
@@ -509,59 +882,178 @@ class AIAgentService:
             'saludo': '¡Hola! Bienvenido. ¿En qué puedo ayudarte hoy?',
             'consulta': 'Claro, con gusto te ayudo. ¿Qué necesitas saber?',
             'queja': 'Lamento mucho los inconvenientes. Déjame ayudarte a resolver esto.',
-            'despedida': '¡Hasta pronto! Gracias por tu preferencia.'
+            'despedida': '¡Hasta pronto! Gracias por tu preferencia.',
+            'agradecimiento': '¡Con gusto! Si deseas algo más, aquí estoy.',
+            'afirmacion': '¡Perfecto! ¿Qué deseas pedir? Escribe "menú" para ver nuestros productos.',
+            'negacion': 'Entendido. Si necesitas algo, aquí estoy.'
         }
         
         return responses.get(intent, 'Estoy aquí para ayudarte. ¿Qué necesitas?')
     
-    def extract_order_from_text(self, text, products_list):
+    @staticmethod
+    def get_stats():
         """
-        Extrae información de pedido de un texto.
-        
+        Obtiene las estadísticas de mensajes procesados en este proceso.
+
+        `local` son los mensajes respondidos sin llamar al LLM: los triviales
+        (fast_path:<tipo>) y las respuestas a una confirmación pendiente.
+
+        Returns:
+            dict: {'messages', 'llm_calls', 'local', 'local_ratio', 'by_outcome'}
+        """
+        stats = AIAgentService._stats()
+        with stats['lock']:
+            by_outcome = dict(stats['outcomes'])
+
+        messages = sum(by_outcome.values())
+        llm_calls = by_outcome.get('llm', 0)
+        return {
+            'messages': messages,
+            'llm_calls': llm_calls,
+            'local': messages - llm_calls,
+            'local_ratio': round((messages - llm_calls) / messages, 4) if messages else 0,
+            'by_outcome': by_outcome
+        }
+
+    @staticmethod
+    def reset_stats():
+        """Reinicia las estadísticas."""
+        stats = AIAgentService._stats()
+        with stats['lock']:
+            stats['outcomes'].clear()
+
+    @staticmethod
+    def _stats():
+        """Contadores de la aplicación actual."""
+        stats = current_app.extensions.get('ai_agent_stats')
+        if stats is None:
+            stats = current_app.extensions.setdefault(
+                'ai_agent_stats', {'lock': threading.Lock(), 'outcomes': {}}
+            )
+        return stats
+
+    @staticmethod
+    def _record_outcome(outcome):
+        """Suma un mensaje al contador `outcome` (llm, confirmation o fast_path:<tipo>)."""
+        stats = AIAgentService._stats()
+        with stats['lock']:
+            stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+
+    @staticmethod
+    def _address_length(value, catalog):
+        """
+        Largo de la dirección dentro de `value`: termina antes del primer
+        producto del catálogo (y de su cantidad, si la dirección conserva un número).
+        """
+        words = []  # (raíz, inicio de la palabra, palabra con un solo token)
+        for word in re.finditer(r'\S+', value):
+            word_tokens = tokenize(word.group())
+            words.extend((stem(token), word.start(), len(word_tokens) == 1) for token in word_tokens)
+
+        stems = [word[0] for word in words]
+        for position in range(1, len(words)):
+            match = catalog.matcher.match(stems, position)
+            if match is None or match[0] is AMBIGUOUS:
+                continue
+            cut = words[position][1]
+            previous, previous_start, whole_word = words[position - 1]
+            if whole_word and _parse_quantity(previous) is not None \
+                    and any(ch.isdigit() for ch in value[:previous_start]):
+                cut = previous_start
+            return cut
+        return len(value)
+
+    def extract_order_from_text(self, text, catalog):
+        """
+        Extrae localmente los datos de pedido de un mensaje.
+
+        La dirección y el nombre del cliente se toman con expresiones
+        precompiladas; luego una sola pasada sobre las palabras restantes
+        reconoce productos (con el buscador del catálogo) y cantidades.
+
         Args:
             text: Texto del mensaje
-            products_list: Lista de productos disponibles
-            
+            catalog: CatalogSnapshot del negocio
+
         Returns:
-            dict: Información extraída
+            dict: {'products': [{'product_id', 'name', 'quantity', 'unit_price'}],
+                   'delivery_type', 'address', 'customer_name',
+                   'unmatched': palabras que no se pudieron interpretar}
         """
-        # Implementación simplificada
-        # En producción, esto sería más robusto con NLP
-        
+        remaining = text or ''
         extracted = {
             'products': [],
-            'quantities': [],
-            'confidence': 0.7
+            'delivery_type': self._infer_delivery_type_from_text(remaining),
+            'address': None,
+            'customer_name': None,
+            'unmatched': []
         }
-        
-        text_lower = text.lower()
-        
-        # Buscar productos mencionados
-        for product in products_list:
-            if product.name.lower() in text_lower:
-                # Buscar cantidad cerca del nombre del producto
-                quantity = self._extract_quantity_near(text_lower, product.name.lower())
-                
-                extracted['products'].append(product)
-                extracted['quantities'].append(quantity)
-        
+
+        for field, pattern in (('customer_name', _NAME_PATTERN), ('address', _ADDRESS_PATTERN)):
+            match = pattern.search(remaining)
+            if not match:
+                continue
+            # El valor termina antes de conectores como "y" o "para": lo que sigue se sigue analizando
+            value = _VALUE_END.split(match.group('value'))[0]
+            if field == 'address':
+                # "calle 45 # 12-30 2 cafés": la dirección termina antes del producto
+                value = value[:self._address_length(value, catalog)]
+            end = match.start('value') + len(value)
+            value = ' '.join(value.strip(' .:#-').split())
+            if value:
+                extracted[field] = value.title() if field == 'customer_name' else value
+            remaining = f"{remaining[:match.start()]} {remaining[end:]}"
+        if extracted['address'] and not extracted['delivery_type']:
+            extracted['delivery_type'] = 'delivery'
+
+        tokens = tokenize(remaining)
+        stems = [stem(token) for token in tokens]
+        quantities = {}
+        pending_quantity = None
+        position = 0
+        while position < len(tokens):
+            quantity = _parse_quantity(tokens[position])
+            if quantity is not None:
+                if pending_quantity is not None:
+                    extracted['unmatched'].append(tokens[position - 1])
+                pending_quantity = quantity
+                position += 1
+                continue
+
+            match = catalog.matcher.match(stems, position)
+            if match is None:
+                if tokens[position] not in _ORDER_FILLER_WORDS:
+                    extracted['unmatched'].append(tokens[position])
+                position += 1
+                continue
+
+            product_id, end = match
+            if product_id is AMBIGUOUS:
+                extracted['unmatched'].extend(tokens[position:end])
+            else:
+                # Cantidad después del producto: "café x2" o "café x 2"
+                if pending_quantity is None:
+                    trailing = _TRAILING_QUANTITY.match(' '.join(tokens[end:end + 2]))
+                    if trailing:
+                        pending_quantity = int(trailing.group(1))
+                        end += len(trailing.group(0).split())
+                quantities[product_id] = quantities.get(product_id, 0) + (pending_quantity or 1)
+            pending_quantity = None
+            position = end
+
+        if pending_quantity is not None:
+            # Número suelto que no acompaña a ningún producto
+            extracted['unmatched'].append(str(pending_quantity))
+
+        for product_id, quantity in quantities.items():
+            product = catalog.by_id[product_id]
+            extracted['products'].append({
+                'product_id': product_id,
+                'name': product['name'],
+                'quantity': quantity,
+                'unit_price': float(product['price'])
+            })
         return extracted
-    
-    def _extract_quantity_near(self, text, product_name):
-        """Extrae cantidad cerca del nombre del producto."""
-        # Buscar patrones como "2 pizzas", "3x hamburguesas", etc.
-        patterns = [
-            r'(\d+)\s*x?\s*' + re.escape(product_name),
-            re.escape(product_name) + r'\s*x?\s*(\d+)',
-            r'(\d+)\s*' + re.escape(product_name)
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return int(match.group(1))
-        
-        return 1  # Default
 
 
 def init_ai_service(app):
@@ -0,0 +1,176 @@
+"""
+Servicio de archivo de pedidos.
+Mueve los pedidos cerrados o cancelados antiguos a tablas de archivo para que
+las tablas vivas solo crezcan con el trabajo en curso.
+"""
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, union_all, literal
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.data.models import (
+    Order, OrderItem, Message, Payment, Notification,
+    ArchivedOrder, ArchivedOrderItem, ArchivedMessage, ArchivedPayment
+)
+from app.services.order_view_service import OrderViewService
+
+
+# Estados finales: un pedido en estos estados ya no cambia
+ARCHIVABLE_STATUSES = ('closed', 'cancelled')
+
+# (tabla viva, tabla de archivo, columna que apunta al pedido)
+_ARCHIVE_TABLES = (
+    (Order, ArchivedOrder, 'id'),
+    (OrderItem, ArchivedOrderItem, 'order_id'),
+    (Message, ArchivedMessage, 'order_id'),
+    (Payment, ArchivedPayment, 'order_id'),
+)
+
+
+class ArchiveService:
+    """Servicio para archivar pedidos finalizados y consultar el histórico completo."""
+
+    @staticmethod
+    def archive_orders(older_than_days=None, batch_size=None, max_batches=None):
+        """
+        Archiva pedidos cerrados o cancelados sin cambios desde hace `older_than_days` días.
+
+        Trabaja en lotes acotados, cada uno en su propia transacción, para no
+        bloquear las tablas vivas mientras se mueve el histórico.
+
+        Args:
+            older_than_days: Antigüedad mínima (por defecto ARCHIVE_AFTER_DAYS, mínimo 1 día)
+            batch_size: Pedidos por lote (por defecto ARCHIVE_BATCH_SIZE)
+            max_batches: Máximo de lotes a procesar (None = hasta terminar)
+
+        Returns:
+            tuple: (success: bool, message: str, archived: int)
+        """
+        days = older_than_days if older_than_days is not None else \
+            current_app.config.get('ARCHIVE_AFTER_DAYS', 90)
+        # Un día como mínimo: los pedidos creados hoy nunca salen de la tabla viva
+        days = max(1, days)
+        batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', 500)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+        archived = 0
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                moved = ArchiveService.archive_batch(cutoff, batch_size)
+                if not moved:
+                    break
+                archived += moved
+                batches += 1
+
+            # Tombstones que ya tuvieron tiempo de llegar a los clientes
+            OrderViewService.prune_archived(
+                datetime.now(timezone.utc)
+                - timedelta(days=current_app.config.get('ARCHIVE_TOMBSTONE_DAYS', 7))
+            )
+            db.session.commit()
+            return True, f'{archived} pedidos archivados en {batches} lotes', archived
+
+        except Exception as e:
+            db.session.rollback()
+            return False, f'Error archivando pedidos: {str(e)}', archived
+
+    @staticmethod
+    def archive_batch(cutoff, batch_size):
+        """
+        Mueve un lote de pedidos (con ítems, mensajes y pago) al archivo y confirma.
+
+        Args:
+            cutoff: Solo pedidos con updated_at anterior a esta fecha
+            batch_size: Máximo de pedidos del lote
+
+        Returns:
+            int: Pedidos archivados
+        """
+        order_ids = [row.id for row in db.session.query(Order.id).filter(
+            Order.status.in_(ARCHIVABLE_STATUSES),
+            Order.updated_at < cutoff
+        ).order_by(Order.id).limit(batch_size).with_for_update(skip_locked=True)]
+
+        if not order_ids:
+            return 0
+
+        archived_at = datetime.now(timezone.utc)
+        for live, archive, order_column in _ARCHIVE_TABLES:
+            live_table, archive_table = live.__table__, archive.__table__
+            columns = [column.name for column in archive_table.c if column.name in live_table.c]
+            source = select(*[live_table.c[name] for name in columns])
+            if 'archived_at' in archive_table.c:
+                columns.append('archived_at')
+                source = source.add_columns(literal(archived_at, db.DateTime))
+            db.session.execute(
+                insert(archive_table).from_select(
+                    columns, source.where(live_table.c[order_column].in_(order_ids))
+                )
+            )
+
+        # Las notificaciones se conservan, pero sin referencia a la tabla viva
+        db.session.execute(
+            update(Notification)
+            .where(Notification.related_order_id.in_(order_ids))
+            .values(related_order_id=None)
+            .execution_options(synchronize_session=False)
+        )
+
+        # La fila proyectada queda como tombstone para los clientes del feed de cambios
+        OrderViewService.archive(order_ids, archived_at)
+        for live, _, order_column in reversed(_ARCHIVE_TABLES):
+            db.session.execute(
+                delete(live)
+                .where(getattr(live, order_column).in_(order_ids))
+                .execution_options(synchronize_session=False)
+            )
+
+        db.session.commit()
+        return len(order_ids)
+
+    @staticmethod
+    def has_archived_orders(business_id, start=None):
+        """
+        Indica si el archivo tiene pedidos del negocio creados desde `start`.
+
+        Args:
+            business_id: ID del negocio
+            start: Inicio del rango (None = cualquier fecha)
+
+        Returns:
+            bool
+        """
+        query = db.session.query(ArchivedOrder.id).filter(ArchivedOrder.business_id == business_id)
+        if start is not None:
+            query = query.filter(ArchivedOrder.created_at >= start)
+        return query.limit(1).first() is not None
+
+    @staticmethod
+    def orders_source(business_id, start=None):
+        """
+        Entidad de pedidos a consultar para un rango que empieza en `start`.
+
+        Retorna Order si el rango está completo en la tabla viva; si no, un alias
+        de Order sobre la unión de la tabla viva y el archivo (ya filtrada por
+        negocio y fecha). Se usa igual que Order en filtros y agregaciones.
+
+        Args:
+            business_id: ID del negocio
+            start: Inicio del rango (None = todo el histórico)
+
+        Returns:
+            Order o alias de Order
+        """
+        if not ArchiveService.has_archived_orders(business_id, start):
+            return Order
+
+        names = [column.name for column in Order.__table__.c]
+        branches = []
+        for table in (Order.__table__, ArchivedOrder.__table__):
+            branch = select(*[table.c[name] for name in names]).where(table.c.business_id == business_id)
+            if start is not None:
+                branch = branch.where(table.c.created_at >= start)
+            branches.append(branch)
+
+        return aliased(Order, union_all(*branches).subquery('orders_all'))
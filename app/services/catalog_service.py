@@ -0,0 +1,507 @@
+"""
+Servicio de catálogo para el agente IA.
+Guarda en memoria del proceso una foto del catálogo disponible de cada negocio
+(bloque del prompt, mapas por nombre y buscador de productos), etiquetada con
+su versión de catálogo.
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from itertools import chain
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import attributes
+from app.extensions import db
+from app.data.models import Business, Product
+
+
+# Atributos de Product que cambian la foto del catálogo (el stock no aparece en ella)
+_CATALOG_ATTRIBUTES = ('business_id', 'name', 'description', 'price', 'category', 'is_available')
+
+
+def normalize_name(text):
+    """Normaliza un nombre para compararlo: sin tildes, en minúsculas y con espacios simples."""
+    if not text:
+        return ''
+    normalized = unicodedata.normalize('NFKD', text)
+    normalized = ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+    return ' '.join(normalized.lower().split())
+
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Palabras que se pueden omitir al nombrar un producto ("pan de bono" -> "pan bono")
+_STOP_WORDS = frozenset({'de', 'del', 'la', 'el', 'los', 'las', 'con', 'y', 'en', 'a', 'al'})
+
+# Marcas del trie de CatalogMatcher
+_END = '$'
+AMBIGUOUS = object()
+
+
+def _as_int(value):
+    """Convierte un ID recibido del LLM ("12", 12, 12.0) a entero; None si no es válido."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def tokenize(text):
+    """Separa un texto normalizado en palabras."""
+    return _TOKEN.findall(normalize_name(text))
+
+
+def stem(token):
+    """Reduce el plural de una palabra normalizada ("empanadas" -> "empanada", "panes" -> "pan")."""
+    if len(token) > 4 and token.endswith('es') and token[-3] in 'dlnrjz':
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+class CatalogMatcher:
+    """
+    Trie de palabras sobre los nombres de los productos y sus variantes
+    (singular/plural, sin artículos ni preposiciones).
+
+    Encuentra en una sola pasada la coincidencia más larga que empieza en cada
+    posición del texto.
+    """
+
+    def __init__(self, products):
+        self.root = {}
+        for product in products:
+            stems = [stem(token) for token in tokenize(product['name'])]
+            aliases = {tuple(stems), tuple(token for token in stems if token not in _STOP_WORDS)}
+            for alias in aliases:
+                if alias:
+                    self._add(alias, product['id'])
+
+    def _add(self, alias, product_id):
+        node = self.root
+        for token in alias:
+            node = node.setdefault(token, {})
+        current = node.get(_END)
+        # Dos productos con el mismo nombre (o variante) no se pueden distinguir
+        node[_END] = product_id if current in (None, product_id) else AMBIGUOUS
+
+    def match(self, stems, start):
+        """
+        Busca el producto nombrado a partir de `stems[start]`.
+
+        Args:
+            stems: Palabras del texto ya reducidas con stem()
+            start: Posición inicial
+
+        Returns:
+            tuple o None: (ID del producto o AMBIGUOUS, posición siguiente a la coincidencia)
+        """
+        node = self.root
+        best = None
+        for position in range(start, len(stems)):
+            node = node.get(stems[position])
+            if node is None:
+                break
+            if _END in node:
+                best = (node[_END], position + 1)
+        return best
+
+
+class CatalogIndex:
+    """
+    Índice BM25 sobre nombre, categoría y descripción de los productos.
+
+    Las palabras de la consulta que no están en el índice se buscan por
+    trigramas, para tolerar errores de escritura ("hamburgesa").
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MIN_TRIGRAM_SIMILARITY = 0.5
+
+    def __init__(self, products):
+        self.postings = {}
+        lengths = []
+        for position, product in enumerate(products):
+            # El nombre cuenta doble: es lo que más se menciona
+            text = ' '.join(filter(None, (
+                product['name'], product['name'], product['category'], product['description']
+            )))
+            terms = [stem(token) for token in tokenize(text) if token not in _STOP_WORDS]
+            for term, frequency in Counter(terms).items():
+                self.postings.setdefault(term, []).append((position, frequency))
+            lengths.append(len(terms))
+
+        self.lengths = lengths
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0
+        total = len(lengths)
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        self.trigrams = {}
+        for term in self.postings:
+            for trigram in self._trigrams(term):
+                self.trigrams.setdefault(trigram, set()).add(term)
+
+    @staticmethod
+    def _trigrams(term):
+        padded = f'  {term} '
+        return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+    def _expand(self, term):
+        """Términos del índice para una palabra de la consulta: ella misma o los más parecidos."""
+        if term in self.postings:
+            return [term]
+        trigrams = self._trigrams(term)
+        shared = Counter(
+            candidate for trigram in trigrams for candidate in self.trigrams.get(trigram, ())
+        )
+        similar = {
+            candidate: count / len(trigrams | self._trigrams(candidate))
+            for candidate, count in shared.items()
+        }
+        best = max(similar.values(), default=0)
+        if best < self.MIN_TRIGRAM_SIMILARITY:
+            return []
+        return [candidate for candidate, similarity in similar.items() if similarity == best]
+
+    def search(self, text, limit):
+        """
+        Busca los productos más relevantes para un texto.
+
+        Args:
+            text: Consulta (por ejemplo, los últimos mensajes del cliente)
+            limit: Máximo de resultados
+
+        Returns:
+            list: Posiciones de los productos, de mayor a menor puntaje
+        """
+        terms = {stem(token) for token in tokenize(text) if token not in _STOP_WORDS}
+        scores = {}
+        for term in terms:
+            for indexed in self._expand(term):
+                idf = self.idf[indexed]
+                for position, frequency in self.postings[indexed]:
+                    norm = self.K1 * (1 - self.B + self.B * self.lengths[position] / self.avg_length)
+                    scores[position] = scores.get(position, 0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        return ranked[:limit]
+
+
+def _prompt_line(product):
+    """Línea de un producto en el catálogo del prompt, con su ID para que el LLM lo devuelva."""
+    return f"- [{product['id']}] {product['name']}: ${product['price']:,.0f} ({product['category']})"
+
+
+class CatalogSnapshot:
+    """
+    Catálogo disponible de un negocio en la versión `version`.
+
+    Se comparte entre peticiones y hilos: no debe modificarse.
+    """
+
+    def __init__(self, business_id, version, products):
+        self.business_id = business_id
+        self.version = version
+        self.products = tuple(products)
+        self.by_id = {product['id']: product for product in self.products}
+        self.by_name = {}
+        for product in self.products:
+            # Con nombres repetidos gana el producto más antiguo
+            self.by_name.setdefault(normalize_name(product['name']), product)
+        self.prompt_block = "\n".join(_prompt_line(product) for product in self.products)
+        self._rendered = {}
+        self._matcher = None
+        self._index = None
+
+    @property
+    def matcher(self):
+        """CatalogMatcher del catálogo, construido la primera vez que se usa."""
+        if self._matcher is None:
+            self._matcher = CatalogMatcher(self.products)
+        return self._matcher
+
+    @property
+    def index(self):
+        """CatalogIndex del catálogo, construido la primera vez que se usa."""
+        if self._index is None:
+            self._index = CatalogIndex(self.products)
+        return self._index
+
+    def prompt_block_for(self, query, limit, include_ids=()):
+        """
+        Bloque del catálogo con los `limit` productos más relevantes para `query`.
+
+        Los catálogos pequeños van completos. En los grandes se listan primero
+        los productos de `include_ids` (ya mencionados en el pedido), luego
+        los mejores resultados de la búsqueda y, si faltan para llegar a
+        `limit` (p. ej. un saludo que no coincide con nada), los primeros del
+        catálogo; una última línea indica cuántos productos quedan y sus
+        categorías, para que el cliente pregunte por ellos.
+
+        Args:
+            query: Texto de la conversación reciente
+            limit: Máximo de productos a listar
+            include_ids: IDs de productos que siempre se listan
+
+        Returns:
+            str: Bloque para el campo {catalog} del prompt
+        """
+        if len(self.products) <= limit:
+            return self.prompt_block
+
+        selected = [
+            self.by_id[product_id] for product_id in dict.fromkeys(include_ids) if product_id in self.by_id
+        ]
+        chosen = {product['id'] for product in selected}
+        candidates = [self.products[position] for position in self.index.search(query, limit)]
+        for product in chain(candidates, self.products):
+            if len(selected) >= limit:
+                break
+            if product['id'] not in chosen:
+                selected.append(product)
+                chosen.add(product['id'])
+
+        categories = sorted({product['category'] for product in self.products if product['category']})[:20]
+        lines = [_prompt_line(product) for product in selected]
+        lines.append(
+            f"- (y {len(self.products) - len(selected)} productos más"
+            + (f" en: {', '.join(categories)}" if categories else '')
+            + ". Si piden otro, pide el nombre exacto)"
+        )
+        return "\n".join(lines)
+
+    def find(self, name):
+        """Busca un producto por nombre, sin importar tildes, mayúsculas ni espacios."""
+        return self.by_name.get(normalize_name(name))
+
+    def resolve(self, items):
+        """
+        Resuelve contra el catálogo los productos de un pedido, sin consultar la base.
+
+        Cada ítem se busca por nombre normalizado, luego con el buscador de
+        nombres (plurales y variantes) y por su ID (`product_id` o `id`). Si el
+        nombre y el ID señalan productos distintos, gana el nombre: es lo que
+        el cliente leyó en el resumen.
+
+        Args:
+            items: Ítems con 'name' y/o 'product_id'/'id'
+
+        Returns:
+            list: (ítem, producto del catálogo o None) por cada ítem
+        """
+        resolved = []
+        for item in items:
+            name = item.get('name')
+            by_name = (self.find(name) or self._match_name(name)) if name else None
+            by_id = self.by_id.get(_as_int(item.get('product_id', item.get('id'))))
+            resolved.append((item, by_name or by_id))
+        return resolved
+
+    def _match_name(self, name):
+        """Producto cuyo nombre (o variante) coincide con todo `name`."""
+        stems = [stem(token) for token in tokenize(name)]
+        match = self.matcher.match(stems, 0) if stems else None
+        if match is None or match[0] is AMBIGUOUS or match[1] != len(stems):
+            return None
+        return self.by_id[match[0]]
+
+    def render(self, template):
+        """
+        Retorna `template` con el catálogo en {catalog}, formateado una sola vez por plantilla.
+
+        Args:
+            template: Plantilla de str.format con el campo {catalog}
+
+        Returns:
+            str: Prompt con el catálogo
+        """
+        rendered = self._rendered.get(template)
+        if rendered is None:
+            rendered = self._rendered[template] = template.format(catalog=self.prompt_block)
+        return rendered
+
+
+class _CatalogCache:
+    """Estado de la caché de catálogos de una aplicación."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshots = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'build_seconds': 0.0}
+
+
+class CatalogService:
+    """Servicio de fotos del catálogo por negocio."""
+
+    @staticmethod
+    def get_snapshot(business_id):
+        """
+        Obtiene la foto del catálogo disponible del negocio.
+
+        Con la caché vigente solo se lee la versión del catálogo (una fila de
+        businesses); el catálogo se consulta de nuevo únicamente cuando cambió
+        algún producto del negocio, en este o en otro proceso.
+
+        Args:
+            business_id: ID del negocio
+
+        Returns:
+            CatalogSnapshot
+        """
+        cache = CatalogService._cache()
+        version = CatalogService.current_version(business_id)
+
+        snapshot = cache.snapshots.get(business_id)
+        if snapshot is not None and snapshot.version == version:
+            with cache.lock:
+                cache.stats['hits'] += 1
+                if business_id in cache.snapshots:
+                    cache.snapshots.move_to_end(business_id)
+            return snapshot
+
+        started = time.perf_counter()
+        # La versión se leyó antes que los productos: un cambio en medio se
+        # reconstruye en la siguiente lectura, no se pierde
+        snapshot = CatalogService._build(business_id, version)
+        elapsed = time.perf_counter() - started
+
+        with cache.lock:
+            cache.stats['misses'] += 1
+            cache.stats['build_seconds'] += elapsed
+            cache.snapshots[business_id] = snapshot
+            cache.snapshots.move_to_end(business_id)
+            while len(cache.snapshots) > current_app.config.get('CATALOG_CACHE_MAX_ENTRIES', 500):
+                cache.snapshots.popitem(last=False)
+        return snapshot
+
+    @staticmethod
+    def current_version(business_id, session=None):
+        """
+        Obtiene la versión del catálogo del negocio.
+
+        Args:
+            business_id: ID del negocio
+
+        Returns:
+            int: Versión actual (0 si el negocio no existe o nunca cambió su catálogo)
+        """
+        session = session or db.session
+        version = session.query(Business.catalog_version).filter_by(id=business_id).scalar()
+        return version or 0
+
+    @staticmethod
+    def bump_versions(business_ids, session=None):
+        """Incrementa la versión del catálogo de los negocios dentro de la transacción actual."""
+        session = session or db.session
+        business_ids = sorted(business_id for business_id in set(business_ids) if business_id is not None)
+        if not business_ids:
+            return
+        session.execute(
+            update(Business)
+            .where(Business.id.in_(business_ids))
+            .values(catalog_version=Business.catalog_version + 1)
+        )
+
+    @staticmethod
+    def invalidate(business_id=None):
+        """Descarta la foto de un negocio (o todas) en este proceso."""
+        cache = CatalogService._cache()
+        with cache.lock:
+            if business_id is None:
+                cache.snapshots.clear()
+            else:
+                cache.snapshots.pop(business_id, None)
+
+    @staticmethod
+    def get_stats():
+        """
+        Obtiene las estadísticas de la caché del proceso actual.
+
+        `saved_ms` estima el tiempo ahorrado: aciertos por el tiempo medio de
+        construir una foto (consulta del catálogo y armado del prompt).
+
+        Returns:
+            dict: {'hits', 'misses', 'requests', 'hit_ratio', 'avg_build_ms', 'saved_ms', 'snapshots'}
+        """
+        cache = CatalogService._cache()
+        with cache.lock:
+            stats = dict(cache.stats)
+            snapshots = len(cache.snapshots)
+
+        requests = stats['hits'] + stats['misses']
+        avg_build_ms = stats['build_seconds'] * 1000 / stats['misses'] if stats['misses'] else 0
+        return {
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'requests': requests,
+            'hit_ratio': round(stats['hits'] / requests, 4) if requests else 0,
+            'avg_build_ms': round(avg_build_ms, 3),
+            'saved_ms': round(stats['hits'] * avg_build_ms, 1),
+            'snapshots': snapshots
+        }
+
+    @staticmethod
+    def reset_stats():
+        """Reinicia las estadísticas."""
+        cache = CatalogService._cache()
+        with cache.lock:
+            cache.stats.update(hits=0, misses=0, build_seconds=0.0)
+
+    @staticmethod
+    def _build(business_id, version):
+        """Consulta el catálogo disponible del negocio y arma su foto."""
+        rows = db.session.execute(
+            select(Product.id, Product.name, Product.price, Product.category, Product.description)
+            .where(Product.business_id == business_id, Product.is_available.is_(True))
+            .order_by(Product.id)
+        ).all()
+        return CatalogSnapshot(business_id, version, [
+            {
+                'id': row.id,
+                'name': row.name,
+                'price': row.price,
+                'category': row.category,
+                'description': row.description
+            }
+            for row in rows
+        ])
+
+    @staticmethod
+    def _cache():
+        """Estado de la caché de la aplicación actual."""
+        cache = current_app.extensions.get('catalog_cache')
+        if cache is None:
+            cache = current_app.extensions.setdefault('catalog_cache', _CatalogCache())
+        return cache
+
+
+def _bump_catalog_versions(session, flush_context, instances):
+    """Incrementa la versión del catálogo de los negocios cuyos productos cambian en el flush."""
+    business_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Product):
+            continue
+        if obj in session.deleted:
+            # Antes del flush la fila aún existe: se puede cargar el negocio si expiró
+            business_ids.add(obj.business_id)
+            continue
+        if obj in session.dirty and not any(
+            attributes.get_history(obj, key).has_changes() for key in _CATALOG_ATTRIBUTES
+        ):
+            continue
+        # Si el producto cambió de negocio, también cambia el catálogo anterior
+        business_ids.update([obj.business_id, *attributes.get_history(obj, 'business_id').deleted])
+
+    CatalogService.bump_versions(business_ids, session)
+
+
+def init_catalog_tracking():
+    """Registra el versionado automático del catálogo en la sesión de SQLAlchemy."""
+    if not event.contains(db.session, 'before_flush', _bump_catalog_versions):
+        event.listen(db.session, 'before_flush', _bump_catalog_versions)
@@ -0,0 +1,202 @@
+"""
+Servicio de feed de cambios de pedidos.
+Mantiene una versión monótona por negocio y permite sincronizar solo los pedidos modificados.
+"""
+from datetime import timezone
+from sqlalchemy import event, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.data.models import Order, OrderView, DataVersion
+from app.services.order_service import OrderService, BOARD_STATUSES, KITCHEN_STATUSES, DELIVERY_STATUSES
+
+
+class ChangeFeedService:
+    """Servicio para versionado de datos y sincronización incremental de pedidos."""
+
+    # Estados visibles en cada vista que consume el feed
+    VIEWS = {
+        'board': BOARD_STATUSES,
+        'kitchen': KITCHEN_STATUSES,
+        'delivery': DELIVERY_STATUSES
+    }
+
+    @staticmethod
+    def current_version(business_id, session=None):
+        """
+        Obtiene la versión actual de los datos del negocio.
+
+        Args:
+            business_id: ID del negocio
+
+        Returns:
+            int: Versión actual (0 si el negocio aún no tiene escrituras)
+        """
+        session = session or db.session
+        version = session.query(DataVersion.version).filter_by(business_id=business_id).scalar()
+        return version or 0
+
+    @staticmethod
+    def bump_version(business_id, session=None):
+        """
+        Incrementa la versión del negocio dentro de la transacción actual.
+
+        La fila queda bloqueada hasta el commit, así que las versiones se
+        confirman en orden y un lector nunca salta cambios ya publicados.
+
+        Args:
+            business_id: ID del negocio
+
+        Returns:
+            int: Nueva versión
+        """
+        session = session or db.session
+        bind = session.get_bind()
+        stmt = (
+            update(DataVersion)
+            .where(DataVersion.business_id == business_id)
+            .values(version=DataVersion.version + 1)
+        )
+
+        if bind.dialect.update_returning:
+            version = session.execute(stmt.returning(DataVersion.version)).scalar()
+        else:
+            version = ChangeFeedService.current_version(business_id, session) \
+                if session.execute(stmt).rowcount else None
+        if version is not None:
+            return version
+
+        if bind.dialect.name == 'postgresql':
+            upsert = postgresql.insert
+        elif bind.dialect.name == 'sqlite':
+            upsert = sqlite.insert
+        else:
+            session.execute(insert(DataVersion).values(business_id=business_id, version=1))
+            return 1
+
+        stmt = upsert(DataVersion).values(business_id=business_id, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DataVersion.business_id],
+            set_={'version': DataVersion.version + 1}
+        ).returning(DataVersion.version)
+        return session.execute(stmt).scalar()
+
+    @staticmethod
+    def get_changes(business_id, view, since=None, limit=100):
+        """
+        Obtiene los pedidos creados o modificados después de una versión.
+
+        Lee de la proyección order_views, que guarda el change_seq de cada pedido.
+
+        Los pedidos que ya no pertenecen a la vista (su estado salió de los
+        estados de la vista o pasaron al archivo) se retornan como tombstones
+        para que el cliente los quite. En el tablero los pedidos cerrados antes
+        de hoy también salen, como en get_board_snapshot.
+        Sin `since` se retorna la vista completa como punto de partida.
+
+        Args:
+            business_id: ID del negocio
+            view: Vista del cliente ('board', 'kitchen' o 'delivery')
+            since: Versión recibida en la sincronización anterior
+            limit: Máximo de pedidos por respuesta
+
+        Returns:
+            dict: {'orders': [OrderView], 'removed': [ids], 'cursor': int, 'has_more': bool}
+        """
+        statuses = ChangeFeedService.VIEWS[view]
+
+        if since is None:
+            # Leer la versión antes que los pedidos: un cambio concurrente se repetirá, no se perderá
+            cursor = ChangeFeedService.current_version(business_id)
+            if view == 'board':
+                orders, _ = OrderService.get_board_snapshot(business_id)
+            else:
+                orders = OrderService.get_orders_for_statuses(business_id, statuses)
+            return {'orders': orders, 'removed': [], 'cursor': cursor, 'has_more': False}
+
+        query = OrderView.query.filter(OrderView.business_id == business_id)
+
+        changed = query.filter(OrderView.change_seq > since).order_by(
+            OrderView.change_seq, OrderView.order_id
+        ).limit(limit + 1).all()
+
+        has_more = len(changed) > limit
+        if has_more:
+            # No cortar en medio de una versión: todos sus pedidos van en la misma respuesta
+            boundary = changed[limit].change_seq
+            complete = [order for order in changed[:limit] if order.change_seq < boundary]
+            changed = complete or query.filter(OrderView.change_seq == boundary).order_by(OrderView.order_id).all()
+
+        cursor = changed[-1].change_seq if changed else since
+        closed_since = _utc_naive(OrderService.board_closed_since()) if view == 'board' else None
+        visible = [order for order in changed if _in_view(order, statuses, closed_since)]
+        removed = [order.order_id for order in changed if not _in_view(order, statuses, closed_since)]
+        if closed_since is not None:
+            removed += ChangeFeedService._expired_closed(business_id, since, closed_since)
+        return {'orders': visible, 'removed': removed, 'cursor': cursor, 'has_more': has_more}
+
+    @staticmethod
+    def _expired_closed(business_id, since, closed_since):
+        """
+        Pedidos cerrados que el cliente recibió antes de `since` y que dejaron
+        el tablero al cambiar el día, sin ninguna escritura que los marque.
+
+        El día de la última versión conocida por el cliente se estima con el
+        pedido escrito en esa versión: solo los cerrados desde ese día pueden
+        seguir en su tablero. Puede repetir pedidos que el cliente ya quitó;
+        quitarlos de nuevo no tiene efecto.
+        """
+        last_write = db.session.query(OrderView.updated_at).filter(
+            OrderView.business_id == business_id,
+            OrderView.change_seq <= since
+        ).order_by(OrderView.change_seq.desc()).limit(1).scalar()
+        if last_write is None:
+            return []
+
+        since_day = _utc_naive(last_write).replace(hour=0, minute=0, second=0, microsecond=0)
+        if since_day >= closed_since:
+            return []
+        return [row.order_id for row in db.session.query(OrderView.order_id).filter(
+            OrderView.business_id == business_id,
+            OrderView.status == 'closed',
+            OrderView.change_seq <= since,
+            OrderView.updated_at >= since_day,
+            OrderView.updated_at < closed_since
+        )]
+
+
+def _in_view(order, statuses, closed_since=None):
+    """Indica si el pedido se muestra en la vista (cerrados solo desde `closed_since`)."""
+    if order.status not in statuses:
+        return False
+    if closed_since is not None and order.status == 'closed':
+        return order.updated_at is not None and _utc_naive(order.updated_at) >= closed_since
+    return True
+
+
+def _utc_naive(value):
+    """Las columnas guardan UTC sin zona horaria."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _assign_change_seq(session, flush_context, instances):
+    """Asigna la nueva versión del negocio a cada pedido creado o modificado en el flush."""
+    touched = {}
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Order) or obj.business_id is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        touched.setdefault(obj.business_id, []).append(obj)
+
+    for business_id, orders in touched.items():
+        version = ChangeFeedService.bump_version(business_id, session)
+        for order in orders:
+            order.change_seq = version
+
+
+def init_change_tracking():
+    """Registra el versionado automático de pedidos en la sesión de SQLAlchemy."""
+    if not event.contains(db.session, 'before_flush', _assign_change_seq):
+        event.listen(db.session, 'before_flush', _assign_change_seq)
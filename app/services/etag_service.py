@@ -0,0 +1,78 @@
+"""
+Servicio de ETags por negocio.
+Construye ETags a partir de la versión de datos del negocio y lleva
+estadísticas de respuestas 304 por endpoint.
+"""
+import hashlib
+import threading
+import time
+from app.services.change_feed_service import ChangeFeedService
+
+
+class ETagService:
+    """Servicio para GET condicionales basados en la versión de datos del negocio."""
+
+    _lock = threading.Lock()
+    _stats = {}
+
+    @staticmethod
+    def build_etag(business_id, scope, user_id, variant='', ttl=None):
+        """
+        Construye el ETag fuerte de una respuesta.
+
+        Solo consulta la fila de versión del negocio (data_versions), nunca
+        las tablas de pedidos.
+
+        Args:
+            business_id: ID del negocio
+            scope: Nombre del endpoint (forma parte del ETag)
+            user_id: ID de sesión del usuario (las respuestas dependen de sus permisos)
+            variant: Parámetros de la petición que cambian la respuesta
+            ttl: Segundos de validez para respuestas que dependen de la hora actual
+
+        Returns:
+            str: Valor del ETag (sin comillas)
+        """
+        version = ChangeFeedService.current_version(business_id)
+        parts = [scope, str(business_id), str(user_id), str(version), variant]
+        if ttl:
+            parts.append(str(int(time.time() // ttl)))
+        digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+        return f"{business_id}-{version}-{digest}"
+
+    @staticmethod
+    def record(scope, not_modified):
+        """Registra una petición condicional y si se respondió con 304."""
+        with ETagService._lock:
+            stats = ETagService._stats.setdefault(scope, {'requests': 0, 'not_modified': 0})
+            stats['requests'] += 1
+            if not_modified:
+                stats['not_modified'] += 1
+
+    @staticmethod
+    def get_stats():
+        """
+        Obtiene las estadísticas de ETags del proceso actual.
+
+        Returns:
+            dict: {scope: {'requests', 'not_modified', 'hit_ratio'}, 'total': {...}}
+        """
+        with ETagService._lock:
+            snapshot = {scope: dict(stats) for scope, stats in ETagService._stats.items()}
+
+        total = {'requests': 0, 'not_modified': 0}
+        for stats in snapshot.values():
+            total['requests'] += stats['requests']
+            total['not_modified'] += stats['not_modified']
+        snapshot['total'] = total
+
+        for stats in snapshot.values():
+            stats['hit_ratio'] = round(stats['not_modified'] / stats['requests'], 4) \
+                if stats['requests'] else 0
+        return snapshot
+
+    @staticmethod
+    def reset_stats():
+        """Reinicia las estadísticas."""
+        with ETagService._lock:
+            ETagService._stats.clear()
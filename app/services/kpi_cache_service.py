@@ -0,0 +1,186 @@
+"""
+Servicio de caché de KPIs.
+Guarda en memoria del proceso el resultado de cada (negocio, endpoint, período),
+etiquetado con la versión de datos del negocio, y calcula una sola vez los
+resultados que piden varias peticiones a la vez (single-flight).
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from app.services.change_feed_service import ChangeFeedService
+
+
+# Resultados posibles de una petición a la caché
+_OUTCOMES = ('hits', 'stale_hits', 'misses', 'coalesced')
+
+
+class _Entry:
+    """Resultado calculado con la versión `version` del negocio."""
+    __slots__ = ('value', 'version', 'computed_at')
+
+    def __init__(self, value, version, computed_at):
+        self.value = value
+        self.version = version
+        self.computed_at = computed_at
+
+
+class _Flight:
+    """Cálculo en curso de una clave; las demás peticiones esperan su resultado."""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class _KPICache:
+    """Estado de la caché de una aplicación."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.flights = {}
+        self.stats = {}
+
+
+class KPICacheService:
+    """Servicio de caché de resultados de KPIService."""
+
+    @staticmethod
+    def get_or_compute(business_id, endpoint, period, compute):
+        """
+        Retorna el resultado en caché o lo calcula una sola vez para todas las peticiones.
+
+        - Resultados con menos de KPI_CACHE_MAX_STALE_SECONDS se sirven sin
+          consultar la base (desactualización acotada).
+        - Después se compara la versión de datos del negocio: cualquier escritura
+          de pedidos, de este o de otro proceso, invalida el resultado. Aun sin
+          escrituras, expira a los KPI_CACHE_TTL_SECONDS porque los KPIs
+          dependen de la hora actual.
+        - Si otra petición ya está calculando la misma clave, se espera su
+          resultado en lugar de repetir el cálculo.
+
+        Args:
+            business_id: ID del negocio
+            endpoint: Nombre del KPI (forma parte de la clave)
+            period: Período o parámetros del cálculo (forma parte de la clave)
+            compute: Función sin argumentos que calcula el resultado
+
+        Returns:
+            Resultado de `compute` (no debe modificarse: se comparte entre peticiones)
+        """
+        config = current_app.config
+        if not config.get('KPI_CACHE_ENABLED', True):
+            return compute()
+
+        cache = KPICacheService._cache()
+        key = (business_id, endpoint, period)
+
+        entry = cache.entries.get(key)
+        if entry is not None and time.monotonic() - entry.computed_at < config.get('KPI_CACHE_MAX_STALE_SECONDS', 5):
+            KPICacheService._record(cache, endpoint, 'stale_hits')
+            return entry.value
+
+        version = ChangeFeedService.current_version(business_id)
+        entry = cache.entries.get(key)
+        if (
+            entry is not None
+            and entry.version == version
+            and time.monotonic() - entry.computed_at < config.get('KPI_CACHE_TTL_SECONDS', 60)
+        ):
+            KPICacheService._record(cache, endpoint, 'hits')
+            with cache.lock:
+                if key in cache.entries:
+                    cache.entries.move_to_end(key)
+            return entry.value
+
+        with cache.lock:
+            flight = cache.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = cache.flights[key] = _Flight()
+
+        if not leader:
+            KPICacheService._record(cache, endpoint, 'coalesced')
+            if flight.done.wait(config.get('KPI_CACHE_WAIT_SECONDS', 30)):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            # El cálculo en curso tarda demasiado: calcular por cuenta propia
+            return compute()
+
+        KPICacheService._record(cache, endpoint, 'misses')
+        try:
+            # La versión se leyó antes de calcular: una escritura en medio deja
+            # el resultado desactualizado y la siguiente petición lo recalcula
+            flight.value = compute()
+            with cache.lock:
+                cache.entries[key] = _Entry(flight.value, version, time.monotonic())
+                cache.entries.move_to_end(key)
+                while len(cache.entries) > config.get('KPI_CACHE_MAX_ENTRIES', 1000):
+                    cache.entries.popitem(last=False)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with cache.lock:
+                cache.flights.pop(key, None)
+            flight.done.set()
+
+    @staticmethod
+    def get_stats():
+        """
+        Obtiene las estadísticas de la caché del proceso actual.
+
+        `hits` se sirvieron tras verificar la versión del negocio; `stale_hits`
+        sin verificarla (resultados recientes); `coalesced` esperaron el cálculo
+        de otra petición; `misses` calcularon el resultado.
+
+        Returns:
+            dict: {endpoint: {'hits', 'stale_hits', 'misses', 'coalesced',
+                              'requests', 'hit_ratio'}, 'total': {...}, 'entries': int}
+        """
+        cache = KPICacheService._cache()
+        with cache.lock:
+            snapshot = {endpoint: dict(stats) for endpoint, stats in cache.stats.items()}
+            entries = len(cache.entries)
+
+        total = dict.fromkeys(_OUTCOMES, 0)
+        for stats in snapshot.values():
+            for name in total:
+                total[name] += stats[name]
+        snapshot['total'] = total
+
+        for stats in snapshot.values():
+            stats['requests'] = sum(stats.values())
+            served = stats['hits'] + stats['stale_hits'] + stats['coalesced']
+            stats['hit_ratio'] = round(served / stats['requests'], 4) if stats['requests'] else 0
+        snapshot['entries'] = entries
+        return snapshot
+
+    @staticmethod
+    def reset_stats():
+        """Reinicia las estadísticas."""
+        cache = KPICacheService._cache()
+        with cache.lock:
+            cache.stats.clear()
+
+    @staticmethod
+    def _cache():
+        """Estado de la caché de la aplicación actual."""
+        cache = current_app.extensions.get('kpi_cache')
+        if cache is None:
+            cache = current_app.extensions.setdefault('kpi_cache', _KPICache())
+        return cache
+
+    @staticmethod
+    def _record(cache, endpoint, outcome):
+        """Suma una petición al contador `outcome` del endpoint."""
+        with cache.lock:
+            stats = cache.stats.setdefault(
+                endpoint, dict.fromkeys(_OUTCOMES, 0)
+            )
+            stats[outcome] += 1
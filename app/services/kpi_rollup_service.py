@@ -0,0 +1,435 @@
+"""
+Servicio de agregados de KPIs (tabla kpi_rollups).
+Mantiene por negocio una fila por hora y por día con los agregados de sus
+pedidos. Las escrituras solo marcan sus franjas como pendientes; se recalculan
+antes de leer los KPIs del negocio.
+"""
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import event, func, and_, or_, case, insert, delete, false, literal_column
+from sqlalchemy.orm import Session, attributes
+from app.extensions import db
+from app.data.models import Order, ArchivedOrder, Business, DataVersion, KPIRollup, KPIRollupPending
+from app.data.models.kpi_rollup import STATUS_COUNT_COLUMNS
+from app.services.archive_service import ArchiveService
+
+
+GRANULARITY_DELTAS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1)
+}
+
+# Columnas con agregados; todas se suman al combinar franjas
+METRIC_COLUMNS = tuple(
+    column.name for column in KPIRollup.__table__.c
+    if column.name not in ('business_id', 'granularity', 'bucket_start', 'updated_at')
+)
+
+# Columnas de Order que cambian algún agregado
+_TRACKED_ATTRIBUTES = (
+    'business_id', 'created_at', 'status', 'total_amount', 'response_time_seconds',
+    'preparation_time_seconds', 'ready_at', 'delivered_at'
+)
+
+
+def _utc_naive(value):
+    """Las columnas guardan UTC sin zona horaria."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _floor(value, granularity):
+    """Inicio de la franja que contiene `value`."""
+    value = _utc_naive(value).replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        value = value.replace(hour=0)
+    return value
+
+
+def _ceil(value, granularity):
+    """Inicio de la primera franja que empieza en `value` o después."""
+    floor = _floor(value, granularity)
+    return floor if floor == _utc_naive(value) else floor + GRANULARITY_DELTAS[granularity]
+
+
+def _merge_ranges(starts, granularity):
+    """Agrupa inicios de franja consecutivos en rangos [desde, hasta)."""
+    delta = GRANULARITY_DELTAS[granularity]
+    ranges = []
+    for start in sorted(starts):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = start + delta
+        else:
+            ranges.append([start, start + delta])
+    return [tuple(item) for item in ranges]
+
+
+class KPIRollupService:
+    """Servicio para mantener y consultar los agregados de KPIs por franja."""
+
+    @staticmethod
+    def refresh(buckets, session=None):
+        """
+        Recalcula las franjas de hora y de día que contienen los pedidos indicados.
+
+        Cada franja se recalcula completa desde los pedidos (vivos y archivados),
+        así que el resultado no depende del orden de las escrituras. Se bloquea
+        la fila de versión del negocio, la misma que toma cada escritura de
+        pedidos, para que dos transacciones no recalculen la misma franja a la vez.
+
+        Args:
+            buckets: Iterable de (business_id, created_at) de los pedidos escritos
+            session: Sesión a usar (por defecto db.session)
+
+        Returns:
+            int: Franjas de hora escritas
+        """
+        session = session or db.session
+        hours = {}
+        for business_id, created_at in buckets:
+            if business_id is not None and created_at is not None:
+                hours.setdefault(business_id, set()).add(_floor(created_at, 'hour'))
+
+        written = 0
+        for business_id in sorted(hours):
+            KPIRollupService._lock_business(session, business_id)
+            written += KPIRollupService._write_hours(
+                session, business_id, _merge_ranges(hours[business_id], 'hour')
+            )
+            days = {_floor(hour, 'day') for hour in hours[business_id]}
+            KPIRollupService._write_days(session, business_id, _merge_ranges(days, 'day'))
+        return written
+
+    @staticmethod
+    def mark_pending(buckets, session=None):
+        """
+        Marca como pendientes las franjas de hora de los pedidos indicados.
+
+        Se ejecuta dentro de la transacción que escribe los pedidos: solo
+        inserta filas en kpi_rollup_pending, sin recalcular ni bloquear, así
+        que el costo de la escritura no depende de cuántos pedidos tenga la
+        franja.
+
+        Args:
+            buckets: Iterable de (business_id, created_at) de los pedidos escritos
+            session: Sesión a usar (por defecto db.session)
+
+        Returns:
+            int: Franjas marcadas
+        """
+        session = session or db.session
+        rows = {
+            (business_id, _floor(created_at, 'hour'))
+            for business_id, created_at in buckets
+            if business_id is not None and created_at is not None
+        }
+        if rows:
+            session.execute(insert(KPIRollupPending.__table__), [
+                {'business_id': business_id, 'bucket_start': bucket_start}
+                for business_id, bucket_start in sorted(rows)
+            ])
+        return len(rows)
+
+    @staticmethod
+    def refresh_pending(business_id):
+        """
+        Recalcula las franjas pendientes del negocio antes de leer sus agregados.
+
+        Trabaja en una transacción propia que se confirma al terminar, así que
+        la petición que lee no queda con escrituras abiertas. Varias escrituras
+        de la misma franja se recalculan una sola vez.
+
+        Args:
+            business_id: ID del negocio
+
+        Returns:
+            int: Franjas de hora escritas
+        """
+        if db.session.query(KPIRollupPending.id).filter(
+            KPIRollupPending.business_id == business_id
+        ).first() is None:
+            return 0
+
+        with Session(db.engine) as session:
+            # Mismo bloqueo que refresh: dos lectores no recalculan a la vez y
+            # las marcas se leen después de las escrituras que las esperaban
+            KPIRollupService._lock_business(session, business_id)
+            pending = session.query(KPIRollupPending.id, KPIRollupPending.bucket_start).filter(
+                KPIRollupPending.business_id == business_id
+            ).all()
+            written = 0
+            if pending:
+                written = KPIRollupService.refresh(
+                    [(business_id, row.bucket_start) for row in pending], session
+                )
+                table = KPIRollupPending.__table__
+                session.execute(delete(table).where(table.c.id.in_([row.id for row in pending])))
+            session.commit()
+        return written
+
+    @staticmethod
+    def rebuild(business_id=None, batch_days=7):
+        """
+        Reconstruye las franjas desde los pedidos vivos y archivados, por lotes de días.
+
+        Sirve para poblar la tabla en una base existente y para repararla. Cada
+        lote reemplaza sus franjas y se confirma por separado, así que los KPIs
+        siguen respondiendo durante la reconstrucción.
+
+        Args:
+            business_id: Limitar a un negocio (None = todos)
+            batch_days: Días por lote
+
+        Returns:
+            int: Franjas de hora escritas
+        """
+        if business_id is not None:
+            business_ids = [business_id]
+        else:
+            business_ids = [row.id for row in db.session.query(Business.id).order_by(Business.id)]
+
+        written = 0
+        table = KPIRollup.__table__
+        end = _floor(datetime.now(timezone.utc), 'day') + GRANULARITY_DELTAS['day']
+        for current_id in business_ids:
+            first = min(
+                (value for value in (
+                    db.session.query(func.min(Order.created_at)).filter(Order.business_id == current_id).scalar(),
+                    db.session.query(func.min(ArchivedOrder.created_at)).filter(
+                        ArchivedOrder.business_id == current_id
+                    ).scalar()
+                ) if value is not None),
+                default=None
+            )
+
+            start = _floor(first, 'day') if first is not None else end
+            # Franjas de antes del primer pedido (pedidos eliminados)
+            db.session.execute(
+                delete(table).where(table.c.business_id == current_id, table.c.bucket_start < start)
+            )
+            db.session.commit()
+
+            while start < end:
+                batch_end = min(start + timedelta(days=batch_days), end)
+                KPIRollupService._lock_business(db.session, current_id)
+                written += KPIRollupService._write_hours(db.session, current_id, [(start, batch_end)])
+                KPIRollupService._write_days(db.session, current_id, [(start, batch_end)])
+                db.session.commit()
+                start = batch_end
+        return written
+
+    @staticmethod
+    def split_range(start, end):
+        """
+        Divide [start, end) en franjas completas y bordes que no cubren una franja.
+
+        Usa franjas de día donde caben y de hora en los extremos; los bordes de
+        menos de una hora se calculan desde los pedidos.
+
+        Args:
+            start: Inicio del rango
+            end: Fin del rango (excluido)
+
+        Returns:
+            tuple: (buckets: [(granularity, desde, hasta)], edges: [(desde, hasta)])
+        """
+        start, end = _utc_naive(start), _utc_naive(end)
+        first_hour, last_hour = _ceil(start, 'hour'), _floor(end, 'hour')
+        if first_hour >= last_hour:
+            return [], ([(start, end)] if start < end else [])
+
+        edges = []
+        if start < first_hour:
+            edges.append((start, first_hour))
+        if last_hour < end:
+            edges.append((last_hour, end))
+
+        first_day, last_day = _ceil(first_hour, 'day'), _floor(last_hour, 'day')
+        if first_day >= last_day:
+            return [('hour', first_hour, last_hour)], edges
+
+        buckets = [('day', first_day, last_day)]
+        if first_hour < first_day:
+            buckets.append(('hour', first_hour, first_day))
+        if last_day < last_hour:
+            buckets.append(('hour', last_day, last_hour))
+        return buckets, edges
+
+    @staticmethod
+    def sum_buckets(business_id, periods):
+        """
+        Suma los agregados de las franjas de varios períodos en una sola consulta.
+
+        Args:
+            business_id: ID del negocio
+            periods: {nombre: [(granularity, desde, hasta)]} (de split_range)
+
+        Returns:
+            dict: {nombre: {columna: total}} con las columnas de METRIC_COLUMNS
+        """
+        conditions = {}
+        for name, buckets in periods.items():
+            conditions[name] = or_(false(), *[
+                and_(
+                    KPIRollup.granularity == granularity,
+                    KPIRollup.bucket_start >= start,
+                    KPIRollup.bucket_start < end
+                ) for granularity, start, end in buckets
+            ])
+
+        if not any(periods.values()):
+            return {name: dict.fromkeys(METRIC_COLUMNS, 0) for name in periods}
+
+        row = db.session.query(*[
+            func.sum(getattr(KPIRollup, column)).filter(condition).label(f'{name}_{column}')
+            for name, condition in conditions.items()
+            for column in METRIC_COLUMNS
+        ]).filter(
+            KPIRollup.business_id == business_id,
+            or_(*conditions.values())
+        ).one()
+
+        return {
+            name: {column: getattr(row, f'{name}_{column}') or 0 for column in METRIC_COLUMNS}
+            for name in periods
+        }
+
+    @staticmethod
+    def _lock_business(session, business_id):
+        """Bloquea la fila de versión del negocio hasta el commit (si existe)."""
+        session.query(DataVersion.business_id).filter(
+            DataVersion.business_id == business_id
+        ).with_for_update().first()
+
+    @staticmethod
+    def _bucket(column, granularity, session):
+        """Inicio de la franja de `column`, según el motor de base de datos."""
+        if session.get_bind().dialect.name == 'postgresql':
+            return func.date_trunc(literal_column(f"'{granularity}'"), column)
+        pattern = '%Y-%m-%d %H:00:00' if granularity == 'hour' else '%Y-%m-%d 00:00:00'
+        return func.strftime(literal_column(f"'{pattern}'"), column)
+
+    @staticmethod
+    def _write_hours(session, business_id, ranges):
+        """Reemplaza las franjas de hora de los rangos con los agregados de sus pedidos."""
+        from app.services.kpi_service import KPIService
+
+        orders = ArchiveService.orders_source(business_id, ranges[0][0])
+        bucket = KPIRollupService._bucket(orders.created_at, 'hour', session)
+        elapsed = case(
+            (orders.delivered_at.isnot(None), KPIService._seconds_between(orders.created_at, orders.delivered_at)),
+            (orders.ready_at.isnot(None), KPIService._seconds_between(orders.created_at, orders.ready_at))
+        )
+
+        query = session.query(
+            bucket.label('bucket_start'),
+            func.count(orders.id).label('orders_count'),
+            *[
+                func.count(orders.id).filter(orders.status == status).label(column)
+                for status, column in STATUS_COUNT_COLUMNS.items()
+            ],
+            func.count(orders.id).filter(orders.response_time_seconds < 60).label('automated_count'),
+            func.sum(orders.total_amount).filter(orders.status != 'cancelled').label('sales_amount'),
+            func.sum(orders.response_time_seconds).label('response_time_sum'),
+            func.count(orders.response_time_seconds).label('response_time_count'),
+            func.sum(orders.preparation_time_seconds).label('preparation_time_sum'),
+            func.count(orders.preparation_time_seconds).label('preparation_time_count'),
+            func.count(orders.id).filter(elapsed <= 30 * 60).label('satisfaction_30_count'),
+            func.count(orders.id).filter(and_(elapsed > 30 * 60, elapsed <= 45 * 60)).label('satisfaction_45_count'),
+            func.count(orders.id).filter(and_(elapsed > 45 * 60, elapsed <= 60 * 60)).label('satisfaction_60_count'),
+            func.count(orders.id).filter(and_(elapsed > 60 * 60, elapsed <= 90 * 60)).label('satisfaction_90_count'),
+            func.count(orders.id).filter(elapsed > 90 * 60).label('satisfaction_over_count')
+        ).filter(
+            orders.business_id == business_id,
+            or_(*[and_(orders.created_at >= start, orders.created_at < end) for start, end in ranges])
+        ).group_by(bucket)
+
+        return KPIRollupService._replace(session, business_id, 'hour', ranges, query)
+
+    @staticmethod
+    def _write_days(session, business_id, ranges):
+        """Reemplaza las franjas de día de los rangos sumando sus franjas de hora."""
+        bucket = KPIRollupService._bucket(KPIRollup.bucket_start, 'day', session)
+        query = session.query(
+            bucket.label('bucket_start'),
+            *[func.sum(getattr(KPIRollup, column)).label(column) for column in METRIC_COLUMNS]
+        ).filter(
+            KPIRollup.business_id == business_id,
+            KPIRollup.granularity == 'hour',
+            or_(*[and_(KPIRollup.bucket_start >= start, KPIRollup.bucket_start < end) for start, end in ranges])
+        ).group_by(bucket)
+
+        return KPIRollupService._replace(session, business_id, 'day', ranges, query)
+
+    @staticmethod
+    def _replace(session, business_id, granularity, ranges, query):
+        """Borra las franjas de los rangos e inserta las filas agregadas por `query`."""
+        now = datetime.now(timezone.utc)
+        rows = []
+        for row in query:
+            values = {column: getattr(row, column) or 0 for column in METRIC_COLUMNS}
+            bucket_start = row.bucket_start
+            if isinstance(bucket_start, str):
+                bucket_start = datetime.strptime(bucket_start, '%Y-%m-%d %H:%M:%S')
+            values.update(
+                business_id=business_id,
+                granularity=granularity,
+                bucket_start=_utc_naive(bucket_start),
+                updated_at=now
+            )
+            rows.append(values)
+
+        table = KPIRollup.__table__
+        session.execute(
+            delete(table).where(
+                table.c.business_id == business_id,
+                table.c.granularity == granularity,
+                or_(*[and_(table.c.bucket_start >= start, table.c.bucket_start < end) for start, end in ranges])
+            )
+        )
+        if rows:
+            session.execute(insert(table), rows)
+        return len(rows)
+
+
+def _mark_kpi_rollups(session, flush_context):
+    """Marca como pendientes las franjas de los pedidos escritos por el ORM en este flush."""
+    buckets = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Order):
+            continue
+        if obj in session.dirty and not any(
+            attributes.get_history(obj, key).has_changes() for key in _TRACKED_ATTRIBUTES
+        ):
+            continue
+        if obj in session.deleted:
+            # La fila ya no existe: usar los valores cargados, sin recargar
+            business_ids = [obj.__dict__.get('business_id')]
+            created_ats = [obj.__dict__.get('created_at')]
+        else:
+            # Si cambió el negocio o la fecha de creación, también la franja anterior
+            business_ids = [obj.business_id, *attributes.get_history(obj, 'business_id').deleted]
+            created_ats = [obj.created_at, *attributes.get_history(obj, 'created_at').deleted]
+        buckets.update(
+            (business_id, created_at) for business_id in business_ids for created_at in created_ats
+        )
+
+    if buckets:
+        KPIRollupService.mark_pending(buckets, session)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    """
+    No hace nada: registrado con active_history=True, SQLAlchemy carga el valor
+    anterior (aunque esté expirado) antes de reemplazarlo, y así el historial
+    indica la franja de la que sale el pedido.
+    """
+
+
+def init_kpi_rollups():
+    """Registra el mantenimiento automático de kpi_rollups en la sesión de SQLAlchemy."""
+    for attribute in (Order.business_id, Order.created_at):
+        if not event.contains(attribute, 'set', _load_previous_value):
+            event.listen(attribute, 'set', _load_previous_value, active_history=True)
+    if not event.contains(db.session, 'after_flush', _mark_kpi_rollups):
+        event.listen(db.session, 'after_flush', _mark_kpi_rollups)
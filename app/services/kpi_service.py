@@ -3,9 +3,24 @@ Servicio de KPIs y métricas de rendimiento.
 Calcula y proporciona métricas del negocio.
 """
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import func, and_, case
+import pytz
+from sqlalchemy import func, and_, or_, case, extract, false, literal, DateTime, String
+from flask import current_app
 from app.extensions import db
-from app.data.models import Order, Customer, Payment
+from app.data.models import Order, Customer, Payment, Business
+from app.data.models.kpi_rollup import STATUS_COUNT_COLUMNS
+from app.services.archive_service import ArchiveService
+from app.services.kpi_rollup_service import KPIRollupService
+
+
+# Pedidos que cuentan como completados (conversión y precisión de IA)
+COMPLETED_STATUSES = ('closed', 'paid')
+
+# Agregados de kpi_rollups que usan las comparaciones de períodos
+_EDGE_COLUMNS = (
+    'orders_count', 'closed_count', 'paid_count', 'cancelled_count', 'automated_count',
+    'response_time_sum', 'response_time_count', 'sales_amount'
+)
 
 
 class KPIService:
@@ -22,103 +37,32 @@ class KPIService:
         Returns:
             dict: Diccionario con métricas
         """
-        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Pedidos del día
-        orders_today = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= today_start
-            )
-        ).count()
-        
-        # Tiempo promedio de respuesta (en minutos)
-        avg_response_seconds = db.session.query(
-            func.avg(Order.response_time_seconds)
-        ).filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= today_start,
-                Order.response_time_seconds.isnot(None)
-            )
-        ).scalar()
-        
-        avg_response_minutes = round(avg_response_seconds / 60, 1) if avg_response_seconds else 0
-        
-        # Ventas del día
-        sales_today = db.session.query(
-            func.sum(Order.total_amount)
+        now = datetime.now(timezone.utc)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Una sola agregación sobre los pedidos del día (índice business_id, created_at)
+        metrics = db.session.query(
+            func.count(Order.id).label('orders_today'),
+            func.avg(Order.response_time_seconds).label('avg_response_seconds'),
+            func.sum(
+                case((Order.status != 'cancelled', Order.total_amount))
+            ).label('sales_today'),
+            func.avg(KPIService._satisfaction_score(Order, now)).label('satisfaction')
         ).filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= today_start,
-                Order.status.notin_(['cancelled'])
-            )
-        ).scalar()
-        
-        # Satisfacción (calculada en base a tiempos de entrega)
-        # Obtener pedidos de hoy con tiempos calculados
-        orders_with_times = Order.query.filter(
             and_(
                 Order.business_id == business_id,
                 Order.created_at >= today_start
             )
-        ).all()
+        ).one()
         
-        if not orders_with_times:
-            satisfaction = 0
-        else:
-            total_score = 0
-            now_aware = datetime.now(timezone.utc)
-            
-            for order in orders_with_times:
-                # Asegurar que created_at tenga timezone
-                created_at = order.created_at
-                if created_at.tzinfo is None:
-                    created_at = created_at.replace(tzinfo=timezone.utc)
-                
-                # Calcular tiempo total desde creación hasta entrega/estado actual
-                if order.delivered_at:
-                    # Pedido entregado - calcular tiempo total
-                    delivered_at = order.delivered_at
-                    if delivered_at.tzinfo is None:
-                        delivered_at = delivered_at.replace(tzinfo=timezone.utc)
-                    delivery_time_minutes = (delivered_at - created_at).total_seconds() / 60
-                elif order.ready_at:
-                    # Pedido listo pero no entregado - usar tiempo hasta ready
-                    ready_at = order.ready_at
-                    if ready_at.tzinfo is None:
-                        ready_at = ready_at.replace(tzinfo=timezone.utc)
-                    delivery_time_minutes = (ready_at - created_at).total_seconds() / 60
-                elif order.accepted_at:
-                    # Pedido aceptado pero no listo - usar tiempo hasta now
-                    delivery_time_minutes = (now_aware - created_at).total_seconds() / 60
-                else:
-                    # Pedido recién recibido - asignar score neutral
-                    delivery_time_minutes = None
-                
-                # Asignar score según tiempo
-                if delivery_time_minutes is None:
-                    score = 70  # Pedidos nuevos reciben score neutral
-                elif delivery_time_minutes <= 30:
-                    score = 100  # Excelente: <= 30 min
-                elif delivery_time_minutes <= 45:
-                    score = 85   # Muy bueno: 30-45 min
-                elif delivery_time_minutes <= 60:
-                    score = 70   # Bueno: 45-60 min
-                elif delivery_time_minutes <= 90:
-                    score = 50   # Regular: 60-90 min
-                else:
-                    score = 30   # Malo: > 90 min
-                
-                total_score += score
-            
-            satisfaction = round(total_score / len(orders_with_times), 1)
+        avg_response_seconds = metrics.avg_response_seconds
+        avg_response_minutes = round(float(avg_response_seconds) / 60, 1) if avg_response_seconds else 0
+        satisfaction = round(float(metrics.satisfaction), 1) if metrics.orders_today else 0
         
         return {
-            'orders_today': orders_today,
+            'orders_today': metrics.orders_today,
             'avg_response_time': avg_response_minutes,
-            'sales_today': float(sales_today) if sales_today else 0,
+            'sales_today': float(metrics.sales_today) if metrics.sales_today else 0,
             'satisfaction': satisfaction
         }
     
@@ -134,115 +78,282 @@ class KPIService:
         Returns:
             dict: Diccionario con métricas y comparaciones
         """
-        now = datetime.now(timezone.utc)
-        current_period_start = now - timedelta(days=period_days)
-        previous_period_start = current_period_start - timedelta(days=period_days)
-        
-        # Tiempo promedio de respuesta
-        current_response_time = KPIService._get_avg_response_time(
-            business_id, current_period_start, now
-        )
-        previous_response_time = KPIService._get_avg_response_time(
-            business_id, previous_period_start, current_period_start
-        )
-        
-        # Pedidos procesados
-        current_orders = KPIService._get_orders_count(
-            business_id, current_period_start, now
-        )
-        previous_orders = KPIService._get_orders_count(
-            business_id, previous_period_start, current_period_start
-        )
+        metrics = KPIService._period_metrics(business_id, KPIService._comparison_periods(period_days))
+        return KPIService._build_comparisons(metrics['current'], metrics['previous'])
+    
+    @staticmethod
+    def get_operational_metrics(business_id, period_days=30):
+        """
+        Obtiene métricas operativas detalladas.
         
-        # Tasa de conversión
-        current_conversion = KPIService._get_conversion_rate(
-            business_id, current_period_start, now
-        )
-        previous_conversion = KPIService._get_conversion_rate(
-            business_id, previous_period_start, current_period_start
-        )
+        Args:
+            business_id: ID del negocio
+            period_days: Días del período
+            
+        Returns:
+            dict: Métricas operativas
+        """
+        period_start = datetime.now(timezone.utc) - timedelta(days=period_days)
+        metrics = KPIService._period_metrics(business_id, {'current': (period_start, None)})
+        return KPIService._build_operational(metrics['current'], period_days)
+    
+    @staticmethod
+    def get_financial_impact(business_id, period_days=30):
+        """
+        Calcula el impacto financiero.
         
-        # Satisfacción del cliente (basada en pedidos completados)
-        current_satisfaction = KPIService._get_satisfaction_score(
-            business_id, current_period_start, now
-        )
-        previous_satisfaction = KPIService._get_satisfaction_score(
-            business_id, previous_period_start, current_period_start
-        )
+        Args:
+            business_id: ID del negocio
+            period_days: Días del período
+            
+        Returns:
+            dict: Métricas financieras
+        """
+        metrics = KPIService._period_metrics(business_id, KPIService._comparison_periods(period_days))
+        return KPIService._build_financial(metrics['current'], metrics['previous'], period_days)
+    
+    @staticmethod
+    def get_kpi_summary(business_id, period_days=30):
+        """
+        Comparaciones, métricas operativas e impacto financiero de una sola vez.
         
-        # Calcular porcentajes de cambio
-        response_time_change = KPIService._calculate_percentage_change(
-            previous_response_time, current_response_time, inverse=True
-        )
-        orders_change = KPIService._calculate_percentage_change(
-            previous_orders, current_orders
-        )
-        conversion_change = KPIService._calculate_percentage_change(
-            previous_conversion, current_conversion
-        )
-        satisfaction_change = KPIService._calculate_percentage_change(
-            previous_satisfaction, current_satisfaction
-        )
+        Equivale a llamar get_kpi_comparisons, get_operational_metrics y
+        get_financial_impact, pero con una única agregación de ambos períodos.
         
+        Args:
+            business_id: ID del negocio
+            period_days: Días del período
+            
+        Returns:
+            dict: {'comparisons', 'operational', 'financial'}
+        """
+        metrics = KPIService._period_metrics(business_id, KPIService._comparison_periods(period_days))
+        current, previous = metrics['current'], metrics['previous']
         return {
-            'response_time': {
-                'current': current_response_time,
-                'previous': previous_response_time,
-                'change': response_time_change,
-                'improved': response_time_change > 0
-            },
-            'orders_processed': {
-                'current': current_orders,
-                'previous': previous_orders,
-                'change': orders_change,
-                'improved': orders_change > 0
-            },
-            'conversion_rate': {
-                'current': current_conversion,
-                'previous': previous_conversion,
-                'change': conversion_change,
-                'improved': conversion_change > 0
-            },
-            'satisfaction': {
-                'current': current_satisfaction,
-                'previous': previous_satisfaction,
-                'change': satisfaction_change,
-                'improved': satisfaction_change > 0
-            }
+            'comparisons': KPIService._build_comparisons(current, previous),
+            'operational': KPIService._build_operational(current, period_days),
+            'financial': KPIService._build_financial(current, previous, period_days)
         }
     
     @staticmethod
-    def get_operational_metrics(business_id, period_days=30):
+    def get_orders_by_hour(business_id, days=7):
         """
-        Obtiene métricas operativas detalladas.
+        Obtiene la distribución de pedidos por hora del día (hora local del negocio).
         
         Args:
             business_id: ID del negocio
-            period_days: Días del período
+            days: Días a analizar
             
         Returns:
-            dict: Métricas operativas
+            list: 24 conteos; el índice es la hora local (0-23)
         """
-        period_start = datetime.now(timezone.utc) - timedelta(days=period_days)
+        heatmap = KPIService.get_orders_heatmap(business_id, days)
+        return [sum(weekday[hour] for weekday in heatmap) for hour in range(24)]
+    
+    @staticmethod
+    def get_orders_heatmap(business_id, days=28):
+        """
+        Obtiene los pedidos por día de la semana y hora (hora local del negocio).
         
-        # Tasa de automatización (pedidos con IA vs manuales)
-        total_orders = Order.query.filter(
+        El conteo se agrupa en SQL sin cargar pedidos: en PostgreSQL se convierte
+        created_at con AT TIME ZONE; en otros motores se agrupa por hora UTC y
+        cada hora se traslada a la zona del negocio en Python.
+        
+        Args:
+            business_id: ID del negocio
+            days: Días a analizar
+            
+        Returns:
+            list: 7 filas (0 = lunes ... 6 = domingo) de 24 conteos (hora local)
+        """
+        period_start = datetime.now(timezone.utc) - timedelta(days=days)
+        orders = ArchiveService.orders_source(business_id, period_start)
+        tz_name = KPIService.get_business_timezone(business_id)
+        heatmap = [[0] * 24 for _ in range(7)]
+        is_postgresql = db.session.get_bind().dialect.name == 'postgresql'
+        
+        if is_postgresql:
+            # created_at guarda UTC sin zona: primero a timestamptz, luego a la hora local
+            local_time = orders.created_at.op('AT TIME ZONE')(literal('UTC', String)).op('AT TIME ZONE')(
+                literal(tz_name, String)
+            )
+        else:
+            local_time = func.strftime('%Y-%m-%d %H:00:00', orders.created_at)
+        
+        # Subconsulta: los parámetros de la conversión no se repiten en el GROUP BY
+        created = db.session.query(local_time.label('created')).filter(
             and_(
-                Order.business_id == business_id,
-                Order.created_at >= period_start
+                orders.business_id == business_id,
+                orders.created_at >= period_start
             )
-        ).count()
+        ).subquery()
+        
+        if is_postgresql:
+            weekday = extract('isodow', created.c.created)
+            hour = extract('hour', created.c.created)
+            rows = db.session.query(
+                weekday.label('weekday'), hour.label('hour'), func.count().label('orders')
+            ).group_by(weekday, hour)
+            for row in rows:
+                heatmap[int(row.weekday) - 1][int(row.hour)] += row.orders
+        else:
+            tz = pytz.timezone(tz_name)
+            rows = db.session.query(created.c.created, func.count().label('orders')).group_by(created.c.created)
+            for row in rows:
+                utc_hour = datetime.strptime(row.created, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+                local = utc_hour.astimezone(tz)
+                heatmap[local.weekday()][local.hour] += row.orders
+        
+        return heatmap
+    
+    @staticmethod
+    def get_business_timezone(business_id):
+        """Zona horaria IANA del negocio, o DEFAULT_TIMEZONE si no tiene una válida."""
+        business = db.session.get(Business, business_id)
+        tz_name = business.timezone_name if business else None
+        if tz_name not in pytz.all_timezones_set:
+            tz_name = current_app.config.get('DEFAULT_TIMEZONE', 'UTC')
+        return tz_name
+    
+    # Métodos auxiliares privados
+    
+    @staticmethod
+    def _comparison_periods(period_days):
+        """Período actual (hasta ahora) y el anterior de la misma duración."""
+        current_period_start = datetime.now(timezone.utc) - timedelta(days=period_days)
+        previous_period_start = current_period_start - timedelta(days=period_days)
+        return {
+            'current': (current_period_start, None),
+            'previous': (previous_period_start, current_period_start)
+        }
+    
+    @staticmethod
+    def _period_metrics(business_id, periods):
+        """
+        Agregados de varios períodos a partir de kpi_rollups.
+        
+        Cada período se cubre con franjas de día y de hora (una consulta para
+        todos los períodos, O(franjas)); solo los bordes de menos de una hora se
+        calculan desde los pedidos, con agregados FILTER (WHERE ...) por período.
+        Antes se recalculan las franjas que dejaron pendientes las escrituras.
         
-        # Asumiendo que todos los pedidos con response_time < 60 segundos son automatizados
-        automated_orders = Order.query.filter(
+        Args:
+            business_id: ID del negocio
+            periods: {nombre: (inicio, fin o None = ahora)}
+            
+        Returns:
+            dict: {nombre: {total, completed, cancelled, automated,
+                            avg_response_seconds, sales}}
+        """
+        now = datetime.now(timezone.utc)
+        buckets, edges = {}, {}
+        for name, (start, end) in periods.items():
+            buckets[name], edges[name] = KPIRollupService.split_range(start, end or now)
+        
+        KPIRollupService.refresh_pending(business_id)
+        totals = KPIRollupService.sum_buckets(business_id, buckets)
+        edge_totals = KPIService._edge_totals(business_id, edges)
+        
+        metrics = {}
+        for name in periods:
+            sums = {column: totals[name][column] + edge_totals[name][column] for column in _EDGE_COLUMNS}
+            response_count = sums['response_time_count']
+            metrics[name] = {
+                'total': sums['orders_count'],
+                'completed': sum(sums[STATUS_COUNT_COLUMNS[status]] for status in COMPLETED_STATUSES),
+                'cancelled': sums['cancelled_count'],
+                'automated': sums['automated_count'],
+                'avg_response_seconds': float(sums['response_time_sum']) / response_count if response_count else 0,
+                'sales': float(sums['sales_amount'])
+            }
+        return metrics
+    
+    @staticmethod
+    def _edge_totals(business_id, edges):
+        """
+        Agregados desde los pedidos para los tramos que no cubre una franja completa.
+        
+        Args:
+            business_id: ID del negocio
+            edges: {nombre: [(desde, hasta)]}
+            
+        Returns:
+            dict: {nombre: {columna: total}} con las columnas de _EDGE_COLUMNS
+        """
+        if not any(edges.values()):
+            return {name: dict.fromkeys(_EDGE_COLUMNS, 0) for name in edges}
+        
+        range_start = min(start for ranges in edges.values() for start, _ in ranges)
+        orders = ArchiveService.orders_source(business_id, range_start)
+        
+        conditions = {
+            name: or_(false(), *[
+                and_(orders.created_at >= start, orders.created_at < end) for start, end in ranges
+            ])
+            for name, ranges in edges.items()
+        }
+        
+        columns = []
+        for name, in_period in conditions.items():
+            columns += [
+                func.count(orders.id).filter(in_period).label(f'{name}_orders_count'),
+                *[
+                    func.count(orders.id).filter(
+                        and_(in_period, orders.status == status)
+                    ).label(f'{name}_{STATUS_COUNT_COLUMNS[status]}')
+                    for status in (*COMPLETED_STATUSES, 'cancelled')
+                ],
+                # Asumiendo que los pedidos con response_time < 60 segundos son automatizados
+                func.count(orders.id).filter(
+                    and_(in_period, orders.response_time_seconds < 60)
+                ).label(f'{name}_automated_count'),
+                func.sum(orders.response_time_seconds).filter(in_period).label(f'{name}_response_time_sum'),
+                func.count(orders.response_time_seconds).filter(in_period).label(f'{name}_response_time_count'),
+                func.sum(orders.total_amount).filter(
+                    and_(in_period, orders.status != 'cancelled')
+                ).label(f'{name}_sales_amount')
+            ]
+        
+        row = db.session.query(*columns).filter(
             and_(
-                Order.business_id == business_id,
-                Order.created_at >= period_start,
-                Order.response_time_seconds < 60
+                orders.business_id == business_id,
+                or_(*conditions.values())
             )
-        ).count()
+        ).one()
+        
+        return {
+            name: {column: getattr(row, f'{name}_{column}') or 0 for column in _EDGE_COLUMNS}
+            for name in edges
+        }
+    
+    @staticmethod
+    def _build_comparisons(current, previous):
+        """Arma las comparaciones de KPIs a partir de los agregados de cada período."""
+        comparisons = {}
+        for key, metric, inverse in (
+            ('response_time', KPIService._avg_response_minutes, True),
+            ('orders_processed', lambda metrics: metrics['total'], False),
+            ('conversion_rate', KPIService._conversion_rate, False),
+            ('satisfaction', KPIService._satisfaction_from_conversion, False)
+        ):
+            current_value = metric(current)
+            previous_value = metric(previous)
+            change = KPIService._calculate_percentage_change(previous_value, current_value, inverse=inverse)
+            comparisons[key] = {
+                'current': current_value,
+                'previous': previous_value,
+                'change': change,
+                'improved': change > 0
+            }
+        return comparisons
+    
+    @staticmethod
+    def _build_operational(metrics, period_days):
+        """Métricas operativas a partir de los agregados del período."""
+        total_orders = metrics['total']
         
-        automation_rate = round((automated_orders / total_orders * 100), 1) if total_orders > 0 else 0
+        # Tasa de automatización (pedidos con IA vs manuales)
+        automation_rate = round((metrics['automated'] / total_orders * 100), 1) if total_orders > 0 else 0
         
         # Tiempo ahorrado por semana (estimado)
         avg_manual_time = 5 * 60  # 5 minutos por pedido manual
@@ -253,26 +364,10 @@ class KPIService:
         time_saved_weekly = round((weekly_orders * time_saved_per_order) / 60, 1)  # en horas
         
         # Precisión de IA (pedidos sin errores)
-        successful_orders = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= period_start,
-                Order.status.in_(['closed', 'paid'])
-            )
-        ).count()
-        
-        ai_accuracy = round((successful_orders / total_orders * 100), 1) if total_orders > 0 else 0
+        ai_accuracy = round((metrics['completed'] / total_orders * 100), 1) if total_orders > 0 else 0
         
         # Tasa de errores
-        cancelled_orders = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= period_start,
-                Order.status == 'cancelled'
-            )
-        ).count()
-        
-        error_rate = round((cancelled_orders / total_orders * 100), 1) if total_orders > 0 else 0
+        error_rate = round((metrics['cancelled'] / total_orders * 100), 1) if total_orders > 0 else 0
         
         return {
             'automation_rate': automation_rate,
@@ -282,46 +377,10 @@ class KPIService:
         }
     
     @staticmethod
-    def get_financial_impact(business_id, period_days=30):
-        """
-        Calcula el impacto financiero.
-        
-        Args:
-            business_id: ID del negocio
-            period_days: Días del período
-            
-        Returns:
-            dict: Métricas financieras
-        """
-        now = datetime.now(timezone.utc)
-        current_period_start = now - timedelta(days=period_days)
-        previous_period_start = current_period_start - timedelta(days=period_days)
-        
-        # Ventas actuales
-        current_sales = db.session.query(
-            func.sum(Order.total_amount)
-        ).filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= current_period_start,
-                Order.status.notin_(['cancelled'])
-            )
-        ).scalar()
-        
-        # Ventas anteriores
-        previous_sales = db.session.query(
-            func.sum(Order.total_amount)
-        ).filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= previous_period_start,
-                Order.created_at < current_period_start,
-                Order.status.notin_(['cancelled'])
-            )
-        ).scalar()
-        
-        current_sales = float(current_sales) if current_sales else 0
-        previous_sales = float(previous_sales) if previous_sales else 0
+    def _build_financial(current, previous, period_days):
+        """Impacto financiero a partir de los agregados de ambos períodos."""
+        current_sales = current['sales']
+        previous_sales = previous['sales']
         
         # Incremento en ventas
         sales_increase = current_sales - previous_sales
@@ -331,7 +390,7 @@ class KPIService:
         
         # Ahorro operativo estimado (basado en automatización)
         # Estimamos $5000 COP por hora de trabajo manual ahorrado
-        time_saved_hours = KPIService.get_operational_metrics(business_id, period_days)['time_saved_weekly_hours']
+        time_saved_hours = KPIService._build_operational(current, period_days)['time_saved_weekly_hours']
         weekly_savings = time_saved_hours * 5000 * 4  # 4 semanas
         
         # ROI estimado (retorno de inversión)
@@ -350,110 +409,58 @@ class KPIService:
         }
     
     @staticmethod
-    def get_orders_by_hour(business_id, days=7):
-        """
-        Obtiene la distribución de pedidos por hora del día.
-        
-        Args:
-            business_id: ID del negocio
-            days: Días a analizar
-            
-        Returns:
-            dict: Pedidos por hora
-        """
-        period_start = datetime.now(timezone.utc) - timedelta(days=days)
-        
-        orders = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= period_start
-            )
-        ).all()
-        
-        hourly_distribution = {hour: 0 for hour in range(24)}
-        
-        for order in orders:
-            hour = order.created_at.hour
-            hourly_distribution[hour] += 1
-        
-        return hourly_distribution
-    
-    # Métodos auxiliares privados
+    def _avg_response_minutes(metrics):
+        """Tiempo promedio de respuesta en minutos."""
+        avg_seconds = metrics['avg_response_seconds']
+        return round(avg_seconds / 60, 1) if avg_seconds else 0
     
     @staticmethod
-    def _get_avg_response_time(business_id, start_date, end_date):
-        """Calcula tiempo promedio de respuesta en minutos."""
-        avg_seconds = db.session.query(
-            func.avg(Order.response_time_seconds)
-        ).filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= start_date,
-                Order.created_at < end_date,
-                Order.response_time_seconds.isnot(None)
-            )
-        ).scalar()
-        
-        return round(avg_seconds / 60, 1) if avg_seconds else 0
+    def _conversion_rate(metrics):
+        """Tasa de conversión (pedidos completados sobre el total)."""
+        total = metrics['total']
+        return round((metrics['completed'] / total * 100), 1) if total > 0 else 0
     
     @staticmethod
-    def _get_orders_count(business_id, start_date, end_date):
-        """Cuenta pedidos en un período."""
-        return Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= start_date,
-                Order.created_at < end_date
-            )
-        ).count()
+    def _satisfaction_from_conversion(metrics):
+        """Score de satisfacción (1-5) según la proporción de pedidos completados."""
+        total = metrics['total']
+        conversion_rate = (metrics['completed'] / total) if total > 0 else 0
+        return round(1 + (conversion_rate * 4), 1)  # Escala 1-5
     
     @staticmethod
-    def _get_conversion_rate(business_id, start_date, end_date):
-        """Calcula tasa de conversión."""
-        total = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= start_date,
-                Order.created_at < end_date
-            )
-        ).count()
+    def _satisfaction_score(orders, now):
+        """
+        Score de satisfacción por pedido (CASE en SQL) según el tiempo de atención.
         
-        completed = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= start_date,
-                Order.created_at < end_date,
-                Order.status.in_(['closed', 'paid'])
-            )
-        ).count()
+        El tiempo va desde la creación hasta la entrega; si no se ha entregado,
+        hasta que quedó listo; si solo fue aceptado, hasta ahora. Los pedidos
+        recién recibidos reciben un score neutral de 70.
         
-        return round((completed / total * 100), 1) if total > 0 else 0
+        Args:
+            orders: Order o el alias de pedidos vivos + archivados
+            now: Instante de referencia para pedidos en curso
+        """
+        now = now.replace(tzinfo=None)  # Las columnas guardan UTC sin zona horaria
+        elapsed = case(
+            (orders.delivered_at.isnot(None), KPIService._seconds_between(orders.created_at, orders.delivered_at)),
+            (orders.ready_at.isnot(None), KPIService._seconds_between(orders.created_at, orders.ready_at)),
+            (orders.accepted_at.isnot(None), KPIService._seconds_between(orders.created_at, literal(now, DateTime)))
+        )
+        return case(
+            (elapsed.is_(None), 70),   # Pedidos nuevos reciben score neutral
+            (elapsed <= 30 * 60, 100),  # Excelente: <= 30 min
+            (elapsed <= 45 * 60, 85),   # Muy bueno: 30-45 min
+            (elapsed <= 60 * 60, 70),   # Bueno: 45-60 min
+            (elapsed <= 90 * 60, 50),   # Regular: 60-90 min
+            else_=30                    # Malo: > 90 min
+        )
     
     @staticmethod
-    def _get_satisfaction_score(business_id, start_date, end_date):
-        """Calcula score de satisfacción (1-5)."""
-        total = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= start_date,
-                Order.created_at < end_date
-            )
-        ).count()
-        
-        completed = Order.query.filter(
-            and_(
-                Order.business_id == business_id,
-                Order.created_at >= start_date,
-                Order.created_at < end_date,
-                Order.status.in_(['closed', 'paid'])
-            )
-        ).count()
-        
-        # Calculamos satisfacción en escala de 1 a 5
-        conversion_rate = (completed / total) if total > 0 else 0
-        satisfaction = round(1 + (conversion_rate * 4), 1)  # Escala 1-5
-        
-        return satisfaction
+    def _seconds_between(start, end):
+        """Segundos entre dos columnas DateTime, según el motor de base de datos."""
+        if db.session.get_bind().dialect.name == 'postgresql':
+            return extract('epoch', end - start)
+        return (func.julianday(end) - func.julianday(start)) * 86400
     
     @staticmethod
     def _calculate_percentage_change(old_value, new_value, inverse=False):
@@ -0,0 +1,122 @@
+"""
+Servicio de secuencias de pedidos.
+Asigna números de pedido consecutivos por negocio y por día sin escanear la tabla de pedidos.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.data.models import Order, OrderSequence
+
+
+class OrderSequenceService:
+    """Servicio para la asignación atómica de números de pedido."""
+
+    @staticmethod
+    def next_order_number(business_id, now=None):
+        """
+        Genera el siguiente número de pedido del día para un negocio.
+
+        El número conserva el formato histórico {business_id}{YYYYMMDD}{consecutivo:04d}.
+        Debe llamarse dentro de la transacción que inserta el pedido: el contador
+        queda bloqueado hasta el commit, por lo que dos workers nunca reciben el mismo valor.
+
+        Args:
+            business_id: ID del negocio
+            now: Fecha de referencia (por defecto, ahora en UTC)
+
+        Returns:
+            str: Número de pedido único
+        """
+        now = now or datetime.now(timezone.utc)
+        day = now.date()
+        value = OrderSequenceService.next_value(business_id, day)
+        return f"{business_id}{day.strftime('%Y%m%d')}{value:04d}"
+
+    @staticmethod
+    def next_value(business_id, day):
+        """
+        Incrementa y retorna el contador del día.
+
+        Ruta rápida: un único UPDATE ... RETURNING sobre la fila (business_id, day).
+        La primera vez del día se inserta la fila con un upsert, partiendo del mayor
+        consecutivo ya existente para no chocar con pedidos creados antes de la secuencia.
+
+        Args:
+            business_id: ID del negocio
+            day: Día (date) de la secuencia
+
+        Returns:
+            int: Valor asignado
+        """
+        value = OrderSequenceService._increment(business_id, day)
+        if value is not None:
+            return value
+
+        start = OrderSequenceService._existing_max_suffix(business_id, day) + 1
+        return OrderSequenceService._insert_or_increment(business_id, day, start)
+
+    @staticmethod
+    def _increment(business_id, day):
+        """Incrementa la fila existente; retorna None si aún no existe."""
+        stmt = (
+            update(OrderSequence)
+            .where(OrderSequence.business_id == business_id, OrderSequence.day == day)
+            .values(last_value=OrderSequence.last_value + 1)
+        )
+
+        if db.engine.dialect.update_returning:
+            return db.session.execute(stmt.returning(OrderSequence.last_value)).scalar()
+
+        # Motores sin RETURNING: el UPDATE ya tomó el bloqueo de escritura de la fila
+        result = db.session.execute(stmt)
+        if not result.rowcount:
+            return None
+        return db.session.query(OrderSequence.last_value).filter_by(
+            business_id=business_id, day=day
+        ).scalar()
+
+    @staticmethod
+    def _insert_or_increment(business_id, day, start):
+        """Crea la fila del día; si otro worker se adelantó, incrementa la suya."""
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            insert = postgresql.insert
+        elif dialect == 'sqlite':
+            insert = sqlite.insert
+        else:
+            insert = None
+
+        if insert is not None:
+            stmt = insert(OrderSequence).values(
+                business_id=business_id, day=day, last_value=start
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[OrderSequence.business_id, OrderSequence.day],
+                set_={'last_value': OrderSequence.last_value + 1}
+            ).returning(OrderSequence.last_value)
+            return db.session.execute(stmt).scalar()
+
+        # Otros motores: insertar en un savepoint y reintentar el incremento si hay conflicto
+        try:
+            with db.session.begin_nested():
+                db.session.add(OrderSequence(business_id=business_id, day=day, last_value=start))
+            return start
+        except Exception:
+            return OrderSequenceService._increment(business_id, day)
+
+    @staticmethod
+    def _existing_max_suffix(business_id, day):
+        """Mayor consecutivo ya usado en el día (solo se consulta una vez por día y negocio)."""
+        prefix = f"{business_id}{day.strftime('%Y%m%d')}"
+        last_number = db.session.query(Order.order_number).filter(
+            Order.order_number.like(f"{prefix}%")
+        ).order_by(
+            func.length(Order.order_number).desc(),
+            Order.order_number.desc()
+        ).limit(1).scalar()
+
+        if not last_number:
+            return 0
+        suffix = last_number[len(prefix):]
+        return int(suffix) if suffix.isdigit() else 0
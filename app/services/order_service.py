@@ -2,12 +2,38 @@
 Servicio de gestión de pedidos.
 Maneja la creación, actualización y seguimiento de pedidos.
 """
+import base64
+import binascii
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import func, and_, or_
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, and_, or_, case, insert, update, tuple_, select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
 from flask import current_app
 from app.extensions import db
-from app.data.models import Order, OrderItem, Customer, Product, Business
+from app.data.models import (
+    Order, OrderItem, Customer, Product, Business, ArchivedOrder, ArchivedOrderItem, OrderView
+)
+from app.services.archive_service import ARCHIVABLE_STATUSES
+from app.services.order_view_service import OrderViewService
+from app.services.kpi_rollup_service import KPIRollupService
+from app.services.order_sequence_service import OrderSequenceService
+from app.services.order_state_machine import (
+    OrderStateMachine, TransitionError, CONFLICT_MESSAGE
+)
+
+
+# Columnas activas del tablero Kanban (los cerrados solo se muestran los del día)
+BOARD_ACTIVE_STATUSES = ('received', 'preparing', 'ready', 'sent', 'paid')
+BOARD_STATUSES = BOARD_ACTIVE_STATUSES + ('closed',)
+
+# Estados visibles en las vistas de trabajadores
+KITCHEN_STATUSES = ('received', 'preparing', 'ready')
+DELIVERY_STATUSES = ('ready', 'sent', 'paid')
+
+# Notificaciones a clientes fuera del ciclo de la petición
+_notification_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='order-notify')
 
 
 class OrderService:
@@ -32,6 +58,20 @@ class OrderService:
             tuple: (success: bool, message: str, order: Order)
         """
         try:
+            # Normalizar ítems y agrupar cantidades por producto
+            requested = []
+            quantities = {}
+            for item_data in items_data:
+                product_id = int(item_data['product_id'])
+                quantity = int(item_data['quantity'])
+                if quantity <= 0:
+                    return False, f'Cantidad inválida para el producto {product_id}', None
+                requested.append((product_id, quantity, item_data.get('notes')))
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            
+            if not requested:
+                return False, 'El pedido no tiene ítems', None
+            
             # Obtener o crear cliente
             customer = Customer.query.filter_by(phone=customer_phone).first()
             if not customer:
@@ -42,66 +82,62 @@ class OrderService:
                 db.session.add(customer)
                 db.session.flush()
             
-            # Generar número de pedido único con reintentos
-            order = None
-            last_error = None
-            for _ in range(5):
-                try:
-                    order_number = OrderService._generate_order_number(business_id)
-                    order = Order(
-                        order_number=order_number,
-                        business_id=business_id,
-                        customer_id=customer.id,
-                        status='received',
-                        order_type=order_type,
-                        delivery_address=delivery_address,
-                        notes=notes,
-                        total_amount=0  # Se calculará después
-                    )
-                    db.session.add(order)
-                    db.session.flush()
-                    break
-                except IntegrityError as err:
-                    db.session.rollback()
-                    last_error = err
-                    continue
-            if order is None:
-                return False, f'Error generando número de pedido: {last_error}', None
-            
-            # Agregar ítems del pedido
-            total_amount = 0
-            for item_data in items_data:
-                product = Product.query.get(item_data['product_id'])
+            # Resolver todos los productos en una sola consulta (bloqueados hasta el commit)
+            products = OrderService._load_products_for_update(business_id, quantities.keys())
+            for product_id in quantities:
+                product = products.get(product_id)
                 if not product:
                     db.session.rollback()
-                    return False, f'Producto {item_data["product_id"]} no encontrado', None
+                    return False, f'Producto {product_id} no encontrado', None
                 
                 if not product.is_available:
                     db.session.rollback()
                     return False, f'Producto {product.name} no está disponible', None
-                
-                quantity = item_data['quantity']
-                unit_price = product.price
-                subtotal = unit_price * quantity
-                
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=product.id,
-                    product_name=product.name,
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    subtotal=subtotal,
-                    notes=item_data.get('notes')
-                )
-                
-                db.session.add(order_item)
+            
+            # Reservar inventario de forma atómica
+            short_product = OrderService._reserve_stock(quantities, products)
+            if short_product:
+                db.session.rollback()
+                return False, f'Stock insuficiente para {short_product.name}', None
+            
+            rows = []
+            total_amount = 0
+            for product_id, quantity, item_notes in requested:
+                product = products[product_id]
+                subtotal = product.price * quantity
+                rows.append({
+                    'product_id': product.id,
+                    'product_name': product.name,
+                    'quantity': quantity,
+                    'unit_price': product.price,
+                    'subtotal': subtotal,
+                    'notes': item_notes
+                })
                 total_amount += subtotal
             
-            # Actualizar total del pedido
-            order.total_amount = total_amount
+            # Número de pedido asignado por la secuencia diaria del negocio
+            order = Order(
+                order_number=OrderService._generate_order_number(business_id),
+                business_id=business_id,
+                customer_id=customer.id,
+                status='received',
+                order_type=order_type,
+                delivery_address=delivery_address,
+                notes=notes,
+                total_amount=total_amount
+            )
+            db.session.add(order)
+            db.session.flush()
+            
+            # Insertar todos los ítems en un solo INSERT
+            for row in rows:
+                row['order_id'] = order.id
+            db.session.execute(insert(OrderItem), rows)
+            # El INSERT masivo de ítems no pasa por el flush: proyectar al confirmar
+            OrderViewService.mark_pending([order.id])
             
             # Actualizar contador de pedidos del cliente
-            customer.total_orders += 1
+            customer.total_orders = (customer.total_orders or 0) + 1
             
             db.session.commit()
             
@@ -112,105 +148,616 @@ class OrderService:
             return False, f'Error al crear pedido: {str(e)}', None
     
     @staticmethod
-    def update_order_status(order_id, new_status, user_id=None):
+    def _load_products_for_update(business_id, product_ids):
         """
-        Actualiza el estado de un pedido.
+        Carga los productos del pedido con un único SELECT ... IN (...) FOR UPDATE.
+        
+        Se ordenan por ID para que transacciones concurrentes tomen los bloqueos
+        en el mismo orden y no generen deadlocks.
+        
+        Returns:
+            dict: {product_id: Product}
+        """
+        # populate_existing: los productos ya cargados en la sesión (p. ej. el
+        # catálogo del agente IA) toman los valores de la fila bloqueada
+        products = Product.query.filter(
+            Product.business_id == business_id,
+            Product.id.in_(list(product_ids))
+        ).order_by(Product.id).with_for_update().populate_existing().all()
+        return {product.id: product for product in products}
+    
+    @staticmethod
+    def _reserve_stock(quantities, products):
+        """
+        Descuenta inventario con un UPDATE condicional para todos los productos.
+        
+        Los productos con stock_quantity NULL no llevan control de inventario.
+        El stock se valida sobre las filas ya bloqueadas por
+        _load_products_for_update; el UPDATE condicional solo protege contra
+        una escritura concurrente (bases sin FOR UPDATE, como SQLite).
+        
+        Args:
+            quantities: {product_id: cantidad}
+            products: {product_id: Product} ya cargados y bloqueados
+            
+        Returns:
+            Product o None: Primer producto sin stock suficiente (None si se reservó todo)
+        """
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            if product.stock_quantity is not None and product.stock_quantity < quantity:
+                return product
+        
+        requested = case(quantities, value=Product.id)
+        stmt = (
+            update(Product)
+            .where(
+                Product.id.in_(list(quantities)),
+                or_(Product.stock_quantity.is_(None), Product.stock_quantity >= requested)
+            )
+            .values(stock_quantity=Product.stock_quantity - requested)
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.get_bind().dialect.update_returning:
+            reserved = set(db.session.execute(stmt.returning(Product.id)).scalars())
+        else:
+            result = db.session.execute(stmt)
+            reserved = set(quantities) if result.rowcount == len(quantities) else set()
+        
+        if len(reserved) != len(quantities):
+            # Otra transacción cambió el stock entre la lectura y el UPDATE;
+            # el llamador revierte la reserva parcial
+            short = [product_id for product_id in quantities if product_id not in reserved]
+            return products[short[0]] if short else products[next(iter(quantities))]
+        
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            if product.stock_quantity is not None:
+                set_committed_value(product, 'stock_quantity', product.stock_quantity - quantity)
+        return None
+    
+    @staticmethod
+    def _release_stock(order):
+        """
+        Devuelve al inventario las cantidades reservadas por un pedido.
+        
+        Debe llamarse antes de modificar el pedido: bloquea los productos
+        (ordenados por ID, sin autoflush) antes que las filas de orders y
+        data_versions, en el mismo orden que create_order, para no generar
+        deadlocks con una creación concurrente.
+        """
+        quantities = {}
+        with db.session.no_autoflush:
+            for product_id, quantity in db.session.query(
+                OrderItem.product_id, OrderItem.quantity
+            ).filter(OrderItem.order_id == order.id, OrderItem.product_id.isnot(None)):
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+        
+        if not quantities:
+            return
+        
+        db.session.execute(
+            select(Product.id)
+            .where(Product.id.in_(list(quantities)))
+            .order_by(Product.id)
+            .with_for_update()
+        ).all()
+        db.session.execute(
+            update(Product)
+            .where(Product.id.in_(list(quantities)), Product.stock_quantity.isnot(None))
+            .values(stock_quantity=Product.stock_quantity + case(quantities, value=Product.id))
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def update_order_status(order_id, new_status, user_id=None, business_id=None,
+                            allowed_transitions=None, expected_version=None):
+        """
+        Actualiza el estado de un pedido a través de la máquina de estados.
         
         Args:
             order_id: ID del pedido
             new_status: Nuevo estado del pedido
             user_id: ID del usuario que realiza la actualización
+            business_id: Negocio que debe ser dueño del pedido (opcional)
+            allowed_transitions: Transiciones permitidas al actor (opcional)
+            expected_version: version_id que el cliente vio por última vez (opcional)
             
         Returns:
             tuple: (success: bool, message: str, order: Order)
+            
+        Raises:
+            TransitionError: Si la transición no es válida (400/403/404) o hubo un conflicto (409)
         """
         try:
-            order = Order.query.get(order_id)
-            if not order:
-                return False, 'Pedido no encontrado', None
-            
-            old_status = order.status
-            order.status = new_status
-            now = datetime.now(timezone.utc)
-            order.updated_at = now
-            
-            # Actualizar tiempos según el estado
-            if new_status == 'preparing':
-                if not order.accepted_at:
-                    order.accepted_at = now
-                if not order.preparing_at:
-                    order.preparing_at = now
-                if not order.response_time_seconds:
-                    response_seconds = OrderService._seconds_between(order.created_at, order.accepted_at)
-                    if response_seconds is not None:
-                        order.response_time_seconds = response_seconds
-
-            elif new_status == 'ready':
-                if not order.ready_at:
-                    order.ready_at = now
-                if not order.preparation_time_seconds:
-                    prep_seconds = OrderService._seconds_between(order.accepted_at, order.ready_at)
-                    if prep_seconds is not None:
-                        order.preparation_time_seconds = prep_seconds
-
-            elif new_status in ['sent', 'out_for_delivery']:
-                if not order.sent_at:
-                    order.sent_at = now
-
-            elif new_status == 'paid':
-                if not order.paid_at:
-                    order.paid_at = now
-
-            if new_status in ['delivered', 'closed'] and not order.delivered_at:
-                order.delivered_at = now
+            if new_status == 'cancelled':
+                # La cancelación además libera el inventario reservado
+                order = OrderStateMachine.load(order_id, business_id, expected_version)
+                OrderStateMachine.validate(order.status, new_status, allowed_transitions)
+                success, message = OrderService.cancel_order(order_id)
+                if not success:
+                    raise TransitionError(message, 409 if message == CONFLICT_MESSAGE else 400)
+                return True, message, order
             
-            db.session.commit()
+            order, old_status = OrderStateMachine.transition(
+                order_id,
+                new_status,
+                business_id=business_id,
+                allowed_transitions=allowed_transitions,
+                expected_version=expected_version
+            )
             
             OrderService._notify_status_change(order, old_status, new_status)
             return True, f'Pedido actualizado de {old_status} a {new_status}', order
             
+        except TransitionError:
+            raise
         except Exception as e:
             db.session.rollback()
             return False, f'Error al actualizar pedido: {str(e)}', None
     
     @staticmethod
-    def get_orders_by_business(business_id, status=None, limit=None, offset=0):
+    def bulk_transition(business_id, transitions, allowed_transitions):
         """
-        Obtiene los pedidos de un negocio.
+        Cambia el estado de varios pedidos en una sola transacción.
+        
+        Los pedidos se leen con un único SELECT, cada transición se valida con la
+        máquina de estados y las válidas se aplican con un UPDATE masivo por clave
+        primaria que verifica version_id. Si otro usuario cambió alguno de los
+        pedidos en medio, no se aplica ninguno y se lanza TransitionError(409).
+        Las notificaciones a clientes se encolan después del commit.
+        
+        Args:
+            business_id: ID del negocio
+            transitions: Lista de {'order_id': int, 'status': str}
+            allowed_transitions: {estado_actual: (estados_destino, ...)}
+            
+        Returns:
+            tuple: (success: bool, message: str, results: list)
+            
+        Raises:
+            TransitionError: Si hubo un conflicto de versión (409)
+        """
+        from app.services.change_feed_service import ChangeFeedService
+        
+        try:
+            order_ids = {item['order_id'] for item in transitions}
+            current_rows = db.session.query(
+                Order.id, Order.status, Order.created_at, Order.accepted_at,
+                Order.preparing_at, Order.ready_at, Order.sent_at, Order.paid_at,
+                Order.delivered_at, Order.response_time_seconds, Order.preparation_time_seconds,
+                Order.version_id
+            ).filter(
+                Order.business_id == business_id,
+                Order.id.in_(order_ids)
+            ).all()
+            current_by_id = {row.id: row for row in current_rows}
+            
+            now = datetime.now(timezone.utc)
+            results = []
+            updates = []
+            changes = []
+            seen = set()
+            
+            for item in transitions:
+                order_id, new_status = item['order_id'], item['status']
+                result = {'order_id': order_id, 'success': False, 'status': new_status}
+                results.append(result)
+                
+                current = current_by_id.get(order_id)
+                if order_id in seen:
+                    result['message'] = 'Pedido repetido en la solicitud'
+                    continue
+                seen.add(order_id)
+                
+                if current is None:
+                    result['message'] = 'Pedido no encontrado'
+                    continue
+                
+                try:
+                    OrderStateMachine.validate(current.status, new_status, allowed_transitions)
+                except TransitionError as e:
+                    result['message'] = e.message
+                    continue
+                
+                values = OrderStateMachine.transition_values(current, new_status, now)
+                values['id'] = order_id
+                # Versión leída: el UPDATE falla con StaleDataError si el pedido cambió
+                values['version_id'] = current.version_id
+                updates.append(values)
+                changes.append((order_id, current.status, new_status))
+                result['success'] = True
+                result['message'] = f'Pedido actualizado de {current.status} a {new_status}'
+            
+            if updates:
+                # El UPDATE masivo no pasa por el flush: versionar y anotar a mano
+                version = ChangeFeedService.bump_version(business_id)
+                for values in updates:
+                    values['change_seq'] = version
+                db.session.execute(update(Order), updates)
+                OrderViewService.mark_pending([values['id'] for values in updates])
+                KPIRollupService.mark_pending(
+                    (business_id, current_by_id[values['id']].created_at) for values in updates
+                )
+            
+            db.session.commit()
+            
+            OrderService._queue_status_notifications(changes)
+            return True, f'{len(updates)} de {len(results)} pedidos actualizados', results
+            
+        except StaleDataError:
+            db.session.rollback()
+            raise TransitionError(CONFLICT_MESSAGE, 409)
+        except Exception as e:
+            db.session.rollback()
+            return False, f'Error al actualizar pedidos: {str(e)}', []
+    
+    @staticmethod
+    def _queue_status_notifications(changes):
+        """
+        Encola las notificaciones de cambio de estado para enviarlas fuera de la petición.
+        
+        Args:
+            changes: Lista de (order_id, old_status, new_status)
+        """
+        if not changes:
+            return
+        
+        app = current_app._get_current_object()
+        
+        def deliver():
+            with app.app_context():
+                statuses = {order_id: (old, new) for order_id, old, new in changes}
+                orders = Order.query.options(joinedload(Order.customer)).filter(
+                    Order.id.in_(statuses)
+                ).all()
+                for order in orders:
+                    OrderService._notify_status_change(order, *statuses[order.id])
+                db.session.remove()
+        
+        if app.testing:
+            deliver()
+        else:
+            _notification_executor.submit(deliver)
+    
+    @staticmethod
+    def get_orders_by_business(business_id, status=None, limit=None, cursor=None):
+        """
+        Obtiene una página de pedidos de un negocio usando paginación por cursor.
+        
+        Los pedidos se ordenan por (created_at, id) descendente y cada página
+        continúa desde la última fila de la anterior, sin OFFSET: la página 1000
+        cuesta lo mismo que la primera.
         
         Args:
             business_id: ID del negocio
             status: Filtrar por estado (opcional)
-            limit: Límite de resultados
-            offset: Offset para paginación
+            limit: Tamaño de página (por defecto ITEMS_PER_PAGE)
+            cursor: Cursor opaco retornado por la página anterior
             
         Returns:
-            list: Lista de pedidos
+            tuple: (orders: list, next_cursor: str o None)
+            
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        page_size = OrderService._page_size(limit)
+        
+        query = Order.query.options(
+            joinedload(Order.customer),
+            selectinload(Order.items).joinedload(OrderItem.product)
+        ).filter(Order.business_id == business_id)
+        
+        if status:
+            query = query.filter(Order.status == status)
+        
+        if cursor:
+            created_at, order_id = OrderService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Order.created_at, Order.id) < tuple_(created_at, order_id)
+            )
+        
+        orders = query.order_by(
+            Order.created_at.desc(),
+            Order.id.desc()
+        ).limit(page_size + 1).all()
+        
+        if status is None or status in ARCHIVABLE_STATUSES:
+            orders = OrderService._merge_archived_page(
+                orders, business_id, status, cursor, page_size
+            )
+        
+        next_cursor = None
+        if len(orders) > page_size:
+            orders = orders[:page_size]
+            next_cursor = OrderService.encode_cursor(orders[-1].created_at, orders[-1].id)
+        
+        return orders, next_cursor
+    
+    @staticmethod
+    def _merge_archived_page(orders, business_id, status, cursor, page_size):
         """
-        query = Order.query.filter_by(business_id=business_id)
+        Completa una página del historial con pedidos archivados.
+        
+        Si la página viva ya está llena, solo pueden entrar pedidos archivados
+        más recientes que su última fila, así que la consulta al archivo se
+        acota entre el cursor y esa fila.
+        """
+        query = ArchivedOrder.query.options(
+            joinedload(ArchivedOrder.customer),
+            selectinload(ArchivedOrder.items).joinedload(ArchivedOrderItem.product)
+        ).filter(ArchivedOrder.business_id == business_id)
         
         if status:
-            query = query.filter_by(status=status)
+            query = query.filter(ArchivedOrder.status == status)
+        
+        if cursor:
+            created_at, order_id = OrderService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(ArchivedOrder.created_at, ArchivedOrder.id) < tuple_(created_at, order_id)
+            )
+        
+        if len(orders) > page_size:
+            query = query.filter(
+                tuple_(ArchivedOrder.created_at, ArchivedOrder.id) >
+                tuple_(orders[-1].created_at, orders[-1].id)
+            )
+        
+        archived = query.order_by(
+            ArchivedOrder.created_at.desc(),
+            ArchivedOrder.id.desc()
+        ).limit(page_size + 1).all()
+        
+        if not archived:
+            return orders
+        
+        merged = sorted(orders + archived, key=lambda order: (order.created_at, order.id), reverse=True)
+        return merged[:page_size + 1]
+    
+    @staticmethod
+    def encode_cursor(created_at, order_id):
+        """Codifica la posición (created_at, id) como un cursor opaco."""
+        raw = f"{created_at.isoformat()}|{order_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decodifica un cursor generado por encode_cursor.
+        
+        Returns:
+            tuple: (created_at: datetime, order_id: int)
+            
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            created_at, order_id = raw.split('|', 1)
+            return datetime.fromisoformat(created_at), int(order_id)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise ValueError('Cursor de paginación inválido')
+    
+    @staticmethod
+    def _page_size(limit):
+        """Tamaño de página acotado entre 1 y MAX_ITEMS_PER_PAGE."""
+        default_size = current_app.config.get('ITEMS_PER_PAGE', 25)
+        max_size = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+        if not limit or limit < 1:
+            return default_size
+        return min(limit, max_size)
+    
+    @staticmethod
+    def board_closed_since():
+        """Inicio del día actual (UTC): el tablero solo muestra los pedidos cerrados desde entonces."""
+        return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def get_board_snapshot(business_id):
+        """
+        Obtiene el estado completo del tablero Kanban desde la proyección order_views.
+        
+        Una sola consulta indexada por (business_id, status) y sin JOINs: cada fila
+        ya trae cliente, ítems y tiempos. Los conteos por columna salen de las
+        mismas filas.
+        
+        Args:
+            business_id: ID del negocio
+            
+        Returns:
+            tuple: (orders: list de OrderView, by_status: dict)
+        """
+        closed_since = OrderService.board_closed_since()
+        orders = OrderView.query.filter(
+            OrderView.business_id == business_id,
+            or_(
+                OrderView.status.in_(BOARD_ACTIVE_STATUSES),
+                and_(OrderView.status == 'closed', OrderView.updated_at >= closed_since)
+            )
+        ).order_by(OrderView.created_at.desc()).all()
+        
+        by_status = {status: 0 for status in BOARD_STATUSES}
+        for order in orders:
+            by_status[order.status] += 1
+        
+        return orders, by_status
+    
+    @staticmethod
+    def get_orders_for_statuses(business_id, statuses):
+        """
+        Obtiene los pedidos de varios estados desde la proyección order_views.
+        
+        Usado por las vistas de cocina y reparto: una sola consulta indexada,
+        sin JOINs a clientes ni ítems.
+        
+        Args:
+            business_id: ID del negocio
+            statuses: Estados a incluir, en el orden en que deben retornarse
+            
+        Returns:
+            list: OrderView agrupados por estado y del más reciente al más antiguo
+        """
+        status_order = case(
+            {status: position for position, status in enumerate(statuses)},
+            value=OrderView.status
+        )
+        return OrderView.query.filter(
+            OrderView.business_id == business_id,
+            OrderView.status.in_(statuses)
+        ).order_by(status_order, OrderView.created_at.desc()).all()
+    
+    @staticmethod
+    def search_orders(business_id, query, limit=None, cursor=None):
+        """
+        Busca pedidos del negocio por número, teléfono, nombre del cliente o dirección.
+        
+        El número de pedido se compara por prefijo; teléfono (incluidos los
+        identificadores `tg:` de Telegram), nombre y dirección por subcadena sin
+        distinguir mayúsculas. En PostgreSQL lo resuelven los índices trigram y
+        de patrón; en otras bases se filtra en proceso recorriendo los pedidos
+        del negocio en orden. Solo busca en la tabla viva (no en el archivo).
+        
+        Args:
+            business_id: ID del negocio
+            query: Texto a buscar
+            limit: Tamaño de página (por defecto ITEMS_PER_PAGE)
+            cursor: Cursor opaco retornado por la página anterior
+            
+        Returns:
+            tuple: (orders: list, next_cursor: str o None)
+            
+        Raises:
+            ValueError: Si el texto es muy corto o el cursor no es válido
+        """
+        needle = (query or '').strip()
+        min_length = current_app.config.get('SEARCH_MIN_QUERY_LENGTH', 3)
+        if len(needle) < min_length:
+            raise ValueError(f'La búsqueda debe tener al menos {min_length} caracteres')
+        
+        page_size = OrderService._page_size(limit)
+        position = OrderService.decode_cursor(cursor) if cursor else None
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            order_ids = OrderService._search_order_ids_sql(business_id, needle, page_size, position)
+        else:
+            order_ids = OrderService._search_order_ids_in_process(business_id, needle, page_size, position)
+        
+        orders = []
+        if order_ids:
+            by_id = {order.id: order for order in Order.query.options(
+                joinedload(Order.customer),
+                selectinload(Order.items).joinedload(OrderItem.product)
+            ).filter(Order.id.in_(order_ids))}
+            orders = [by_id[order_id] for order_id in order_ids if order_id in by_id]
+        
+        next_cursor = None
+        if len(orders) > page_size:
+            orders = orders[:page_size]
+            next_cursor = OrderService.encode_cursor(orders[-1].created_at, orders[-1].id)
+        
+        return orders, next_cursor
+    
+    @staticmethod
+    def _search_order_ids_sql(business_id, needle, page_size, position):
+        """IDs de la página con predicados que usan los índices trigram y de patrón."""
+        escaped = OrderService._escape_like(needle)
+        contains = f'%{escaped}%'
         
-        query = query.order_by(Order.created_at.desc())
+        customer_match = [
+            Customer.phone.ilike(contains, escape='/'),
+            Customer.name.ilike(contains, escape='/')
+        ]
+        digits = OrderService._phone_digits(needle)
+        if digits and digits != needle:
+            customer_match.append(Customer.phone.like(f'%{digits}%'))
+        
+        query = db.session.query(Order.id).filter(
+            Order.business_id == business_id,
+            or_(
+                Order.order_number.like(f'{escaped}%', escape='/'),
+                Order.delivery_address.ilike(contains, escape='/'),
+                Order.customer_id.in_(db.session.query(Customer.id).filter(or_(*customer_match)))
+            )
+        )
+        if position:
+            query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(*position))
+        
+        rows = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(page_size + 1)
+        return [row.id for row in rows]
+    
+    @staticmethod
+    def _search_order_ids_in_process(business_id, needle, page_size, position):
+        """IDs de la página filtrando en Python (bases sin índices trigram, p. ej. SQLite)."""
+        folded = needle.casefold()
+        digits = OrderService._phone_digits(needle)
         
-        if limit:
-            query = query.limit(limit).offset(offset)
+        query = db.session.query(
+            Order.id, Order.order_number, Order.delivery_address,
+            Customer.name, Customer.phone
+        ).outerjoin(Customer, Customer.id == Order.customer_id).filter(
+            Order.business_id == business_id
+        )
+        if position:
+            query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(*position))
+        query = query.order_by(Order.created_at.desc(), Order.id.desc())
+        
+        order_ids = []
+        for row in query.yield_per(500):
+            phone = row.phone or ''
+            if (
+                row.order_number.casefold().startswith(folded)
+                or folded in phone.casefold()
+                or (digits and digits in phone)
+                or folded in (row.name or '').casefold()
+                or folded in (row.delivery_address or '').casefold()
+            ):
+                order_ids.append(row.id)
+                if len(order_ids) > page_size:
+                    break
+        return order_ids
+    
+    @staticmethod
+    def _phone_digits(needle):
+        """Dígitos del texto si parece un teléfono con formato ('+57 300-123'), o ''."""
+        if any(not (char.isdigit() or char in '+-() .') for char in needle):
+            return ''
+        digits = ''.join(char for char in needle if char.isdigit())
+        return digits if len(digits) >= current_app.config.get('SEARCH_MIN_QUERY_LENGTH', 3) else ''
+    
+    @staticmethod
+    def _escape_like(value):
+        """Escapa los comodines de LIKE para buscar el texto literal."""
+        return value.replace('/', '//').replace('%', '/%').replace('_', '/_')
+    
+    @staticmethod
+    def get_order(order_id):
+        """
+        Obtiene un pedido por su ID, buscando también en el archivo.
         
-        return query.all()
+        Args:
+            order_id: ID del pedido (se conserva al archivarlo)
+            
+        Returns:
+            Order, ArchivedOrder o None
+        """
+        return db.session.get(Order, order_id) or db.session.get(ArchivedOrder, order_id)
     
     @staticmethod
     def get_order_by_number(order_number):
         """
-        Obtiene un pedido por su número.
+        Obtiene un pedido por su número, buscando también en el archivo.
         
         Args:
             order_number: Número del pedido
             
         Returns:
-            Order o None
+            Order, ArchivedOrder o None
         """
-        return Order.query.filter_by(order_number=order_number).first()
+        return (
+            Order.query.filter_by(order_number=order_number).first()
+            or ArchivedOrder.query.filter_by(order_number=order_number).first()
+        )
     
     @staticmethod
     def get_orders_by_status_count(business_id):
@@ -304,7 +851,7 @@ class OrderService:
     @staticmethod
     def _generate_order_number(business_id):
         """
-        Genera un número único de pedido.
+        Genera un número único de pedido usando la secuencia diaria del negocio.
         
         Args:
             business_id: ID del negocio
@@ -312,36 +859,7 @@ class OrderService:
         Returns:
             str: Número de pedido único
         """
-        today = datetime.now(timezone.utc)
-        prefix = f"{business_id}{today.strftime('%Y%m%d')}"
-        
-        # Contar pedidos existentes y buscar huecos disponibles
-        existing_numbers = [o.order_number for o in Order.query.with_entities(Order.order_number)
-                             .filter(Order.order_number.like(f"{prefix}%"))
-                             .order_by(Order.order_number).all()]
-        existing_set = set(existing_numbers)
-        for suffix in range(1, 10000):
-            candidate = f"{prefix}{suffix:04d}"
-            if candidate not in existing_set:
-                return candidate
-        raise ValueError('No hay números de pedido disponibles para hoy')
-
-    @staticmethod
-    def _ensure_timezone(dt):
-        """Garantiza que un datetime tenga zona horaria UTC para poder restarlo."""
-        if dt is None:
-            return None
-        if dt.tzinfo is None:
-            return dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc)
-
-    @staticmethod
-    def _seconds_between(start, end):
-        start_aware = OrderService._ensure_timezone(start)
-        end_aware = OrderService._ensure_timezone(end)
-        if not start_aware or not end_aware:
-            return None
-        return int((end_aware - start_aware).total_seconds())
+        return OrderSequenceService.next_order_number(business_id)
 
     @staticmethod
     def _notify_status_change(order, old_status, new_status):
@@ -385,14 +903,23 @@ class OrderService:
             if order.status in ['paid', 'closed']:
                 return False, 'No se puede cancelar un pedido pagado o cerrado'
             
-            order.status = 'cancelled'
+            if order.status == 'cancelled':
+                return False, 'El pedido ya está cancelado'
+            
+            OrderStateMachine.validate(order.status, 'cancelled')
+            # Liberar el inventario reservado al crear el pedido (antes de
+            # escribir el pedido: los productos se bloquean primero)
+            OrderService._release_stock(order)
+            OrderStateMachine.apply(order, 'cancelled')
             if reason:
                 order.notes = f"{order.notes}\nCancelado: {reason}" if order.notes else f"Cancelado: {reason}"
             
-            db.session.commit()
+            OrderStateMachine.commit()
             
             return True, 'Pedido cancelado exitosamente'
             
+        except TransitionError as e:
+            return False, e.message
         except Exception as e:
             db.session.rollback()
             return False, f'Error al cancelar pedido: {str(e)}'
@@ -0,0 +1,287 @@
+"""
+Máquina de estados de pedidos.
+Centraliza las transiciones permitidas, los tiempos de cada estado y el
+control de concurrencia optimista (columna version_id de Order).
+"""
+from datetime import datetime, timezone
+from sqlalchemy.orm.exc import StaleDataError
+from app.extensions import db
+from app.data.models import Order
+
+
+# Transiciones válidas del ciclo de vida de un pedido
+TRANSITIONS = {
+    'received': ('preparing', 'cancelled'),
+    'preparing': ('ready', 'received', 'cancelled'),
+    'ready': ('sent', 'preparing', 'cancelled'),
+    'sent': ('paid', 'closed', 'ready', 'cancelled'),
+    'paid': ('closed', 'sent'),
+    'closed': (),
+    'cancelled': ()
+}
+
+# Transiciones permitidas a cada tipo de trabajador
+WORKER_TRANSITIONS = {
+    # Cocina puede: received → preparing, preparing → ready
+    'planta': {
+        'received': ('preparing',),
+        'preparing': ('ready',)
+    },
+    # Repartidor puede: ready → sent, sent → paid
+    'repartidor': {
+        'ready': ('sent',),
+        'sent': ('paid',)
+    }
+}
+
+# El dueño avanza cualquier columna del tablero y cierra los pedidos pagados
+OWNER_TRANSITIONS = {
+    'received': ('preparing',),
+    'preparing': ('ready',),
+    'ready': ('sent',),
+    'sent': ('paid',),
+    'paid': ('closed',)
+}
+
+# Devolver un pedido a la columna anterior (estado_actual → estado_anterior)
+REVERT_TRANSITIONS = {
+    'preparing': 'received',
+    'ready': 'preparing',
+    'sent': 'ready',
+    'paid': 'sent'
+}
+
+CONFLICT_MESSAGE = 'El pedido fue modificado por otro usuario. Recarga e intenta de nuevo'
+
+
+class TransitionError(Exception):
+    """Transición rechazada; `status_code` es el código HTTP sugerido (400, 403, 404 o 409)."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class OrderStateMachine:
+    """Aplica cambios de estado de pedidos con concurrencia optimista."""
+
+    @staticmethod
+    def validate(current_status, new_status, allowed_transitions=None):
+        """
+        Verifica que la transición sea válida.
+
+        Args:
+            current_status: Estado actual
+            new_status: Estado destino
+            allowed_transitions: Restricción adicional del actor {estado: (destinos, ...)}
+
+        Raises:
+            TransitionError: Si la transición no está permitida
+        """
+        if allowed_transitions is not None and current_status not in allowed_transitions:
+            raise TransitionError(f'No puedes cambiar pedidos en estado {current_status}')
+
+        allowed = TRANSITIONS.get(current_status, ())
+        if allowed_transitions is not None:
+            allowed = [status for status in allowed if status in allowed_transitions[current_status]]
+
+        if new_status not in allowed:
+            raise TransitionError(f'Transición no permitida: {current_status} → {new_status}')
+
+    @staticmethod
+    def transition_values(current, new_status, now):
+        """
+        Calcula las columnas a actualizar al pasar un pedido a `new_status`.
+
+        Args:
+            current: Pedido o fila con los valores actuales (status y tiempos)
+            new_status: Nuevo estado
+            now: Momento del cambio
+
+        Returns:
+            dict: {columna: valor}
+        """
+        values = {'status': new_status, 'updated_at': now}
+
+        # Actualizar tiempos según el estado
+        if new_status == 'preparing':
+            accepted_at = current.accepted_at or now
+            if not current.accepted_at:
+                values['accepted_at'] = now
+            if not current.preparing_at:
+                values['preparing_at'] = now
+            if not current.response_time_seconds:
+                response_seconds = OrderStateMachine._seconds_between(current.created_at, accepted_at)
+                if response_seconds is not None:
+                    values['response_time_seconds'] = response_seconds
+
+        elif new_status == 'ready':
+            ready_at = current.ready_at or now
+            if not current.ready_at:
+                values['ready_at'] = now
+            if not current.preparation_time_seconds:
+                prep_seconds = OrderStateMachine._seconds_between(current.accepted_at, ready_at)
+                if prep_seconds is not None:
+                    values['preparation_time_seconds'] = prep_seconds
+
+        elif new_status in ['sent', 'out_for_delivery']:
+            if not current.sent_at:
+                values['sent_at'] = now
+
+        # Cerrar un pedido enviado también lo marca como pagado
+        if new_status in ['paid', 'closed'] and not current.paid_at:
+            values['paid_at'] = now
+
+        if new_status in ['delivered', 'closed'] and not current.delivered_at:
+            values['delivered_at'] = now
+
+        return values
+
+    @staticmethod
+    def revert_values(current_status, now):
+        """
+        Calcula el estado anterior y limpia los tiempos del estado que se deshace.
+
+        Args:
+            current_status: Estado actual
+            now: Momento del cambio
+
+        Returns:
+            dict: {columna: valor}
+
+        Raises:
+            TransitionError: Si el estado no se puede devolver
+        """
+        previous_status = REVERT_TRANSITIONS.get(current_status)
+        if not previous_status:
+            raise TransitionError(f'No se puede cancelar un pedido en estado: {current_status}')
+
+        values = {'status': previous_status, 'updated_at': now}
+        if previous_status == 'received':
+            values.update(accepted_at=None, preparing_at=None, response_time_seconds=None)
+        elif previous_status == 'preparing':
+            values.update(ready_at=None, preparation_time_seconds=None)
+        elif previous_status == 'ready':
+            values.update(sent_at=None, delivered_at=None)
+        elif previous_status == 'sent':
+            values.update(paid_at=None)
+        return values
+
+    @staticmethod
+    def load(order_id, business_id=None, expected_version=None):
+        """
+        Obtiene un pedido para cambiarlo de estado (sin bloquear la fila).
+
+        Args:
+            order_id: ID del pedido
+            business_id: Negocio que debe ser dueño del pedido (opcional)
+            expected_version: version_id que el cliente vio por última vez (opcional)
+
+        Returns:
+            Order: Pedido
+
+        Raises:
+            TransitionError: 404 si no existe, 403 si es de otro negocio, 409 si cambió
+        """
+        order = db.session.get(Order, order_id)
+        if not order:
+            raise TransitionError('Pedido no encontrado', 404)
+
+        if business_id is not None and order.business_id != business_id:
+            raise TransitionError('No autorizado', 403)
+
+        if expected_version is not None and order.version_id != expected_version:
+            raise TransitionError(CONFLICT_MESSAGE, 409)
+
+        return order
+
+    @staticmethod
+    def apply(order, new_status, allowed_transitions=None, now=None):
+        """
+        Valida y aplica una transición sobre el pedido (sin confirmar).
+
+        Returns:
+            str: Estado anterior
+        """
+        old_status = order.status
+        OrderStateMachine.validate(old_status, new_status, allowed_transitions)
+
+        now = now or datetime.now(timezone.utc)
+        for column, value in OrderStateMachine.transition_values(order, new_status, now).items():
+            setattr(order, column, value)
+        return old_status
+
+    @staticmethod
+    def transition(order_id, new_status, business_id=None, allowed_transitions=None,
+                   expected_version=None):
+        """
+        Cambia el estado de un pedido y confirma la transacción.
+
+        El UPDATE incluye `WHERE version_id = <leída>`: si otra petición cambió el
+        pedido en medio, no se sobrescribe y se responde 409.
+
+        Args:
+            order_id: ID del pedido
+            new_status: Estado destino
+            business_id: Negocio que debe ser dueño del pedido (opcional)
+            allowed_transitions: Restricción adicional del actor (opcional)
+            expected_version: version_id que el cliente vio por última vez (opcional)
+
+        Returns:
+            tuple: (order: Order, old_status: str)
+
+        Raises:
+            TransitionError: Si la transición no es válida o hubo un conflicto
+        """
+        order = OrderStateMachine.load(order_id, business_id, expected_version)
+        old_status = OrderStateMachine.apply(order, new_status, allowed_transitions)
+        OrderStateMachine.commit()
+        return order, old_status
+
+    @staticmethod
+    def revert(order_id, business_id=None, expected_version=None):
+        """
+        Devuelve un pedido a la columna anterior y confirma la transacción.
+
+        Returns:
+            tuple: (order: Order, old_status: str)
+
+        Raises:
+            TransitionError: Si el estado no se puede devolver o hubo un conflicto
+        """
+        order = OrderStateMachine.load(order_id, business_id, expected_version)
+        old_status = order.status
+        values = OrderStateMachine.revert_values(old_status, datetime.now(timezone.utc))
+        for column, value in values.items():
+            setattr(order, column, value)
+        OrderStateMachine.commit()
+        return order, old_status
+
+    @staticmethod
+    def commit():
+        """
+        Confirma la transacción traduciendo conflictos de versión a TransitionError(409).
+        """
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            raise TransitionError(CONFLICT_MESSAGE, 409)
+
+    @staticmethod
+    def _seconds_between(start, end):
+        start_aware = OrderStateMachine._ensure_timezone(start)
+        end_aware = OrderStateMachine._ensure_timezone(end)
+        if not start_aware or not end_aware:
+            return None
+        return int((end_aware - start_aware).total_seconds())
+
+    @staticmethod
+    def _ensure_timezone(dt):
+        """Garantiza que un datetime tenga zona horaria UTC para poder restarlo."""
+        if dt is None:
+            return None
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
@@ -0,0 +1,243 @@
+"""
+Servicio de la proyección de lectura de pedidos (tabla order_views).
+Mantiene una fila desnormalizada por pedido en la misma transacción que lo escribe:
+cada flush anota los pedidos escritos y se proyectan una sola vez antes del commit.
+"""
+from sqlalchemy import event, insert, update, delete, select
+from sqlalchemy.orm import attributes
+from app.extensions import db
+from app.data.models import Order, OrderItem, Customer, OrderView
+
+
+# Columnas que se copian tal cual de orders a order_views
+_ORDER_COLUMNS = (
+    'business_id', 'order_number', 'status', 'order_type', 'customer_id',
+    'total_amount', 'delivery_address', 'notes',
+    'created_at', 'updated_at', 'accepted_at', 'preparing_at', 'ready_at',
+    'sent_at', 'paid_at', 'delivered_at',
+    'response_time_seconds', 'preparation_time_seconds',
+    'change_seq', 'version_id'
+)
+
+# Estado de las filas de pedidos que pasaron al archivo (tombstones del feed)
+ARCHIVED_STATUS = 'archived'
+
+# Clave de session.info con los pedidos escritos que falta proyectar
+_PENDING_KEY = 'order_views_pending'
+
+
+class OrderViewService:
+    """Servicio para mantener y reconstruir la proyección order_views."""
+
+    @staticmethod
+    def refresh(order_ids, session=None):
+        """
+        Recalcula las filas de order_views de los pedidos indicados.
+
+        Se ejecuta dentro de la transacción actual: la proyección se confirma
+        junto con la escritura del pedido. Los pedidos que ya no existen en la
+        tabla viva (eliminados o archivados) pierden su fila.
+
+        Args:
+            order_ids: IDs de los pedidos a recalcular
+            session: Sesión a usar (por defecto db.session)
+
+        Returns:
+            int: Filas escritas
+        """
+        session = session or db.session
+        order_ids = [order_id for order_id in set(order_ids) if order_id is not None]
+        if not order_ids:
+            return 0
+
+        orders = session.execute(
+            select(
+                Order.id,
+                *[getattr(Order, column) for column in _ORDER_COLUMNS],
+                Customer.name.label('customer_name'),
+                Customer.phone.label('customer_phone')
+            )
+            .outerjoin(Customer, Customer.id == Order.customer_id)
+            .where(Order.id.in_(order_ids))
+        ).all()
+
+        items = {}
+        for item in session.execute(
+            select(
+                OrderItem.order_id, OrderItem.product_name, OrderItem.quantity,
+                OrderItem.unit_price, OrderItem.subtotal
+            )
+            .where(OrderItem.order_id.in_(order_ids))
+            .order_by(OrderItem.id)
+        ):
+            items.setdefault(item.order_id, []).append({
+                'product_name': item.product_name,
+                'quantity': item.quantity,
+                'unit_price': float(item.unit_price),
+                'subtotal': float(item.subtotal)
+            })
+
+        rows = []
+        for order in orders:
+            row = {column: getattr(order, column) for column in _ORDER_COLUMNS}
+            row.update(
+                order_id=order.id,
+                customer_name=order.customer_name,
+                customer_phone=order.customer_phone,
+                items=items.get(order.id, [])
+            )
+            rows.append(row)
+
+        table = OrderView.__table__
+        session.execute(delete(table).where(table.c.order_id.in_(order_ids)))
+        if rows:
+            session.execute(insert(table), rows)
+        return len(rows)
+
+    @staticmethod
+    def mark_pending(order_ids, session=None):
+        """
+        Anota pedidos escritos sin pasar por el flush (INSERT/UPDATE masivos)
+        para proyectarlos con los demás antes del commit.
+        """
+        session = session or db.session
+        session.info.setdefault(_PENDING_KEY, set()).update(order_ids)
+
+    @staticmethod
+    def refresh_customer(customer, session=None):
+        """Copia el nombre y teléfono actuales del cliente a sus pedidos proyectados."""
+        session = session or db.session
+        table = OrderView.__table__
+        session.execute(
+            update(table)
+            .where(table.c.customer_id == customer.id)
+            .values(customer_name=customer.name, customer_phone=customer.phone)
+        )
+
+    @staticmethod
+    def archive(order_ids, archived_at, session=None):
+        """
+        Convierte en tombstones las filas de pedidos que pasan al archivo.
+
+        La fila queda con estado 'archived', sin ítems y con una nueva versión
+        del negocio: ninguna vista la muestra y el feed de cambios la envía
+        como eliminada a los clientes que aún tienen la tarjeta.
+
+        Args:
+            order_ids: IDs de los pedidos archivados
+            archived_at: Momento del archivado (updated_at del tombstone)
+            session: Sesión a usar (por defecto db.session)
+        """
+        from app.services.change_feed_service import ChangeFeedService
+
+        session = session or db.session
+        table = OrderView.__table__
+        business_ids = session.execute(
+            select(table.c.business_id).where(table.c.order_id.in_(list(order_ids))).distinct()
+        ).scalars().all()
+        for business_id in sorted(business_ids):
+            version = ChangeFeedService.bump_version(business_id, session)
+            session.execute(
+                update(table)
+                .where(table.c.business_id == business_id, table.c.order_id.in_(list(order_ids)))
+                .values(status=ARCHIVED_STATUS, items=[], updated_at=archived_at, change_seq=version)
+            )
+
+    @staticmethod
+    def prune_archived(older_than, session=None):
+        """
+        Elimina los tombstones de pedidos archivados antes de `older_than`.
+
+        Returns:
+            int: Filas eliminadas
+        """
+        session = session or db.session
+        table = OrderView.__table__
+        return session.execute(
+            delete(table).where(table.c.status == ARCHIVED_STATUS, table.c.updated_at < older_than)
+        ).rowcount
+
+    @staticmethod
+    def rebuild(business_id=None, batch_size=500):
+        """
+        Reconstruye la proyección desde las tablas de pedidos, por lotes.
+
+        Usado al crear la tabla en una base existente o para reparar la
+        proyección. Cada lote se confirma por separado.
+
+        Args:
+            business_id: Limitar a un negocio (None = todos)
+            batch_size: Pedidos por lote
+
+        Returns:
+            int: Filas escritas
+        """
+        written = 0
+        last_id = 0
+        while True:
+            query = db.session.query(Order.id).filter(Order.id > last_id)
+            if business_id is not None:
+                query = query.filter(Order.business_id == business_id)
+            order_ids = [row.id for row in query.order_by(Order.id).limit(batch_size)]
+            if not order_ids:
+                break
+            written += OrderViewService.refresh(order_ids)
+            db.session.commit()
+            last_id = order_ids[-1]
+
+        # Filas de pedidos que ya no están en la tabla viva (salvo los tombstones del archivo)
+        table = OrderView.__table__
+        orphans = delete(table).where(
+            table.c.order_id.notin_(select(Order.id)),
+            table.c.status != ARCHIVED_STATUS
+        )
+        if business_id is not None:
+            orphans = orphans.where(table.c.business_id == business_id)
+        db.session.execute(orphans)
+        db.session.commit()
+        return written
+
+
+def _collect_order_views(session, flush_context):
+    """Anota los pedidos escritos por el ORM en este flush; se proyectan al confirmar."""
+    order_ids = session.info.setdefault(_PENDING_KEY, set())
+    customers = []
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Order):
+            order_ids.add(obj.id)
+        elif isinstance(obj, OrderItem):
+            order_ids.add(obj.order_id if obj.order_id is not None else getattr(obj.order, 'id', None))
+        elif isinstance(obj, Customer) and obj in session.dirty:
+            if any(attributes.get_history(obj, key).has_changes() for key in ('name', 'phone')):
+                customers.append(obj)
+
+    for customer in customers:
+        OrderViewService.refresh_customer(customer, session)
+
+
+def _refresh_order_views(session):
+    """
+    Proyecta los pedidos escritos en la transacción, una vez aunque hubo varios flush
+    (p. ej. el pedido y luego sus ítems).
+    """
+    # Los cambios que aún no se enviaron también anotan sus pedidos
+    session.flush()
+    order_ids = session.info.pop(_PENDING_KEY, None)
+    if order_ids:
+        OrderViewService.refresh(order_ids, session)
+
+
+def _discard_order_views(session, previous_transaction=None):
+    """La transacción se deshizo: no queda nada por proyectar."""
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_order_views():
+    """Registra el mantenimiento automático de order_views en la sesión de SQLAlchemy."""
+    for name, listener in (
+        ('after_flush', _collect_order_views),
+        ('before_commit', _refresh_order_views),
+        ('after_rollback', _discard_order_views)
+    ):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
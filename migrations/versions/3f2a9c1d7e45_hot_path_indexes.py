@@ -0,0 +1,103 @@
+"""Índices de rutas calientes y columnas de versionado de pedidos
+
+Las instalaciones existentes crearon su esquema con db.create_all(), que no
+agrega columnas ni índices a tablas ya creadas. Esta migración lleva esas bases
+al esquema actual y es idempotente: en una base recién creada no hace nada.
+
+Revision ID: 3f2a9c1d7e45
+Revises:
+Create Date: 2026-10-17 02:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e45'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (nombre, tabla, columnas)
+INDEXES = [
+    ('ix_orders_business_created', 'orders', ['business_id', 'created_at', 'id']),
+    ('ix_orders_business_change_seq', 'orders', ['business_id', 'change_seq']),
+    ('ix_orders_business_status_created', 'orders', ['business_id', 'status', 'created_at']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_messages_order_id', 'messages', ['order_id']),
+    ('ix_products_business_id', 'products', ['business_id']),
+    ('ix_ai_conversations_lookup', 'ai_conversations', ['customer_phone', 'business_id', 'updated_at']),
+]
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _has_column(table, column):
+    return column in {col['name'] for col in _inspector().get_columns(table)}
+
+
+def _has_index(table, name):
+    return name in {index['name'] for index in _inspector().get_indexes(table)}
+
+
+def upgrade():
+    inspector = _inspector()
+    tables = set(inspector.get_table_names())
+
+    if 'order_sequences' not in tables:
+        op.create_table(
+            'order_sequences',
+            sa.Column('business_id', sa.Integer(), sa.ForeignKey('businesses.id'), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('last_value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('business_id', 'day')
+        )
+
+    if 'data_versions' not in tables:
+        op.create_table(
+            'data_versions',
+            sa.Column('business_id', sa.Integer(), sa.ForeignKey('businesses.id'), nullable=False),
+            sa.Column('version', sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint('business_id')
+        )
+
+    with op.batch_alter_table('orders') as batch_op:
+        if not _has_column('orders', 'change_seq'):
+            batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=True))
+        if not _has_column('orders', 'version_id'):
+            batch_op.add_column(
+                sa.Column('version_id', sa.Integer(), nullable=False, server_default='1')
+            )
+
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    for name, table, columns in INDEXES:
+        if _has_index(table, name):
+            continue
+        if is_postgresql:
+            # Sin bloquear escrituras en tablas con datos (fuera de la transacción)
+            with op.get_context().autocommit_block():
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+        else:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        if _has_index(table, name):
+            op.drop_index(name, table_name=table)
+
+    with op.batch_alter_table('orders') as batch_op:
+        if _has_column('orders', 'version_id'):
+            batch_op.drop_column('version_id')
+        if _has_column('orders', 'change_seq'):
+            batch_op.drop_column('change_seq')
+
+    tables = set(_inspector().get_table_names())
+    if 'data_versions' in tables:
+        op.drop_table('data_versions')
+    if 'order_sequences' in tables:
+        op.drop_table('order_sequences')
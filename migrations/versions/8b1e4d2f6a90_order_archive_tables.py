@@ -0,0 +1,109 @@
+"""Tablas de archivo de pedidos cerrados y cancelados
+
+Revision ID: 8b1e4d2f6a90
+Revises: 3f2a9c1d7e45
+Create Date: 2026-10-17 04:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4d2f6a90'
+down_revision = '3f2a9c1d7e45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'orders_archive' not in tables:
+        op.create_table(
+            'orders_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('order_number', sa.String(length=20), nullable=False),
+            sa.Column('business_id', sa.Integer(), sa.ForeignKey('businesses.id'), nullable=False),
+            sa.Column('customer_id', sa.Integer(), sa.ForeignKey('customers.id'), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('order_type', sa.String(length=20)),
+            sa.Column('total_amount', sa.Numeric(10, 2), nullable=False),
+            sa.Column('delivery_address', sa.String(length=200)),
+            sa.Column('notes', sa.Text()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+            sa.Column('accepted_at', sa.DateTime()),
+            sa.Column('preparing_at', sa.DateTime()),
+            sa.Column('ready_at', sa.DateTime()),
+            sa.Column('sent_at', sa.DateTime()),
+            sa.Column('paid_at', sa.DateTime()),
+            sa.Column('delivered_at', sa.DateTime()),
+            sa.Column('response_time_seconds', sa.Integer()),
+            sa.Column('preparation_time_seconds', sa.Integer()),
+            sa.Column('change_seq', sa.BigInteger()),
+            sa.Column('version_id', sa.Integer()),
+            sa.Column('archived_at', sa.DateTime()),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_orders_archive_order_number', 'orders_archive', ['order_number'])
+        op.create_index('ix_orders_archive_business_created', 'orders_archive',
+                        ['business_id', 'created_at', 'id'])
+
+    if 'order_items_archive' not in tables:
+        op.create_table(
+            'order_items_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders_archive.id'), nullable=False),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id')),
+            sa.Column('product_name', sa.String(length=100), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('unit_price', sa.Numeric(10, 2), nullable=False),
+            sa.Column('subtotal', sa.Numeric(10, 2), nullable=False),
+            sa.Column('notes', sa.Text()),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_order_items_archive_order_id', 'order_items_archive', ['order_id'])
+
+    if 'messages_archive' not in tables:
+        op.create_table(
+            'messages_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders_archive.id')),
+            sa.Column('whatsapp_message_id', sa.String(length=100)),
+            sa.Column('sender_phone', sa.String(length=20), nullable=False),
+            sa.Column('receiver_phone', sa.String(length=20), nullable=False),
+            sa.Column('message_type', sa.String(length=20)),
+            sa.Column('content', sa.Text()),
+            sa.Column('media_url', sa.String(length=255)),
+            sa.Column('direction', sa.String(length=10), nullable=False),
+            sa.Column('is_automated', sa.Boolean()),
+            sa.Column('status', sa.String(length=20)),
+            sa.Column('created_at', sa.DateTime()),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_messages_archive_order_id', 'messages_archive', ['order_id'])
+
+    if 'payments_archive' not in tables:
+        op.create_table(
+            'payments_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders_archive.id'), nullable=False),
+            sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+            sa.Column('payment_method', sa.String(length=20), nullable=False),
+            sa.Column('payment_status', sa.String(length=20)),
+            sa.Column('transaction_id', sa.String(length=100)),
+            sa.Column('stripe_payment_intent_id', sa.String(length=100)),
+            sa.Column('payment_date', sa.DateTime()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('order_id')
+        )
+
+
+def downgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for table in ('payments_archive', 'messages_archive', 'order_items_archive', 'orders_archive'):
+        if table in tables:
+            op.drop_table(table)
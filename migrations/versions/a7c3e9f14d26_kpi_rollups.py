@@ -0,0 +1,56 @@
+"""Agregados de KPIs por hora y por día (kpi_rollups)
+
+Después de aplicarla en una base con pedidos, poblar la tabla con
+`python -m app.scripts.rebuild_kpi_rollups`.
+
+Revision ID: a7c3e9f14d26
+Revises: e1a5b3c7d902
+Create Date: 2026-10-17 07:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9f14d26'
+down_revision = 'e1a5b3c7d902'
+branch_labels = None
+depends_on = None
+
+
+COUNT_COLUMNS = (
+    'orders_count', 'received_count', 'preparing_count', 'ready_count', 'sent_count',
+    'paid_count', 'closed_count', 'cancelled_count', 'automated_count'
+)
+
+SATISFACTION_COLUMNS = (
+    'satisfaction_30_count', 'satisfaction_45_count', 'satisfaction_60_count',
+    'satisfaction_90_count', 'satisfaction_over_count'
+)
+
+
+def upgrade():
+    if 'kpi_rollups' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'kpi_rollups',
+        sa.Column('business_id', sa.Integer(), sa.ForeignKey('businesses.id'), nullable=False),
+        sa.Column('granularity', sa.String(length=5), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        *[sa.Column(name, sa.Integer(), nullable=False) for name in COUNT_COLUMNS],
+        sa.Column('sales_amount', sa.Numeric(12, 2), nullable=False),
+        sa.Column('response_time_sum', sa.BigInteger(), nullable=False),
+        sa.Column('response_time_count', sa.Integer(), nullable=False),
+        sa.Column('preparation_time_sum', sa.BigInteger(), nullable=False),
+        sa.Column('preparation_time_count', sa.Integer(), nullable=False),
+        *[sa.Column(name, sa.Integer(), nullable=False) for name in SATISFACTION_COLUMNS],
+        sa.Column('updated_at', sa.DateTime()),
+        sa.PrimaryKeyConstraint('business_id', 'granularity', 'bucket_start')
+    )
+
+
+def downgrade():
+    if 'kpi_rollups' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('kpi_rollups')
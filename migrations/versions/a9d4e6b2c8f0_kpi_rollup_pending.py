@@ -0,0 +1,39 @@
+"""Franjas de KPIs pendientes de recalcular (kpi_rollup_pending)
+
+Las escrituras de pedidos ya no recalculan kpi_rollups en su transacción:
+marcan la franja y se recalcula antes de leer los KPIs del negocio.
+
+Revision ID: a9d4e6b2c8f0
+Revises: f3c9e2b7a4d1
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4e6b2c8f0'
+down_revision = 'f3c9e2b7a4d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'kpi_rollup_pending' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'kpi_rollup_pending',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('business_id', sa.Integer(), sa.ForeignKey('businesses.id'), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False)
+    )
+    op.create_index('ix_kpi_rollup_pending_business_id', 'kpi_rollup_pending', ['business_id'])
+
+
+def downgrade():
+    # Las franjas pendientes se pierden: luego ejecutar python -m app.scripts.rebuild_kpi_rollups
+    if 'kpi_rollup_pending' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_kpi_rollup_pending_business_id', table_name='kpi_rollup_pending')
+        op.drop_table('kpi_rollup_pending')
@@ -0,0 +1,38 @@
+"""Zona horaria de cada negocio para las métricas por hora local
+
+Revision ID: b5d8f2a03c71
+Revises: a7c3e9f14d26
+Create Date: 2026-10-17 08:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8f2a03c71'
+down_revision = 'a7c3e9f14d26'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    return column in {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if _has_column('businesses', 'timezone_name'):
+        return
+
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.add_column(
+            sa.Column('timezone_name', sa.String(length=50), server_default='America/Bogota')
+        )
+
+
+def downgrade():
+    if not _has_column('businesses', 'timezone_name'):
+        return
+
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.drop_column('timezone_name')
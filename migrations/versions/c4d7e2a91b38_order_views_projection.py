@@ -0,0 +1,62 @@
+"""Proyección de lectura de pedidos (order_views)
+
+Después de aplicarla en una base con pedidos, poblar la tabla con
+`python -m app.scripts.rebuild_order_views`.
+
+Revision ID: c4d7e2a91b38
+Revises: 8b1e4d2f6a90
+Create Date: 2026-10-17 05:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7e2a91b38'
+down_revision = '8b1e4d2f6a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'order_views' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'order_views',
+        sa.Column('order_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('business_id', sa.Integer(), sa.ForeignKey('businesses.id'), nullable=False),
+        sa.Column('order_number', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('order_type', sa.String(length=20)),
+        sa.Column('customer_id', sa.Integer()),
+        sa.Column('customer_name', sa.String(length=100)),
+        sa.Column('customer_phone', sa.String(length=20)),
+        sa.Column('total_amount', sa.Numeric(10, 2), nullable=False),
+        sa.Column('delivery_address', sa.String(length=200)),
+        sa.Column('notes', sa.Text()),
+        sa.Column('items', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.Column('accepted_at', sa.DateTime()),
+        sa.Column('preparing_at', sa.DateTime()),
+        sa.Column('ready_at', sa.DateTime()),
+        sa.Column('sent_at', sa.DateTime()),
+        sa.Column('paid_at', sa.DateTime()),
+        sa.Column('delivered_at', sa.DateTime()),
+        sa.Column('response_time_seconds', sa.Integer()),
+        sa.Column('preparation_time_seconds', sa.Integer()),
+        sa.Column('change_seq', sa.BigInteger()),
+        sa.Column('version_id', sa.Integer()),
+        sa.PrimaryKeyConstraint('order_id')
+    )
+    op.create_index('ix_order_views_business_status_created', 'order_views',
+                    ['business_id', 'status', 'created_at'])
+    op.create_index('ix_order_views_business_change_seq', 'order_views',
+                    ['business_id', 'change_seq'])
+
+
+def downgrade():
+    if 'order_views' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('order_views')
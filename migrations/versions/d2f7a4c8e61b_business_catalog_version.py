@@ -0,0 +1,38 @@
+"""Versión del catálogo de cada negocio para la caché del catálogo del agente IA
+
+Revision ID: d2f7a4c8e61b
+Revises: b5d8f2a03c71
+Create Date: 2026-10-17 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f7a4c8e61b'
+down_revision = 'b5d8f2a03c71'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    return column in {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if _has_column('businesses', 'catalog_version'):
+        return
+
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.add_column(
+            sa.Column('catalog_version', sa.BigInteger(), nullable=False, server_default='0')
+        )
+
+
+def downgrade():
+    if not _has_column('businesses', 'catalog_version'):
+        return
+
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.drop_column('catalog_version')
@@ -0,0 +1,66 @@
+"""Índices de búsqueda de pedidos (trigramas y prefijo)
+
+Revision ID: e1a5b3c7d902
+Revises: c4d7e2a91b38
+Create Date: 2026-10-17 06:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a5b3c7d902'
+down_revision = 'c4d7e2a91b38'
+branch_labels = None
+depends_on = None
+
+
+# Solo PostgreSQL: (nombre, tabla, expresión, método)
+PG_INDEXES = [
+    ('ix_orders_order_number_pattern', 'orders',
+     'order_number varchar_pattern_ops', 'btree'),
+    ('ix_orders_delivery_address_trgm', 'orders',
+     'delivery_address gin_trgm_ops', 'gin'),
+    ('ix_customers_phone_trgm', 'customers', 'phone gin_trgm_ops', 'gin'),
+    ('ix_customers_name_trgm', 'customers', 'name gin_trgm_ops', 'gin'),
+]
+
+
+def _has_index(table, name):
+    return name in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    if not _has_index('orders', 'ix_orders_customer_created'):
+        if is_postgresql:
+            with op.get_context().autocommit_block():
+                op.create_index('ix_orders_customer_created', 'orders',
+                                ['customer_id', 'created_at'], postgresql_concurrently=True)
+        else:
+            op.create_index('ix_orders_customer_created', 'orders', ['customer_id', 'created_at'])
+
+    if not is_postgresql:
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression, method in PG_INDEXES:
+        if _has_index(table, name):
+            continue
+        # Sin bloquear escrituras en tablas con datos (fuera de la transacción)
+        with op.get_context().autocommit_block():
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} USING {method} ({expression})'
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, _, _, _ in reversed(PG_INDEXES):
+            op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    if _has_index('orders', 'ix_orders_customer_created'):
+        op.drop_index('ix_orders_customer_created', table_name='orders')
@@ -0,0 +1,28 @@
+"""Inventario opcional: stock_quantity NULL significa producto sin control de stock
+
+Revision ID: f3c9e2b7a4d1
+Revises: d2f7a4c8e61b
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9e2b7a4d1'
+down_revision = 'd2f7a4c8e61b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Antes de descontar inventario el stock nunca se usó: el 0 por defecto no
+    # significa "agotado" sino "sin control"
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.alter_column('stock_quantity', existing_type=sa.Integer(), nullable=True, server_default=None)
+    op.execute(sa.text('UPDATE products SET stock_quantity = NULL WHERE stock_quantity = 0'))
+
+
+def downgrade():
+    op.execute(sa.text('UPDATE products SET stock_quantity = 0 WHERE stock_quantity IS NULL'))
@@ -0,0 +1,55 @@
+"""
+Fixtures de pruebas: app con TestingConfig (SQLite en memoria) y un negocio con catálogo.
+"""
+import os
+import pytest
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+
+from app import create_app
+from app.extensions import db
+from app.data.models import User, Business, Product
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def business(app):
+    user = User(email='negocio@prontoa.test', full_name='Negocio', phone='+570000000')
+    user.set_password('secreto')
+    db.session.add(user)
+    db.session.flush()
+
+    business = Business(user_id=user.id, name='Negocio de prueba', business_type='restaurant')
+    db.session.add(business)
+    db.session.flush()
+
+    db.session.add_all([
+        Product(business_id=business.id, name=name, price=price, category=category)
+        for name, price, category in (
+            ('Arepa', 4000, 'Arepas'),
+            ('Café', 3000, 'Bebidas'),
+            ('Empanada de Pollo', 2500, 'Fritos'),
+            ('Jugo de Mora', 5000, 'Bebidas'),
+        )
+    ])
+    db.session.commit()
+    return business
+
+
+@pytest.fixture
+def login(app):
+    """Retorna un cliente de pruebas con la sesión iniciada como `user_id` (p. ej. 'user-1')."""
+    def login(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = user_id
+            session['_fresh'] = True
+        return client
+    return login
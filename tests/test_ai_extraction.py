@@ -0,0 +1,56 @@
+"""
+Pruebas del extractor local de pedidos del agente IA.
+"""
+from app.services.ai_service import AIAgentService
+from app.services.catalog_service import CatalogService
+
+
+def _extract(business, text):
+    agent = AIAgentService()
+    return agent.extract_order_from_text(text, CatalogService.get_snapshot(business.id))
+
+
+def _products(extracted):
+    return {item['name']: item['quantity'] for item in extracted['products']}
+
+
+def test_address_stops_before_quantity_and_product(business):
+    extracted = _extract(business, 'una arepa a domicilio calle 45 # 12-30 2 cafes')
+
+    assert _products(extracted) == {'Arepa': 1, 'Café': 2}
+    assert extracted['address'] == 'calle 45 # 12-30'
+    assert extracted['delivery_type'] == 'delivery'
+    assert extracted['unmatched'] == []
+
+
+def test_address_keeps_details_after_comma(business):
+    extracted = _extract(business, 'Mi dirección es Cra 7 #8-9, apto 301')
+
+    assert extracted['address'] == 'Cra 7 #8-9, apto 301'
+    assert extracted['products'] == []
+
+
+def test_local_completion_keeps_products_after_address(business):
+    agent = AIAgentService()
+    catalog = CatalogService.get_snapshot(business.id)
+    text = 'una arepa a domicilio calle 45 # 12-30 2 cafes'
+
+    result = agent._complete_order_locally(None, agent.extract_order_from_text(text, catalog), text)
+
+    assert {item['name']: item['quantity'] for item in result['entities']['products']} == {'Arepa': 1, 'Café': 2}
+    assert result['missing_info'] == ['customer_name']
+
+
+def test_resolve_products_merges_name_and_id_with_string_quantities(business):
+    catalog = CatalogService.get_snapshot(business.id)
+    arepa = catalog.find('Arepa')
+    result = {'entities': {'products': [
+        {'name': 'arepa', 'quantity': '2'},
+        {'id': arepa['id'], 'quantity': 1},
+        {'name': 'cafe', 'quantity': 'varios'}
+    ]}}
+
+    AIAgentService._resolve_products(result, catalog)
+
+    assert _products(result['entities']) == {'Arepa': 3, 'Café': 1}
+    assert result['entities']['products'][0]['product_id'] == arepa['id']
@@ -0,0 +1,18 @@
+"""
+Pruebas de las estadísticas del agente IA expuestas en /api/kpis/ai-stats.
+"""
+from app.services.ai_service import AIAgentService
+
+
+def test_ai_stats_count_fast_path_messages(app, business, login):
+    AIAgentService.reset_stats()
+
+    result = AIAgentService().process_message('+573001234567', 'hola', business.id)
+    assert result['fast_path']
+
+    response = login(f'user-{business.user_id}').get('/api/kpis/ai-stats')
+    assert response.status_code == 200
+    stats = response.get_json()['stats']
+    assert stats['messages'] == 1
+    assert stats['llm_calls'] == 0
+    assert stats['local_ratio'] == 1
@@ -0,0 +1,30 @@
+"""
+Pruebas del bloque de catálogo que se envía al LLM en catálogos grandes.
+"""
+from app.services.catalog_service import CatalogService
+
+
+def _listed(block):
+    return [line for line in block.splitlines() if line.startswith('- [')]
+
+
+def test_prompt_block_fills_with_catalog_when_search_matches_nothing(business):
+    catalog = CatalogService.get_snapshot(business.id)
+
+    block = catalog.prompt_block_for('hola buenas tardes', 3)
+
+    assert len(_listed(block)) == 3
+    assert 'productos más' in block.splitlines()[-1]
+
+
+def test_prompt_block_lists_included_and_matching_products_first(business):
+    catalog = CatalogService.get_snapshot(business.id)
+    jugo = catalog.find('Jugo de Mora')
+    empanada = catalog.find('Empanada de Pollo')
+
+    block = catalog.prompt_block_for('una empanada', 3, [jugo['id']])
+
+    listed = _listed(block)
+    assert len(listed) == 3
+    assert listed[0].startswith(f"- [{jugo['id']}] Jugo de Mora")
+    assert listed[1].startswith(f"- [{empanada['id']}] Empanada de Pollo")
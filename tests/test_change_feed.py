@@ -0,0 +1,65 @@
+"""
+Pruebas del feed de cambios del tablero: los pedidos cerrados antes de hoy y
+los archivados se envían como eliminados.
+"""
+from datetime import datetime, timezone, timedelta
+from app.extensions import db
+from app.data.models import Order, OrderView, Product
+from app.services.archive_service import ArchiveService
+from app.services.change_feed_service import ChangeFeedService
+from app.services.order_service import OrderService
+
+
+def _closed_order(business, closed_at):
+    product = Product.query.filter_by(business_id=business.id).first()
+    success, message, order = OrderService.create_order(
+        business.id, '+573001234567', [{'product_id': product.id, 'quantity': 1}]
+    )
+    assert success, message
+    order.status = 'closed'
+    order.updated_at = closed_at
+    db.session.commit()
+    return order.id
+
+
+def _cursor(business):
+    return ChangeFeedService.get_changes(business.id, 'board')['cursor']
+
+
+def test_board_feed_removes_orders_closed_before_today(business):
+    cursor = _cursor(business)
+    order_id = _closed_order(business, datetime.now(timezone.utc) - timedelta(days=1))
+
+    changes = ChangeFeedService.get_changes(business.id, 'board', since=cursor)
+
+    assert changes['orders'] == []
+    assert changes['removed'] == [order_id]
+
+
+def test_board_feed_expires_closed_orders_when_the_day_changes(business):
+    order_id = _closed_order(business, datetime.now(timezone.utc) - timedelta(days=1))
+    # Cursor de un cliente que sincronizó ayer, después del cierre
+    cursor = _cursor(business)
+
+    changes = ChangeFeedService.get_changes(business.id, 'board', since=cursor)
+
+    assert changes['removed'] == [order_id]
+    assert changes['cursor'] == cursor
+
+
+def test_board_feed_sends_archived_orders_as_removed(business):
+    order_id = _closed_order(business, datetime.now(timezone.utc) - timedelta(days=3))
+    cursor = _cursor(business)
+
+    success, message, archived = ArchiveService.archive_orders(older_than_days=1)
+    assert success, message
+    assert archived == 1
+
+    changes = ChangeFeedService.get_changes(business.id, 'board', since=cursor)
+    assert order_id in changes['removed']
+    assert changes['cursor'] > cursor
+    assert db.session.get(Order, order_id) is None
+    assert db.session.get(OrderView, order_id).status == 'archived'
+
+    orders, _ = OrderService.get_board_snapshot(business.id)
+    assert orders == []
@@ -0,0 +1,42 @@
+"""
+Pruebas de los agregados de KPIs: las escrituras marcan franjas pendientes y
+la lectura las recalcula.
+"""
+from datetime import datetime, timezone, timedelta
+from app.extensions import db
+from app.data.models import KPIRollupPending, Product
+from app.services.kpi_service import KPIService
+from app.services.kpi_rollup_service import KPIRollupService
+from app.services.order_state_machine import OrderStateMachine
+from app.services.order_service import OrderService
+
+
+def _day_metrics(business):
+    day_start = datetime.now(timezone.utc) - timedelta(days=1)
+    return KPIService._period_metrics(business.id, {'day': (day_start, None)})['day']
+
+
+def test_writes_mark_buckets_and_reads_refresh_them(business):
+    product = Product.query.filter_by(business_id=business.id).first()
+    for i in range(3):
+        success, message, order = OrderService.create_order(
+            business.id, f'+57300{i:07d}', [{'product_id': product.id, 'quantity': 2}]
+        )
+        assert success, message
+    OrderStateMachine.transition(order.id, 'preparing', business_id=business.id)
+
+    assert KPIRollupPending.query.filter_by(business_id=business.id).count() > 0
+
+    metrics = _day_metrics(business)
+    assert metrics['total'] == 3
+    assert metrics['sales'] == 3 * 2 * float(product.price)
+    assert KPIRollupPending.query.filter_by(business_id=business.id).count() == 0
+
+    # Sin franjas pendientes la lectura no recalcula nada
+    assert KPIRollupService.refresh_pending(business.id) == 0
+
+    db.session.expire_all()
+    OrderStateMachine.transition(order.id, 'cancelled', business_id=business.id)
+    metrics = _day_metrics(business)
+    assert metrics['cancelled'] == 1
+    assert metrics['sales'] == 2 * 2 * float(product.price)
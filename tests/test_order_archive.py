@@ -0,0 +1,35 @@
+"""
+Pruebas de las consultas de un pedido que ya pasó al archivo.
+"""
+from datetime import datetime, timezone, timedelta
+from app.extensions import db
+from app.data.models import Order, Product
+from app.services.archive_service import ArchiveService
+from app.services.order_service import OrderService
+
+
+def _closed_order(business, closed_at):
+    product = Product.query.filter_by(business_id=business.id).first()
+    success, message, order = OrderService.create_order(
+        business.id, '+573001234567', [{'product_id': product.id, 'quantity': 1}]
+    )
+    assert success, message
+    order.status = 'closed'
+    order.updated_at = closed_at
+    db.session.commit()
+    return order.id
+
+
+def test_archived_orders_can_be_fetched_individually(business, login):
+    order_id = _closed_order(business, datetime.now(timezone.utc) - timedelta(days=3))
+    order_number = db.session.get(Order, order_id).order_number
+    assert ArchiveService.archive_orders(older_than_days=1)[2] == 1
+
+    client = login(f'user-{business.user_id}')
+    for url in (f'/api/orders/{order_id}', f'/api/orders/by-number/{order_number}'):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        order = response.get_json()['order']
+        assert order['id'] == order_id
+        assert order['status'] == 'closed'
+        assert len(order['items']) == 1
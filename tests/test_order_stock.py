@@ -0,0 +1,59 @@
+"""
+Pruebas del inventario: reserva al crear pedidos y liberación al cancelarlos.
+"""
+from sqlalchemy import event, update
+from app.extensions import db
+from app.data.models import Product
+from app.services.order_service import OrderService
+
+
+def _tracked_product(business, stock):
+    product = Product.query.filter_by(business_id=business.id, name='Arepa').one()
+    product.stock_quantity = stock
+    db.session.commit()
+    return product
+
+
+def test_stock_check_uses_locked_row_values(business):
+    product = _tracked_product(business, 1)
+    assert product.stock_quantity == 1
+    # Otra escritura repone el stock sin que la sesión actualice el objeto cargado
+    db.session.execute(
+        update(Product).where(Product.id == product.id).values(stock_quantity=10)
+        .execution_options(synchronize_session=False)
+    )
+    assert product.stock_quantity == 1
+
+    success, message, _ = OrderService.create_order(
+        business.id, '+573001234567', [{'product_id': product.id, 'quantity': 2}]
+    )
+
+    assert success, message
+    assert db.session.get(Product, product.id).stock_quantity == 8
+
+
+def test_cancel_releases_stock_before_writing_the_order(business):
+    product = _tracked_product(business, 5)
+    success, message, order = OrderService.create_order(
+        business.id, '+573001234567', [{'product_id': product.id, 'quantity': 2}]
+    )
+    assert success, message
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[:3])
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        success, message = OrderService.cancel_order(order.id, 'Cliente desistió')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert success, message
+
+    # Mismo orden de bloqueo que create_order: products antes que data_versions y orders
+    tables = [words[1] if words[0] == 'UPDATE' else None for words in statements]
+    assert tables.index('products') < tables.index('data_versions') < tables.index('orders')
+
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).stock_quantity == 5
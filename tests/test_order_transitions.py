@@ -0,0 +1,119 @@
+"""
+Pruebas de transiciones concurrentes: de varias peticiones que aceptan el mismo
+pedido con la misma versión, solo una gana y las demás reciben 409.
+"""
+import threading
+from collections import Counter
+import pytest
+from app import create_app
+from app.config import config, TestingConfig
+from app.extensions import db
+from app.data.models import Order, Product, Worker
+from app.services.order_service import OrderService
+
+ORDERS = 5
+CLIENTS_PER_ORDER = 4
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App sobre un SQLite en archivo: cada hilo usa su propia conexión."""
+    class ConcurrentTestingConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'transitions.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+
+    config['testing-concurrent'] = ConcurrentTestingConfig
+    try:
+        app = create_app('testing-concurrent')
+    finally:
+        config.pop('testing-concurrent')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def worker(business):
+    worker = Worker(
+        business_id=business.id,
+        email='planta@prontoa.test',
+        full_name='Trabajador en planta',
+        phone='+570000001',
+        worker_type='planta'
+    )
+    worker.set_password('secreto')
+    db.session.add(worker)
+    db.session.commit()
+    return worker
+
+
+def test_racing_transitions_conflict_without_lost_updates(business, worker, login):
+    product = Product.query.filter_by(business_id=business.id).first()
+    orders = []
+    for i in range(ORDERS):
+        success, message, order = OrderService.create_order(
+            business.id, f'+57300{i:07d}', [{'product_id': product.id, 'quantity': 1}]
+        )
+        assert success, message
+        orders.append((order.id, order.version_id))
+
+    clients = [
+        (order_id, version_id, login(f'worker-{worker.id}'))
+        for order_id, version_id in orders
+        for _ in range(CLIENTS_PER_ORDER)
+    ]
+    barrier = threading.Barrier(len(clients))
+    results = []
+
+    def accept(order_id, version_id, client):
+        barrier.wait()
+        response = client.post(
+            f'/api/orders/{order_id}/accept-to-preparing',
+            json={'version_id': version_id}
+        )
+        results.append((order_id, response.status_code))
+
+    threads = [threading.Thread(target=accept, args=args) for args in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    by_order = {order_id: Counter() for order_id, _ in orders}
+    for order_id, status_code in results:
+        by_order[order_id][status_code] += 1
+    for order_id, codes in by_order.items():
+        assert codes == {200: 1, 409: CLIENTS_PER_ORDER - 1}, (order_id, codes)
+
+    db.session.expire_all()
+    for order_id, version_id in orders:
+        order = db.session.get(Order, order_id)
+        assert order.status == 'preparing'
+        assert order.version_id == version_id + 1
+
+
+def test_mark_order_ready_accepts_numeric_string_version(business, worker, login):
+    product = Product.query.filter_by(business_id=business.id).first()
+    success, message, order = OrderService.create_order(
+        business.id, '+573001234567', [{'product_id': product.id, 'quantity': 1}]
+    )
+    assert success, message
+    order_id = order.id
+    client = login(f'worker-{worker.id}')
+    response = client.post(f'/api/orders/{order_id}/accept-to-preparing', json={})
+    version_id = response.get_json()['order']['version_id']
+
+    response = client.post(
+        f'/api/workers/mark-order-ready/{order_id}',
+        json={'worker_id': worker.id, 'version_id': 'tres'}
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        f'/api/workers/mark-order-ready/{order_id}',
+        json={'worker_id': worker.id, 'version_id': str(version_id)}
+    )
+    assert response.status_code == 200, response.get_json()
+    db.session.expire_all()
+    assert db.session.get(Order, order_id).status == 'ready'
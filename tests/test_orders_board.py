@@ -0,0 +1,49 @@
+"""
+Pruebas del tablero de pedidos: el número de consultas no depende de cuántos pedidos haya.
+"""
+from sqlalchemy import event
+from app.extensions import db
+from app.data.models import Product
+from app.services.order_service import OrderService
+
+
+def _create_orders(business, count):
+    products = Product.query.filter_by(business_id=business.id).all()
+    for i in range(count):
+        success, message, _ = OrderService.create_order(
+            business.id,
+            f'+57300{i:07d}',
+            [{'product_id': product.id, 'quantity': 1} for product in products[:2]],
+            customer_name=f'Cliente {i}'
+        )
+        assert success, message
+
+
+def _board_statements(client):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get('/api/orders/board')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return response.get_json(), len(statements)
+
+
+def test_board_statement_count_does_not_grow_with_orders(business, login):
+    client = login(f'user-{business.user_id}')
+
+    _create_orders(business, 10)
+    data, statements_10 = _board_statements(client)
+    assert data['total'] == 10
+
+    _create_orders(business, 90)
+    data, statements_100 = _board_statements(client)
+    assert data['total'] == 100
+    assert all(len(order['items']) == 2 for order in data['orders'])
+
+    assert statements_100 == statements_10